@@ -0,0 +1,69 @@
+"""
+Benchmark for the time needed to import the package.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+import subprocess
+import sys
+from tests.imports import HEAVY_MODULES
+
+def import_times(code):
+    """
+    Run code in a new interpreter with `-X importtime` and parse the
+    cumulative import time of each module in microseconds.
+    """
+
+    process = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                                code], stderr=subprocess.PIPE)
+    _, output = process.communicate()
+    times = {}
+    for line in output.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+def main():
+    """
+    Measure importing the package, the clients and the dependencies of
+    requests, and fail if importing the package loads those dependencies.
+    """
+
+    if sys.version_info < (3, 7):
+        print('Python 3.7 or newer is required for -X importtime')
+        return
+
+    cases = (
+        ('import bigboat', 'bigboat'),
+        ('import bigboat.client', 'bigboat.client'),
+        ('import requests, yaml', 'requests')
+    )
+    for code, module in cases:
+        times = import_times(code)
+        print('{}: {:.1f} ms'.format(code, times.get(module, 0) / 1000.0))
+
+    loaded = [name for name in HEAVY_MODULES
+              if name in import_times('import bigboat')]
+    if loaded:
+        print('import bigboat loaded: {}'.format(', '.join(loaded)))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark for decoding large instance and status listings from the v2 API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+import json
+import sys
+import timeit
+from bigboat.utils import load_json, optional_module
+
+def make_instances(count):
+    """
+    Create a large instance listing.
+    """
+
+    return [
+        {
+            "id": "instance{}".format(index),
+            "name": "instance{}".format(index),
+            "state": {"current": "running", "desired": "running"},
+            "app": {"name": "app{}".format(index % 50), "version": "1.0"},
+            "services": dict(
+                ("service{}".format(service), {
+                    "state": "running",
+                    "ip": "10.0.{}.{}".format(index % 250, service),
+                    "container": {"id": "c{}s{}".format(index, service)}
+                }) for service in range(5)
+            )
+        } for index in range(count)
+    ]
+
+def make_statuses(count):
+    """
+    Create a large status listing.
+    """
+
+    return [
+        {
+            "name": "Check {}".format(index),
+            "lastCheck": {"time": 1494245442228 + index,
+                          "ISO": "2017-05-08T12:10:42.228Z"},
+            "description": "Total number of items: {}".format(index),
+            "details": {"total": 234322399232, "used": index, "free": index},
+            "isOk": index % 7 != 0
+        } for index in range(count)
+    ]
+
+def main():
+    """
+    Compare decoding text with the standard library against load_json.
+    """
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print('orjson available: {}'.format(
+        optional_module('orjson') is not None
+    ))
+    for name, payload in (('instances', make_instances(count)),
+                          ('statuses', make_statuses(count))):
+        content = json.dumps(payload).encode('utf-8')
+        number = 5
+        stdlib = timeit.timeit(lambda: json.loads(content.decode('utf-8')),
+                               number=number)
+        fast = timeit.timeit(lambda: load_json(content), number=number)
+        print('{}: {} bytes'.format(name, len(content)))
+        print('  json.loads: {:.3f} s per response'.format(stdlib / number))
+        print('  load_json:  {:.3f} s per response'.format(fast / number))
+        print('  Speedup:    {:.1f}x'.format(stdlib / fast))
+
+if __name__ == '__main__':
+    main()
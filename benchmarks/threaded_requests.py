@@ -0,0 +1,63 @@
+"""
+Benchmark for requests from many threads with pooled and shared sessions.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+import sys
+from timeit import default_timer
+import requests
+from bigboat.client import Client_v2
+from bigboat.sessions import SessionPool
+from tests.threads import InstanceServer, fetch_all
+
+def measure(server, threads, count, shared):
+    """
+    Measure the throughput of a client used from many threads.
+    """
+
+    client = Client_v2(server.url, 'my-api-key')
+    if shared:
+        # Perform all requests with one session, as older versions did.
+        session = requests.Session()
+        session.headers.update({'api-key': 'my-api-key'})
+        client._create_session = lambda: session
+        client._sessions = SessionPool(client._create_session)
+
+    server.connections.clear()
+    start = default_timer()
+    results = fetch_all(client, threads, count)
+    duration = default_timer() - start
+    mixed = sum(1 for name, response_name, _ in results
+                if name != response_name)
+    return len(results) / duration, len(server.connections), mixed
+
+def main():
+    """
+    Compare pooled sessions with a single shared session.
+    """
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with InstanceServer(delay=0.002) as server:
+        for label, shared in (('shared session', True),
+                              ('pooled sessions', False)):
+            rate, connections, mixed = measure(server, threads, count, shared)
+            print('{}: {:.0f} requests/s, {} connections, {} mixed up '
+                  'responses'.format(label, rate, connections, mixed))
+
+if __name__ == '__main__':
+    main()
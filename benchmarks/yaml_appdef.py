@@ -0,0 +1,64 @@
+"""
+Benchmark for parsing large application definitions from the v1 API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+import sys
+import timeit
+import yaml
+from bigboat.utils import load_yaml, yaml_loader
+
+def make_appdef(services):
+    """
+    Create a large application definition document.
+    """
+
+    lines = ['name: big', 'version: 1.0.0']
+    for index in range(services):
+        lines.extend([
+            'service{}:'.format(index),
+            '  image: registry.example/service{}:latest'.format(index),
+            '  environment:',
+            '    - SETTING_A=value{}'.format(index),
+            '    - SETTING_B=other{}'.format(index),
+            '  volumes:',
+            '    - /local/data{0}:/data{0}'.format(index),
+            '  mem_limit: 512m',
+            '  enable_ssh: true'
+        ])
+
+    return '\n'.join(lines) + '\n'
+
+def main():
+    """
+    Compare the pure Python loader with the loader used by the client.
+    """
+
+    services = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    document = make_appdef(services).encode('utf-8')
+    print('Document size: {} bytes, loader: {}'.format(len(document),
+                                                       yaml_loader().__name__))
+
+    number = 3
+    pure = timeit.timeit(lambda: yaml.safe_load(document), number=number)
+    fast = timeit.timeit(lambda: load_yaml(document), number=number)
+    print('yaml.safe_load: {:.3f} s per document'.format(pure / number))
+    print('load_yaml:      {:.3f} s per document'.format(fast / number))
+    print('Speedup:        {:.1f}x'.format(pure / fast))
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,20 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
-from .client import Client_v1, Client_v2
+import sys
 
 __version__ = '0.2.13'
+__all__ = ['Client_v1', 'Client_v2']
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        # Import the clients upon first access (PEP 562).
+        if name in __all__:
+            from . import client
+            return getattr(client, name)
+
+        raise AttributeError('module {!r} has no attribute {!r}'.format(
+            __name__, name
+        ))
+else:
+    from .client import Client_v1, Client_v2
@@ -17,6 +17,7 @@ limitations under the License.
 """
 
 from .entity import Entity
+from .rolling import RollingUpgrade
 from .utils import readonly
 
 @readonly("name", "version")
@@ -31,6 +32,9 @@ class Application(Entity):
         self._name = name
         self._version = version
 
+    def __reduce__(self):
+        return (self.__class__, (self.client, self._name, self._version))
+
     def update(self):
         """
         Register the application definition in the BigBoat API.
@@ -66,5 +70,23 @@ class Application(Entity):
         return self.client.update_instance(name, self.name, self.version,
                                            **kwargs)
 
+    def upgrade(self, version, **kwargs):
+        """
+        Upgrade the instances of this application to another version in
+        batches, waiting for each batch to be running before continuing.
+
+        Args:
+            version (str): The new version of the application.
+            **kwargs: Options of the rolling upgrade, such as `max_in_flight`
+                and `max_failures`. See :obj:`bigboat.rolling.RollingUpgrade`.
+
+        Returns:
+            :obj:`bigboat.rolling.UpgradeResult`: The names of the instances
+            that were upgraded, failed or are pending, and whether the
+            upgrade was aborted.
+        """
+
+        return RollingUpgrade(self.client, self, version, **kwargs).run()
+
     def __repr__(self):
         return 'Application(name={!r}, version={!r})'.format(self.name, self.version)
@@ -0,0 +1,130 @@
+"""
+Micro-batching of point lookups in the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+import threading
+import time
+
+# Result of a collected lookup that its caller performs itself.
+_LOOKUP = object()
+
+class LookupBatcher(object):
+    """
+    Collector of point lookups from many threads, which resolves the lookups
+    that arrive within a short window together with a single listing.
+
+    The first lookup of a window waits `window` seconds for other lookups.
+    If enough distinct keys were requested by then, the listing is retrieved
+    once and each waiting caller receives its item. Otherwise, each caller
+    looks up its own key, so those lookups are performed in parallel.
+
+    A listing is only cheaper than separate lookups if it is not too large
+    compared to the number of keys, so the listing is used for at least
+    `min_batch` keys and at least `min_fraction` of the number of items in
+    the previous listing.
+
+    Args:
+        lookup: Callable that retrieves the item for a key, or `None` if it
+            does not exist.
+        listing: Callable that retrieves all items.
+        key: Callable that determines the key of an item in the listing.
+        window (float): Seconds to collect lookups for.
+        min_batch (int): The minimum number of distinct keys for which the
+            listing is used instead of separate lookups.
+        min_fraction (float): The minimum number of distinct keys for which
+            the listing is used, as a fraction of the size of the previous
+            listing.
+    """
+
+    def __init__(self, lookup, listing, key, window=0.005, min_batch=2,
+                 min_fraction=0.05):
+        self._lookup = lookup
+        self._listing = listing
+        self._key = key
+        self._window = window
+        self._min_batch = min_batch
+        self._min_fraction = min_fraction
+        self._listing_size = 0
+        self._pending = {}
+        self._collecting = False
+        self._lock = threading.Lock()
+
+    @property
+    def window(self):
+        """
+        Seconds to collect lookups for.
+        """
+
+        return self._window
+
+    def get(self, key):
+        """
+        Look up an item, possibly together with lookups from other threads.
+
+        Args:
+            key: The key of the item.
+
+        Returns:
+            The item, or `None` if it does not exist.
+
+        Raises:
+            Exception: The error raised by the lookup or listing.
+        """
+
+        from concurrent.futures import Future
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+
+            leader = not self._collecting
+            self._collecting = True
+
+        if leader:
+            time.sleep(self._window)
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+                self._collecting = False
+
+            self._resolve(batch)
+
+        result = future.result()
+        if result is _LOOKUP:
+            return self._lookup(key)
+
+        return result
+
+    def _resolve(self, batch):
+        if len(batch) < max(self._min_batch,
+                            self._min_fraction * self._listing_size):
+            for future in batch.values():
+                future.set_result(_LOOKUP)
+
+            return
+
+        try:
+            items = dict((self._key(item), item) for item in self._listing())
+        except Exception as error: # pylint: disable=broad-except
+            for future in batch.values():
+                future.set_exception(error)
+        else:
+            self._listing_size = len(items)
+            for key, future in batch.items():
+                future.set_result(items.get(key))
@@ -0,0 +1,74 @@
+"""
+Concurrent execution of bulk operations on the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from collections import namedtuple
+from functools import partial
+
+BulkResult = namedtuple('BulkResult', ['key', 'result', 'error'])
+
+DEFAULT_WORKERS = 8
+
+def _limited(limiter, func, key):
+    with limiter:
+        return func(key)
+
+def parallel(func, keys, max_workers=DEFAULT_WORKERS, errors=(ValueError,),
+             limiter=None):
+    """
+    Perform an operation for many keys concurrently.
+
+    The results are generated as soon as they complete, not in the order of
+    the keys. If the generator is closed before all results are consumed, the
+    operations that have not yet started are cancelled.
+
+    Args:
+        func: Callable that performs the operation for one key.
+        keys: Iterable of keys to perform the operation for.
+        max_workers (int): The maximum number of concurrent operations.
+        errors (tuple): Exception classes that are reported in the results
+            instead of being raised, such as the `ValueError` raised by the
+            clients for bad requests.
+        limiter (:obj:`bigboat.concurrency.AdaptiveLimiter` or `None`):
+            Limiter that adapts the number of concurrent operations. If
+            provided, its maximum replaces `max_workers`.
+
+    Returns:
+        A generator of :obj:`BulkResult` named tuples with properties `key`,
+        `result` (the return value of the operation or `None` if it failed)
+        and `error` (the exception that was raised or `None`).
+    """
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    if limiter is not None:
+        max_workers = limiter.maximum
+        func = partial(_limited, limiter, func)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = dict((executor.submit(func, key), key) for key in keys)
+        try:
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except errors as error:
+                    yield BulkResult(key, None, error)
+                else:
+                    yield BulkResult(key, result, None)
+        finally:
+            for future in futures:
+                future.cancel()
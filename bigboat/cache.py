@@ -0,0 +1,593 @@
+"""
+Caches for data retrieved from the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+from collections import OrderedDict
+import errno
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Atomically replace existing files where possible.
+_replace = getattr(os, 'replace', os.rename)
+
+def content_hash(content):
+    """
+    Calculate the hex digest that identifies the contents of a file.
+
+    Args:
+        content (str or bytes): The file contents. Text is encoded as UTF-8.
+
+    Returns:
+        str: The SHA-256 hex digest of the contents.
+    """
+
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+
+    return hashlib.sha256(content).hexdigest()
+
+class _FileLock(object):
+    """
+    Exclusive advisory lock on a file, shared between processes.
+
+    On platforms without `fcntl` the lock is a no-op; all writes to the cache
+    are atomic renames so only eviction loses its serialization there.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self._path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+        self._file.close()
+        self._file = None
+
+class ComposeCache(object):
+    """
+    Persistent, content-addressed disk cache for compose files.
+
+    File contents are stored once under the SHA-256 digest of their contents.
+    Small reference files, named after a digest of the dashboard URL,
+    application name, version and file name, point to the contents. All
+    files are written to a temporary file and atomically renamed into place,
+    so that multiple processes can read and fill the cache concurrently.
+    When the total size of the stored contents exceeds `max_size` bytes, the
+    least recently used contents are evicted.
+
+    Eviction scans all stored contents, so the cache keeps track of an
+    estimate of its size and only evicts when the estimate exceeds the
+    maximum size, or when the last scan is more than `scan_interval` seconds
+    ago to account for contents stored by other processes.
+    """
+
+    OBJECTS = 'objects'
+    REFS = 'refs'
+    LOCK = 'lock'
+
+    def __init__(self, directory, max_size=64 * 1024 * 1024, scan_interval=60,
+                 clock=time.time):
+        self._directory = directory
+        self._max_size = max_size
+        self._scan_interval = scan_interval
+        self._clock = clock
+        # Estimated size of the contents and the time of the last scan.
+        self._size = None
+        self._scanned = None
+        for subdirectory in (self.OBJECTS, self.REFS):
+            self._make_dirs(os.path.join(directory, subdirectory))
+
+    @property
+    def directory(self):
+        """
+        The directory in which the cache is stored.
+        """
+
+        return self._directory
+
+    @property
+    def max_size(self):
+        """
+        The maximum number of bytes of file contents to keep in the cache.
+        """
+
+        return self._max_size
+
+    @staticmethod
+    def _make_dirs(path):
+        try:
+            os.makedirs(path)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+
+    @staticmethod
+    def key(dashboard, name, version, file_name):
+        """
+        Determine the cache key for a compose file.
+
+        Args:
+            dashboard (str): The base URL of the BigBoat instance
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+
+        Returns:
+            str: The hex digest identifying the compose file.
+        """
+
+        parts = (dashboard, name, version, file_name)
+        return content_hash(u'\0'.join(str(part) for part in parts))
+
+    def _path(self, kind, digest):
+        return os.path.join(self._directory, kind, digest[:2], digest)
+
+    def _write(self, path, data):
+        directory = os.path.dirname(path)
+        self._make_dirs(directory)
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                temp_file.write(data)
+
+            _replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as cache_file:
+            return cache_file.read()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+
+    def get(self, dashboard, name, version, file_name):
+        """
+        Retrieve a compose file from the cache.
+
+        Args:
+            dashboard (str): The base URL of the BigBoat instance
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+
+        Returns:
+            :obj:`str` or `None`: The contents of the compose file, or `None`
+            if the file is not in the cache.
+        """
+
+        ref_path = self._path(self.REFS, self.key(dashboard, name, version,
+                                                  file_name))
+        try:
+            digest = self._read(ref_path).decode('ascii')
+            object_path = self._path(self.OBJECTS, digest)
+            content = self._read(object_path)
+        except EnvironmentError:
+            return None
+
+        if content_hash(content) != digest:
+            # Corrupted contents; treat as a cache miss.
+            self._remove(object_path)
+            return None
+
+        try:
+            # Mark the contents as recently used for eviction.
+            os.utime(object_path, None)
+        except OSError:
+            pass
+
+        return content.decode('utf-8')
+
+    def put(self, dashboard, name, version, file_name, content):
+        """
+        Store a compose file in the cache.
+
+        Failure to write to the cache directory is not considered an error,
+        since the cache is only an optimization.
+
+        Args:
+            dashboard (str): The base URL of the BigBoat instance
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+            content (str): The file contents
+
+        Returns:
+            :obj:`str` or `None`: The content digest of the stored file, or
+            `None` if the file could not be stored.
+        """
+
+        data = content.encode('utf-8')
+        digest = content_hash(data)
+        ref_path = self._path(self.REFS, self.key(dashboard, name, version,
+                                                  file_name))
+        object_path = self._path(self.OBJECTS, digest)
+        try:
+            if os.path.exists(object_path):
+                os.utime(object_path, None)
+            else:
+                self._write(object_path, data)
+                if self._size is not None:
+                    self._size += len(data)
+
+            self._write(ref_path, digest.encode('ascii'))
+            if self._size is None or self._size > self._max_size or \
+                self._clock() - self._scanned >= self._scan_interval:
+                self.evict()
+        except EnvironmentError:
+            return None
+
+        return digest
+
+    def discard(self, dashboard, name, version, file_name):
+        """
+        Remove the reference to a compose file from the cache.
+
+        Args:
+            dashboard (str): The base URL of the BigBoat instance
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+        """
+
+        self._remove(self._path(self.REFS, self.key(dashboard, name, version,
+                                                    file_name)))
+
+    def _objects(self):
+        root = os.path.join(self._directory, self.OBJECTS)
+        for prefix in os.listdir(root):
+            directory = os.path.join(root, prefix)
+            for name in os.listdir(directory):
+                if name.startswith('.'):
+                    continue
+
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                yield stat.st_mtime, stat.st_size, path
+
+    def size(self):
+        """
+        Calculate the number of bytes of file contents stored in the cache.
+
+        Returns:
+            int: The total size of the stored contents.
+        """
+
+        return sum(size for _, size, _ in self._objects())
+
+    def evict(self):
+        """
+        Remove the least recently used file contents until the cache is no
+        larger than its maximum size.
+
+        References to removed contents are left behind; they are treated as
+        cache misses upon retrieval.
+
+        Returns:
+            int: The number of removed file contents.
+        """
+
+        with _FileLock(os.path.join(self._directory, self.LOCK)):
+            objects = sorted(self._objects())
+            total = sum(size for _, size, _ in objects)
+            removed = 0
+            for _, size, path in objects:
+                if total <= self._max_size:
+                    break
+
+                self._remove(path)
+                total -= size
+                removed += 1
+
+        self._size = total
+        self._scanned = self._clock()
+        return removed
+
+class RevalidatingCache(object):
+    """
+    In-memory cache of API listings with stale-while-revalidate semantics.
+
+    A cached value that is at most `max_age` seconds old is returned as is.
+    A value that is older, but within the additional `stale` window, is also
+    returned immediately, while a background thread retrieves a new value.
+    Older or missing values are retrieved before returning. When a background
+    refresh fails, the stale value stays in use until the window expires.
+    A value whose retrieval started before the key was invalidated is not
+    stored, since it may not include the change.
+
+    Args:
+        max_age (float): Seconds during which a cached value is fresh.
+        stale (float): Seconds after `max_age` during which a cached value
+            is returned while it is refreshed.
+        clock: Callable that returns the current time in seconds.
+    """
+
+    def __init__(self, max_age=5.0, stale=60.0, clock=time.time):
+        self._max_age = max_age
+        self._stale = stale
+        self._clock = clock
+        self._entries = {}
+        self._refreshing = {}
+        self._errors = {}
+        # Invalidations of all keys and of single keys.
+        self._generation = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_age(self):
+        """
+        Seconds during which a cached value is fresh.
+        """
+
+        return self._max_age
+
+    @property
+    def stale(self):
+        """
+        Seconds after `max_age` during which a cached value is returned while
+        it is refreshed.
+        """
+
+        return self._stale
+
+    def __getstate__(self):
+        # Cached values are not pickled.
+        return {'max_age': self._max_age, 'stale': self._stale,
+                'clock': self._clock}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _current(self, key):
+        return (self._generation, self._generations.get(key, 0))
+
+    def _store(self, key, value, generation):
+        if self._current(key) == generation:
+            self._entries[key] = (self._clock(), value)
+
+    def _refresh(self, key, load, generation):
+        try:
+            value = load()
+        except Exception as error: # pylint: disable=broad-except
+            # Background refreshes must not lose the error.
+            with self._lock:
+                self._errors[key] = error
+                del self._refreshing[key]
+        else:
+            with self._lock:
+                self._store(key, value, generation)
+                self._errors.pop(key, None)
+                del self._refreshing[key]
+
+    def get(self, key, load):
+        """
+        Retrieve a value from the cache, loading it when necessary.
+
+        Args:
+            key: Hashable identifier of the value.
+            load: Callable without arguments that retrieves the value.
+
+        Returns:
+            The cached or loaded value.
+        """
+
+        now = self._clock()
+        with self._lock:
+            generation = self._current(key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age <= self._max_age:
+                    return entry[1]
+                if age <= self._max_age + self._stale:
+                    if key not in self._refreshing:
+                        thread = threading.Thread(target=self._refresh,
+                                                  args=(key, load, generation))
+                        thread.daemon = True
+                        self._refreshing[key] = thread
+                        thread.start()
+
+                    return entry[1]
+
+        value = load()
+        with self._lock:
+            self._store(key, value, generation)
+
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Remove a value, or all values if `key` is `None`, from the cache, for
+        example after an update that changes it.
+        """
+
+        with self._lock:
+            if key is None:
+                self._generation += 1
+                self._entries.clear()
+            else:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+    def error(self, key):
+        """
+        The exception raised by the most recent failed background refresh of
+        a value, or `None` if it succeeded.
+        """
+
+        return self._errors.get(key)
+
+    def wait(self, timeout=None):
+        """
+        Wait for the background refreshes that are in progress.
+
+        Args:
+            timeout (float or `None`): The maximum number of seconds to wait
+                for each refresh.
+        """
+
+        with self._lock:
+            threads = list(self._refreshing.values())
+
+        for thread in threads:
+            thread.join(timeout)
+
+class NegativeCache(object):
+    """
+    In-memory cache of keys that recently did not exist in the API, so that
+    repeated lookups of missing entities do not need a request.
+
+    Keys expire after `ttl` seconds. When more than `max_size` keys are
+    cached, the oldest keys are removed.
+
+    A lookup that finds a key missing while another thread creates it may
+    finish after the creation discarded the key. To avoid remembering such
+    a key, lookups obtain a `generation` before their request and pass it to
+    `add`, which ignores keys that were discarded since.
+
+    Args:
+        ttl (float): Seconds during which a missing key is remembered.
+        max_size (int): The maximum number of keys to remember.
+        clock: Callable that returns the current time in seconds.
+    """
+
+    def __init__(self, ttl=30.0, max_size=10000, clock=time.time):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._clock = clock
+        self._expiry = OrderedDict()
+        # Generations of the most recent discards of keys, and the newest
+        # generation of the discards that are no longer remembered.
+        self._generation = 0
+        self._discards = OrderedDict()
+        self._forgotten = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Cached keys are not pickled.
+        return {'ttl': self._ttl, 'max_size': self._max_size,
+                'clock': self._clock}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def ttl(self):
+        """
+        Seconds during which a missing key is remembered.
+        """
+
+        return self._ttl
+
+    def __len__(self):
+        return len(self._expiry)
+
+    def __contains__(self, key):
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return False
+            if expiry <= self._clock():
+                del self._expiry[key]
+                return False
+
+            return True
+
+    def generation(self):
+        """
+        The current generation of discarded keys, to pass to `add` after
+        a lookup that started now.
+        """
+
+        with self._lock:
+            return self._generation
+
+    def add(self, key, generation=None):
+        """
+        Remember that a key does not exist.
+
+        Args:
+            key: The key that does not exist.
+            generation (int or `None`): The generation from before the lookup
+                that found the key missing. If the key may have been discarded
+                since, it is not remembered.
+        """
+
+        with self._lock:
+            if generation is not None and \
+                (self._forgotten > generation or
+                 self._discards.get(key, 0) > generation):
+                return
+
+            self._expiry.pop(key, None)
+            self._expiry[key] = self._clock() + self._ttl
+            while len(self._expiry) > self._max_size:
+                self._expiry.popitem(last=False)
+
+    def discard(self, key):
+        """
+        Forget that a key does not exist, for example because it was created.
+        """
+
+        with self._lock:
+            self._expiry.pop(key, None)
+            self._generation += 1
+            self._discards.pop(key, None)
+            self._discards[key] = self._generation
+            while len(self._discards) > self._max_size:
+                self._forgotten = self._discards.popitem(last=False)[1]
+
+    def clear(self):
+        """
+        Forget all missing keys.
+        """
+
+        with self._lock:
+            self._expiry.clear()
+            self._generation += 1
+            self._discards.clear()
+            self._forgotten = self._generation
@@ -0,0 +1,367 @@
+"""
+Command line interface for the BigBoat v2 API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+from builtins import object, str
+import argparse
+import json
+import os
+import re
+import sys
+from .application import Application
+from .bulk import parallel, DEFAULT_WORKERS
+from .client import Client_v2
+from .instance import Instance
+from .snapshot import export_snapshot, import_snapshot
+
+FIELD_SEPARATOR = re.compile(r'[\s/]+')
+
+# Errors of a single item of a batch, which do not stop the other items.
+# Connection errors of requests are environment errors as well.
+ERRORS = (ValueError, EnvironmentError)
+
+def serialize(value):
+    """
+    Convert a result of the client to a JSON-serializable value.
+
+    Args:
+        value: An entity, a named tuple or a JSON-serializable value.
+
+    Returns:
+        The JSON-serializable representation.
+    """
+
+    if isinstance(value, Application):
+        return {'name': value.name, 'version': value.version}
+    if isinstance(value, Instance):
+        return {
+            'name': value.name,
+            'current_state': value.current_state,
+            'desired_state': value.desired_state,
+            'application': serialize(value.application),
+            'services': value.services,
+            'parameters': value.parameters,
+            'options': value.options
+        }
+    if isinstance(value, tuple) and hasattr(value, '_asdict'):
+        return serialize(dict(value._asdict()))
+    if isinstance(value, dict):
+        return dict((key, serialize(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [serialize(item) for item in value]
+
+    return value
+
+def read_items(args, stdin):
+    """
+    Retrieve the items of a batch operation from the command line arguments,
+    a file or standard input.
+
+    Items are given as arguments, unless there are none or the only argument
+    is '-', in which case they are read from standard input, one item per
+    line. With `--file`, the items are read from the file instead. Empty lines
+    and lines starting with '#' are ignored.
+
+    Returns:
+        :obj:`list` of str: The items.
+    """
+
+    if args.file is not None:
+        with open(args.file) as batch_file:
+            lines = batch_file.readlines()
+    elif not args.items or args.items == ['-']:
+        lines = stdin.readlines()
+    else:
+        return list(args.items)
+
+    return [line.strip() for line in lines
+            if line.strip() and not line.strip().startswith('#')]
+
+def parse_fields(item, count):
+    """
+    Split an item of a batch into its fields, which are separated by
+    whitespace or slashes.
+
+    Raises:
+        ValueError: If the item does not have the required number of fields.
+    """
+
+    fields = FIELD_SEPARATOR.split(item.strip())
+    if len(fields) != count:
+        raise ValueError('Expected {} fields separated by whitespace or '
+                         'slashes: {!r}'.format(count, item))
+
+    return tuple(fields)
+
+def parse_instance(item):
+    """
+    Parse an instance to start from a batch item, which is either a JSON
+    object with the 'name', 'app' and 'version' and optionally 'parameters'
+    and 'options' of the instance, or the name, app and version fields.
+
+    Returns:
+        tuple: The name of the instance and a dictionary for
+        `Client_v2.update_instances`.
+    """
+
+    if item.startswith('{'):
+        spec = json.loads(item)
+        if not all(key in spec for key in ('name', 'app', 'version')):
+            raise ValueError('Instance requires name, app and version: '
+                             '{!r}'.format(item))
+
+        return spec.pop('name'), spec
+
+    name, app, version = parse_fields(item, 3)
+    return name, {'app': app, 'version': version}
+
+class Output(object):
+    """
+    Writer of JSON Lines output that keeps track of failed results.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.failures = 0
+
+    def write(self, value):
+        """
+        Write a value as a line of JSON and flush it, so that it can be
+        processed by a pipe while the operation continues.
+        """
+
+        self._stream.write(json.dumps(serialize(value), sort_keys=True))
+        self._stream.write('\n')
+        self._stream.flush()
+
+    def results(self, results, key_format=None):
+        """
+        Write the results of a batch operation as they complete.
+
+        A result without an error is still a failure if it is a false value,
+        such as `None` for an item that was not found or `False` for an
+        operation that the API did not perform.
+
+        Args:
+            results: Iterable of :obj:`bigboat.bulk.BulkResult` tuples.
+            key_format: Callable that converts a key to its output format.
+        """
+
+        for result in results:
+            key = result.key if key_format is None else key_format(result.key)
+            if result.error is not None:
+                self.failures += 1
+                self.write({'key': key, 'ok': False, 'result': None,
+                            'error': str(result.error)})
+            elif not result.result or \
+                not getattr(result.result, 'success', True):
+                self.failures += 1
+                self.write({'key': key, 'ok': False, 'result': result.result,
+                            'error': 'Not found or not performed by the API'})
+            else:
+                self.write({'key': key, 'ok': True, 'result': result.result,
+                            'error': None})
+
+def _join(key):
+    return '/'.join(key)
+
+def _apps(client, args, items, output):
+    if args.action == 'list':
+        for app in client.apps():
+            output.write(app)
+
+        return
+
+    methods = {
+        'get': client.get_app,
+        'register': client.update_app,
+        'delete': client.delete_app
+    }
+    keys = [parse_fields(item, 2) for item in items]
+    method = methods[args.action]
+    output.results(parallel(lambda key: method(*key), keys,
+                            max_workers=args.workers, errors=ERRORS,
+                            limiter=client.concurrency), _join)
+
+def _instances(client, args, items, output):
+    if args.action == 'list':
+        for instance in client.instances(lazy=True):
+            output.write(instance)
+    elif args.action == 'get':
+        output.results(client.get_instances(items, args.workers, ERRORS))
+    elif args.action == 'stop':
+        output.results(client.delete_instances(items, args.workers, ERRORS))
+    elif args.action == 'start':
+        mapping = dict(parse_instance(item) for item in items)
+        output.results(client.update_instances(mapping, args.workers,
+                                               ERRORS))
+
+def _compose(client, args, items, output):
+    if args.action == 'get':
+        keys = [parse_fields(item, 3) for item in items]
+        output.results(client.get_composes(keys, args.workers, ERRORS), _join)
+    elif args.action == 'put':
+        mapping = {}
+        for item in items:
+            # The path may contain slashes, so it is separated by whitespace.
+            parts = item.rsplit(None, 1)
+            if len(parts) != 2:
+                raise ValueError('Expected a compose file and a path separated '
+                                 'by whitespace: {!r}'.format(item))
+
+            with open(parts[1]) as compose_file:
+                mapping[parse_fields(parts[0], 3)] = compose_file.read()
+
+        results = client.update_composes(mapping, args.workers,
+                                         skip_unchanged=args.skip_unchanged,
+                                         errors=ERRORS)
+        output.results(results, _join)
+
+def _snapshot(client, args, items, output):
+    # pylint: disable=unused-argument
+    if args.action == 'export':
+        failures = export_snapshot(client, args.path, args.workers)
+    else:
+        failures = import_snapshot(client, args.path, args.workers,
+                                   journal=args.journal)
+
+    for failure in failures:
+        output.failures += 1
+        output.write({'key': failure.key, 'stage': failure.stage,
+                      'ok': False, 'result': None,
+                      'error': str(failure.error)})
+
+def _status(client, args, items, output):
+    # pylint: disable=unused-argument
+    for item in client.statuses():
+        output.write(item)
+
+def _add_batch(parser, help_text):
+    parser.add_argument('items', nargs='*', metavar='ITEM', help=help_text)
+    parser.add_argument('--file', help='File with one item per line')
+
+def build_parser():
+    """
+    Create the parser of the command line arguments.
+
+    Returns:
+        :obj:`argparse.ArgumentParser`
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='bigboat',
+        description='Perform operations on the BigBoat v2 API and write the '
+                    'results as JSON Lines. Batch operations read their items '
+                    'from standard input if none are given.'
+    )
+    parser.add_argument('--url', default=os.environ.get('BIGBOAT_URL'),
+                        help='Base URL of the BigBoat instance '
+                             '(default: $BIGBOAT_URL)')
+    parser.add_argument('--api-key', dest='api_key',
+                        default=os.environ.get('BIGBOAT_API_KEY'),
+                        help='API key to authenticate with '
+                             '(default: $BIGBOAT_API_KEY)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Maximum number of concurrent requests '
+                             '(default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.required = True
+
+    apps = commands.add_parser('apps', help='Application definitions')
+    apps.set_defaults(handler=_apps)
+    actions = apps.add_subparsers(dest='action', metavar='ACTION')
+    actions.required = True
+    actions.add_parser('list', help='List application definitions')
+    for action, help_text in (('get', 'Retrieve application definitions'),
+                              ('register', 'Register application definitions'),
+                              ('delete', 'Delete application definitions')):
+        _add_batch(actions.add_parser(action, help=help_text),
+                   'Application as NAME/VERSION')
+
+    instances = commands.add_parser('instances', help='Instances')
+    instances.set_defaults(handler=_instances)
+    actions = instances.add_subparsers(dest='action', metavar='ACTION')
+    actions.required = True
+    actions.add_parser('list', help='List instances')
+    _add_batch(actions.add_parser('get', help='Retrieve instances'),
+               'Instance name')
+    _add_batch(actions.add_parser('stop', help='Stop instances'),
+               'Instance name')
+    _add_batch(actions.add_parser('start', help='Start instances'),
+               'Instance as NAME/APP/VERSION or as a JSON object')
+
+    compose = commands.add_parser('compose', help='Compose files')
+    compose.set_defaults(handler=_compose)
+    actions = compose.add_subparsers(dest='action', metavar='ACTION')
+    actions.required = True
+    _add_batch(actions.add_parser('get', help='Retrieve compose files'),
+               'Compose file as NAME/VERSION/FILE_NAME')
+    put = actions.add_parser('put', help='Upload compose files')
+    _add_batch(put, 'Compose file as "NAME/VERSION/FILE_NAME PATH"')
+    put.add_argument('--skip-unchanged', dest='skip_unchanged',
+                     action='store_true',
+                     help='Do not upload files that are unchanged')
+
+    snapshot = commands.add_parser('snapshot', help='Snapshots of the state '
+                                                    'of the BigBoat instance')
+    snapshot.set_defaults(handler=_snapshot)
+    actions = snapshot.add_subparsers(dest='action', metavar='ACTION')
+    actions.required = True
+    export = actions.add_parser('export', help='Export a snapshot')
+    export.add_argument('path', help='Snapshot file, compressed if it ends '
+                                     'in .gz')
+    restore = actions.add_parser('import', help='Import a snapshot')
+    restore.add_argument('path', help='Snapshot file')
+    restore.add_argument('--journal',
+                         help='Journal file to resume an import with')
+
+    status = commands.add_parser('status', help='Status items')
+    status.set_defaults(handler=_status, action='list')
+
+    return parser
+
+def main(argv=None, stdin=None, stdout=None):
+    """
+    Run the command line interface.
+
+    Args:
+        argv (list or `None`): The command line arguments, by default those
+            of the process.
+        stdin (file or `None`): Stream to read batch items from.
+        stdout (file or `None`): Stream to write results to.
+
+    Returns:
+        int: The exit code, which is 1 if any operation failed.
+    """
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.url or not args.api_key:
+        parser.error('The URL and API key of the BigBoat instance are required')
+
+    stdin = sys.stdin if stdin is None else stdin
+    output = Output(sys.stdout if stdout is None else stdout)
+    client = Client_v2(args.url, args.api_key)
+    items = read_items(args, stdin) if hasattr(args, 'items') else []
+    try:
+        args.handler(client, args, items, output)
+    except ERRORS as error:
+        print('bigboat: error: {}'.format(error), file=sys.stderr)
+        return 1
+
+    return 1 if output.failures else 0
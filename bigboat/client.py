@@ -18,20 +18,91 @@ limitations under the License.
 
 from builtins import str
 from builtins import object
-import requests
-import yaml
+from collections import namedtuple
+import hashlib
+import os
+from timeit import default_timer
 from .application import Application
-from .instance import Instance
-from .utils import Inherited as inherit
+from .batch import LookupBatcher
+from .bulk import parallel, DEFAULT_WORKERS
+from .cache import content_hash
+from .validation import validate_compose
+from .instance import Instance, LazyInstance
+from .sessions import SessionPool
+from .utils import Inherited as inherit, basestring, gzip_compress, \
+    load_json, load_yaml, open_binary
+
+# The requests package is imported by the methods that perform requests, so
+# that importing bigboat does not pay for it before a client is used.
+
+ComposeUpdate = namedtuple('ComposeUpdate', ['success', 'uploaded'])
+
+# The number of bytes of compose files that are streamed at a time.
+CHUNK_SIZE = 64 * 1024
+
+# Content encodings of responses that the v2 client accepts.
+ACCEPT_ENCODING = 'gzip, deflate'
+
+# Status code with which a server rejects the encoding of a request body.
+UNSUPPORTED_MEDIA_TYPE = 415
+
+class EnvironmentKey(object):
+    """
+    Reference to an API key in an environment variable, which is read each
+    time a client creates a session. Pickling the reference only pickles the
+    name of the variable, not the key.
+
+    Args:
+        name (str): The name of the environment variable.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    @property
+    def name(self):
+        """
+        The name of the environment variable.
+        """
+
+        return self._name
+
+    def __call__(self):
+        if self._name not in os.environ:
+            raise ValueError('Environment variable {} with the API key is '
+                             'not set'.format(self._name))
+
+        return os.environ[self._name]
+
+    def __repr__(self):
+        return 'EnvironmentKey({!r})'.format(self._name)
 
 class Client(object):
     """
     Generic client base class, enforcing minimum required interface.
+
+    Args:
+        base_url (str): The base URL of the BigBoat instance.
+        **kwargs: Additional options of the client:
+            - json_decoder: Callable that parses the bytes of a JSON response
+              body. By default, `orjson` is used if it is installed, with
+              a fallback to the standard library decoder.
+
+    Clients can be pickled, for example to pass them to a process pool. Only
+    the configuration of the client is pickled, so its options must also be
+    picklable. The unpickled client starts without any connections.
     """
 
     def __init__(self, base_url, **kwargs):
         self._base_url = base_url.rstrip('/')
         self._options = kwargs
+        self._json_decoder = kwargs.get('json_decoder', load_json)
+
+    def __getstate__(self):
+        return {'base_url': self._base_url, 'options': self._options}
+
+    def __setstate__(self, state):
+        self.__init__(state['base_url'], **state['options'])
 
     @property
     def base_url(self):
@@ -41,6 +112,9 @@ class Client(object):
 
         return self._base_url
 
+    def _json(self, request):
+        return self._json_decoder(request.content)
+
     def apps(self):
         """
         Retrieve all application definitions from the API.
@@ -160,9 +234,11 @@ class Client_v1(Client):
         return '{}/api/v1/{}'.format(self._base_url, path)
 
     def _get(self, path):
+        import requests
         return requests.get(self._format_url(path))
 
     def _delete(self, path):
+        import requests
         return requests.delete(self._format_url(path))
 
     @inherit
@@ -171,12 +247,13 @@ class Client_v1(Client):
 
     @inherit
     def get_app(self, name, version):
+        import requests
         try:
             request = self._get('appdef/{}/{}'.format(name, version))
         except requests.exceptions.ConnectionError:
             return None
 
-        document = yaml.safe_load(request.text)
+        document = load_yaml(request.content)
 
         return Application(self, document['name'], str(document['version']))
 
@@ -201,7 +278,7 @@ class Client_v1(Client):
         if request.status_code == 404:
             return []
 
-        data = request.json()
+        data = self._json(request)
         return [Instance(self, name) for name in data['instances']]
 
     @inherit
@@ -237,32 +314,278 @@ class Client_v1(Client):
 class Client_v2(Client):
     """
     Client for the BigBoat v2 API.
+
+    Args:
+        base_url (str): The base URL of the BigBoat instance.
+        api_key (str or callable): The API key to authenticate with, or
+            a reference to it, such as :obj:`EnvironmentKey`, which is
+            called to obtain the key each time a session is created.
+        **kwargs: Additional options of the client, in addition to those of
+            :obj:`Client`:
+            - compose_cache (:obj:`bigboat.cache.ComposeCache`): Persistent
+              cache for compose files retrieved or updated by this client.
+            - validate_compose (bool): Whether to validate compose files
+              locally before uploading them, raising the same errors that the
+              API would report without performing a request.
+            - concurrency (:obj:`bigboat.concurrency.AdaptiveLimiter`):
+              Limiter that adapts the parallelism of bulk operations to the
+              latency and errors of the requests made by this client.
+            - read_cache (:obj:`bigboat.cache.RevalidatingCache`): Cache that
+              returns recent listings of applications and instances without
+              waiting for the API, refreshing them in the background. Updates
+              and deletions through this client invalidate the listings.
+            - negative_cache (:obj:`bigboat.cache.NegativeCache`): Cache of
+              applications and instances that were not found, so that
+              `get_app` and `get_instance` return `None` for them without
+              a request. Creating them through this client removes them from
+              the cache.
+            - batch_window (float): Seconds during which `get_instance` calls
+              from different threads are collected, so that they can be
+              resolved with a single listing of instances. The listing has
+              no parameters or options, so instances that lack them are
+              looked up separately unless `settings=False` is given. By
+              default, each call performs its own request.
+            - batch_min_size (int): The minimum number of instances collected
+              in a window to use the listing for. Defaults to 2.
+            - batch_min_fraction (float): The minimum number of instances
+              collected in a window to use the listing for, as a fraction of
+              the number of instances in the previous listing. Defaults to
+              0.05.
+            - compress_requests (int): The minimum size in bytes of request
+              bodies, such as compose files, to compress with gzip. Compose
+              files that are compressed are validated locally first. If the
+              server rejects the encoding of a compressed body with status
+              415, or with status 400 for a locally validated compose file,
+              the body is sent again without compression and the client
+              stops compressing request bodies once the plain body is
+              accepted. By default, request bodies are not compressed.
+            - metrics (:obj:`bigboat.metrics.TransferMetrics`): Counters of
+              the requests of this client and the bytes of their bodies,
+              before and after compression.
+            - max_sessions (int): The maximum number of idle sessions, and
+              thus kept-alive connections, to keep for later requests.
+              Defaults to 32.
+            - pickle_api_key (bool): Whether a pickled client contains the
+              API key itself when `api_key` is not a reference. By default,
+              such clients cannot be pickled.
+
+    The client is thread-safe. Each request is performed with a session from
+    a pool that is not used by another thread at the same time, so that
+    connections are reused by later requests, including those of later bulk
+    operations, without sharing them between concurrent requests. Caches and
+    the concurrency limiter are shared by all threads. Idle sessions are
+    closed with `close`.
+
+    A reference to the API key is part of the pickled configuration of the
+    client, and the key itself only if `pickle_api_key` is enabled.
     """
 
-    def __init__(self, base_url, api_key):
-        super(Client_v2, self).__init__(base_url)
+    def __init__(self, base_url, api_key, **kwargs):
+        super(Client_v2, self).__init__(base_url, **kwargs)
         self._api_key = api_key
-        self._session = requests.Session()
-        self._session.headers.update({'api-key': self._api_key})
+        self._compose_cache = kwargs.get('compose_cache')
+        self._compose_digests = {}
+        self._validate_compose = kwargs.get('validate_compose', False)
+        self._concurrency = kwargs.get('concurrency')
+        self._read_cache = kwargs.get('read_cache')
+        self._negative_cache = kwargs.get('negative_cache')
+        self._compress_requests = kwargs.get('compress_requests')
+        self._compression_rejected = False
+        self._metrics = kwargs.get('metrics')
+        if kwargs.get('batch_window') is None:
+            self._batcher = None
+        else:
+            self._batcher = LookupBatcher(
+                self._load_instance, lambda: self._load_instances(False),
+                lambda instance: instance.name, kwargs['batch_window'],
+                kwargs.get('batch_min_size', 2),
+                kwargs.get('batch_min_fraction', 0.05)
+            )
+        self._sessions = SessionPool(self._create_session,
+                                     kwargs.get('max_sessions', 32))
+
+    def __getstate__(self):
+        if not callable(self._api_key) and \
+                not self._options.get('pickle_api_key', False):
+            raise TypeError('Pickling a client would embed its API key, use '
+                            'a reference such as EnvironmentKey or enable '
+                            'pickle_api_key')
+
+        state = super(Client_v2, self).__getstate__()
+        state['api_key'] = self._api_key
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(state['base_url'], state['api_key'], **state['options'])
+
+    def _create_session(self):
+        import requests
+        session = requests.Session()
+        api_key = self._api_key
+        if callable(api_key):
+            api_key = api_key()
+
+        session.headers.update({
+            'api-key': api_key,
+            'Accept-Encoding': ACCEPT_ENCODING
+        })
+        return session
+
+    def close(self):
+        """
+        Close the idle sessions of the client and their connections. The
+        client can still be used afterwards.
+        """
+
+        self._sessions.close()
+
+    @property
+    def concurrency(self):
+        """
+        The adaptive concurrency limiter of bulk operations, or `None` if the
+        number of concurrent requests is fixed.
+        """
+
+        return self._concurrency
+
+    @property
+    def metrics(self):
+        """
+        The transfer metrics of the requests of this client, or `None` if they
+        are not measured.
+        """
+
+        return self._metrics
 
     def _format_url(self, path):
         return '{}/api/v2/{}'.format(self._base_url, path)
 
-    def _get(self, path):
-        return self._session.get(self._format_url(path))
+    def _record_response(self, request, raw=None):
+        if self._metrics is None:
+            return
+
+        if raw is None:
+            raw = len(request.content)
+
+        # The underlying response counts the bytes before decoding.
+        tell = getattr(request.raw, 'tell', None)
+        wire = raw if tell is None else tell()
+        encoding = request.headers.get('Content-Encoding', 'identity')
+        self._metrics.record_response(raw, wire,
+                                      compressed=encoding != 'identity')
+
+    def _request(self, method, path, **kwargs):
+        import requests
+        raw_size = kwargs.pop('raw_size', None)
+        start = default_timer()
+        try:
+            with self._sessions.session() as session:
+                request = session.request(method, self._format_url(path),
+                                          **kwargs)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout):
+            if self._concurrency is not None:
+                self._concurrency.record(default_timer() - start, error=True)
+            raise
+
+        if self._concurrency is not None:
+            self._concurrency.record(default_timer() - start,
+                                     error=request.status_code >= 500)
+
+        if self._metrics is not None:
+            wire = int(request.request.headers.get('Content-Length', 0))
+            self._metrics.record_request(
+                wire if raw_size is None else raw_size, wire,
+                compressed=raw_size is not None
+            )
+            if not kwargs.get('stream'):
+                self._record_response(request)
+
+        return request
+
+    def _parallel(self, func, keys, max_workers, errors=(ValueError,)):
+        return parallel(func, keys, max_workers=max_workers, errors=errors,
+                        limiter=self._concurrency)
+
+    def _get(self, path, stream=False):
+        return self._request('GET', path, stream=stream)
+
+    def _read(self, key, load):
+        if self._read_cache is None:
+            return load()
+
+        return list(self._read_cache.get((self._base_url,) + key, load))
+
+    def _is_missing(self, *key):
+        if self._negative_cache is None:
+            return False
+
+        return (self._base_url,) + key in self._negative_cache
+
+    def _missing_generation(self):
+        if self._negative_cache is None:
+            return None
+
+        return self._negative_cache.generation()
+
+    def _set_missing(self, missing, *key, **kwargs):
+        if self._negative_cache is not None:
+            if missing:
+                self._negative_cache.add((self._base_url,) + key,
+                                         kwargs.get('generation'))
+            else:
+                self._negative_cache.discard((self._base_url,) + key)
+
+    def _invalidate(self, *keys):
+        if self._read_cache is not None:
+            for key in keys:
+                self._read_cache.invalidate((self._base_url,) + key)
 
-    def _put(self, path, content_type=None, data=None, json=None):
+    def _compresses(self, data):
+        if self._compress_requests is None or self._compression_rejected or \
+            not isinstance(data, (basestring, bytes)):
+            return False
+
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        return len(data) >= self._compress_requests
+
+    def _put(self, path, content_type=None, data=None, json=None,
+             validated=False):
         headers = {}
         if content_type is not None:
             headers['Content-Type'] = content_type
         elif json is not None:
             headers['Content-Type'] = 'application/json'
 
-        return self._session.put(self._format_url(path), headers=headers,
-                                 data=data, json=json)
+        if self._compresses(data):
+            if not isinstance(data, bytes):
+                data = data.encode('utf-8')
+
+            return self._put_compressed(path, headers, data, validated)
+
+        return self._request('PUT', path, headers=headers, data=data,
+                             json=json)
+
+    def _put_compressed(self, path, headers, data, validated):
+        compressed = dict(headers)
+        compressed['Content-Encoding'] = 'gzip'
+        request = self._request('PUT', path, headers=compressed,
+                                data=gzip_compress(data), raw_size=len(data))
+
+        # A bad request for a body that was validated locally is caused by
+        # the encoding rather than the contents.
+        if request.status_code == UNSUPPORTED_MEDIA_TYPE or \
+            (validated and request.status_code == 400):
+            request = self._request('PUT', path, headers=headers, data=data)
+            if request.status_code not in (400, UNSUPPORTED_MEDIA_TYPE):
+                self._compression_rejected = True
+
+        return request
 
     def _delete(self, path):
-        return self._session.delete(self._format_url(path))
+        return self._request('DELETE', path)
 
     @staticmethod
     def _check_bad_request(request):
@@ -282,35 +605,48 @@ class Client_v2(Client):
     def _format_app(self, app):
         return Application(self, app['name'], app['version'])
 
-    @inherit
-    def apps(self):
+    def _load_apps(self):
         request = self._get('apps')
         self._check_bad_request(request)
-        return [self._format_app(app) for app in request.json()]
+        return [self._format_app(app) for app in self._json(request)]
+
+    @inherit
+    def apps(self):
+        return self._read(('apps',), self._load_apps)
 
     @inherit
     def get_app(self, name, version):
+        if self._is_missing('app', name, version):
+            return None
+
+        generation = self._missing_generation()
         request = self._get('apps/{}/{}'.format(name, version))
         self._check_bad_request(request)
         if request.status_code == 404:
+            self._set_missing(True, 'app', name, version,
+                              generation=generation)
             return None
 
-        return self._format_app(request.json())
+        return self._format_app(self._json(request))
 
     @inherit
     def update_app(self, name, version):
+        import requests
         try:
             request = self._put('apps/{}/{}'.format(name, version))
         except requests.exceptions.ConnectionError:
             return None
 
         self._check_bad_request(request)
-        return self._format_app(request.json())
+        self._invalidate(('apps',))
+        self._set_missing(False, 'app', name, version)
+        return self._format_app(self._json(request))
 
     @inherit
     def delete_app(self, name, version):
         request = self._delete('apps/{}/{}'.format(name, version))
         self._check_bad_request(request)
+        self._invalidate(('apps',))
         if request.status_code == 404:
             return False
 
@@ -331,6 +667,14 @@ class Client_v2(Client):
             definition does not exist.
         """
 
+        if self._compose_cache is not None:
+            content = self._compose_cache.get(self._base_url, name, version,
+                                              file_name)
+            if content is not None:
+                self._compose_digests[(name, version, file_name)] = \
+                    content_hash(content)
+                return content
+
         path = 'apps/{}/{}/files/{}'.format(name, version, file_name)
         request = self._get(path)
         self._check_bad_request(request)
@@ -341,6 +685,12 @@ class Client_v2(Client):
         if content_type not in ('text/plain', 'text/yaml'):
             return None
 
+        self._compose_digests[(name, version, file_name)] = \
+            content_hash(request.text)
+        if self._compose_cache is not None:
+            self._compose_cache.put(self._base_url, name, version, file_name,
+                                    request.text)
+
         return request.text
 
     def update_compose(self, name, version, file_name, content):
@@ -363,8 +713,15 @@ class Client_v2(Client):
             properties that do not match the provided application name/verison.
         """
 
+        # Compressed files are validated so that a bad request indicates that
+        # the server does not accept the compression.
+        validated = self._validate_compose or self._compresses(content)
+        if validated:
+            validate_compose(name, version, file_name, content)
+
         path = 'apps/{}/{}/files/{}'.format(name, version, file_name)
-        request = self._put(path, content_type='text/plain', data=content)
+        request = self._put(path, content_type='text/plain', data=content,
+                            validated=validated)
         self._check_bad_request(request)
         if request.status_code == 404:
             return False
@@ -372,8 +729,200 @@ class Client_v2(Client):
         if request.status_code != 201:
             return False
 
+        self._compose_digests[(name, version, file_name)] = \
+            content_hash(content)
+        if self._compose_cache is not None:
+            self._compose_cache.put(self._base_url, name, version, file_name,
+                                    content)
+
         return True
 
+    def _compose_streamed(self, name, version, file_name, digest):
+        # The compose cache stores complete files, which are not kept in
+        # memory when streaming, so its entry is outdated.
+        self._compose_digests[(name, version, file_name)] = digest
+        if self._compose_cache is not None:
+            self._compose_cache.discard(self._base_url, name, version,
+                                        file_name)
+
+    def download_compose(self, name, version, file_name, target,
+                         chunk_size=CHUNK_SIZE):
+        """
+        Retrieve a docker compose or bigboat compose file for the application
+        and write it to a file in chunks, without holding the whole file in
+        memory.
+
+        Args:
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+            target (str or file): The path of the file to write, or a binary
+                file-like object to write the contents to.
+            chunk_size (int): The number of bytes to write at a time.
+
+        Returns:
+            :obj:`int` or `None`: The number of bytes written, or `None` if the
+            definition or file does not exist, in which case nothing is
+            written.
+        """
+
+        path = 'apps/{}/{}/files/{}'.format(name, version, file_name)
+        request = self._get(path, stream=True)
+        try:
+            self._check_bad_request(request)
+            if request.status_code == 404:
+                return None
+
+            content_type = request.headers.get('content-type')
+            if content_type not in ('text/plain', 'text/yaml'):
+                return None
+
+            digest = hashlib.sha256()
+            size = 0
+            with open_binary(target, 'wb') as stream:
+                for chunk in request.iter_content(chunk_size):
+                    digest.update(chunk)
+                    stream.write(chunk)
+                    size += len(chunk)
+
+            self._record_response(request, size)
+        finally:
+            request.close()
+
+        self._compose_streamed(name, version, file_name, digest.hexdigest())
+        return size
+
+    def upload_compose(self, name, version, file_name, source,
+                       chunk_size=CHUNK_SIZE):
+        """
+        Update a docker compose or bigboat compose file for the application
+        from a file, which is streamed to the API without holding the whole
+        file in memory.
+
+        The file is not validated locally, even if the client validates
+        compose files, since that requires parsing the whole file.
+
+        Args:
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+            source (str or file): The path of the file to upload, or
+                a seekable binary file-like object positioned at the start of
+                the contents.
+            chunk_size (int): The number of bytes to read at a time when
+                calculating the digest of the contents.
+
+        Returns:
+            bool: Whether the compose file was successfully updated.
+
+        Raises:
+            ValueError: When the API reports that the compose file is invalid.
+        """
+
+        path = 'apps/{}/{}/files/{}'.format(name, version, file_name)
+        with open_binary(source, 'rb') as stream:
+            start = stream.tell()
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                digest.update(chunk)
+
+            stream.seek(start)
+            request = self._put(path, content_type='text/plain', data=stream)
+
+        self._check_bad_request(request)
+        if request.status_code != 201:
+            return False
+
+        self._compose_streamed(name, version, file_name, digest.hexdigest())
+        return True
+
+    def sync_compose(self, name, version, file_name, content):
+        """
+        Update a docker compose or bigboat compose file for the application
+        only if its contents differ from the last known contents on the server.
+
+        The last known contents are those most recently retrieved or uploaded
+        by this client, or stored in its compose cache. If neither is known,
+        the file is retrieved from the server to compare against.
+
+        Args:
+            name (str): The name of the application
+            version (str): The version of the application
+            file_name (str): 'dockerCompose' or 'bigboatCompose'
+            content (str): The file contents
+
+        Returns:
+            :obj:`ComposeUpdate`: A named tuple with the properties `success`,
+            whether the compose file on the server has the provided contents,
+            and `uploaded`, whether the contents were uploaded to the server.
+
+        Raises:
+            ValueError: When the compose file could not be parsed as a valid
+            YAML file.
+            ValueError: When the bigboatCompose file contains name or version
+            properties that do not match the provided application name/verison.
+        """
+
+        key = (name, version, file_name)
+        if key not in self._compose_digests:
+            self.get_compose(name, version, file_name)
+
+        if self._compose_digests.get(key) == content_hash(content):
+            return ComposeUpdate(success=True, uploaded=False)
+
+        success = self.update_compose(name, version, file_name, content)
+        return ComposeUpdate(success=success, uploaded=True)
+
+    def get_composes(self, keys, max_workers=DEFAULT_WORKERS,
+                     errors=(ValueError,)):
+        """
+        Retrieve many docker compose or bigboat compose files concurrently.
+
+        Args:
+            keys: Iterable of (name, version, file_name) tuples of the compose
+                files to retrieve.
+            max_workers (int): The maximum number of concurrent requests, if
+                the client has no adaptive concurrency limiter.
+            errors (tuple): Exception classes that are reported in the
+                results instead of being raised, by default only `ValueError`.
+
+        Returns:
+            A generator of :obj:`bigboat.bulk.BulkResult` named tuples, in
+            order of completion. The `key` is the (name, version, file_name)
+            tuple, the `result` is the return value of `get_compose` and the
+            `error` is the `ValueError` raised for a bad request, if any.
+        """
+
+        return self._parallel(lambda key: self.get_compose(*key), keys,
+                              max_workers, errors)
+
+    def update_composes(self, mapping, max_workers=DEFAULT_WORKERS,
+                        skip_unchanged=False, errors=(ValueError,)):
+        """
+        Update many docker compose or bigboat compose files concurrently.
+
+        Args:
+            mapping (dict): Mapping of (name, version, file_name) tuples to the
+                file contents to upload.
+            max_workers (int): The maximum number of concurrent requests, if
+                the client has no adaptive concurrency limiter.
+            skip_unchanged (bool): Whether to use `sync_compose` to avoid
+                uploading files whose contents are unchanged.
+            errors (tuple): Exception classes that are reported in the
+                results instead of being raised, by default only `ValueError`.
+
+        Returns:
+            A generator of :obj:`bigboat.bulk.BulkResult` named tuples, in
+            order of completion. The `key` is the (name, version, file_name)
+            tuple, the `result` is the return value of `update_compose` (or
+            `sync_compose`) and the `error` is the `ValueError` raised for
+            a bad request, such as an invalid YAML file, if any.
+        """
+
+        method = self.sync_compose if skip_unchanged else self.update_compose
+        return self._parallel(lambda key: method(*key, content=mapping[key]),
+                              list(mapping.keys()), max_workers, errors)
+
     def _format_instance(self, instance):
         if 'app' in instance and instance['app']:
             application = self._format_app(instance['app'])
@@ -387,23 +936,80 @@ class Client_v2(Client):
         return Instance(self, instance.get('name'),
                         current_state=state.get('current', 'running'),
                         desired_state=state.get('desired'),
-                        application=application, services=services)
+                        application=application, services=services,
+                        parameters=instance.get('parameters'),
+                        options=instance.get('options'))
 
-    @inherit
-    def instances(self):
+    def instances(self, lazy=False):
+        """
+        Retrieve all live instances from the API.
+
+        Args:
+            lazy (bool): Whether to wrap the data of each instance in
+                a :obj:`bigboat.instance.LazyInstance` which only creates its
+                nested entities when they are accessed, instead of creating
+                them for every instance in the listing.
+
+        Returns:
+            :obj:`list` of :obj:`bigboat.instance.Instance`
+        """
+
+        return self._read(('instances', lazy),
+                          lambda: self._load_instances(lazy))
+
+    def _load_instances(self, lazy):
         request = self._get('instances')
         self._check_bad_request(request)
-        return [self._format_instance(instance) for instance in request.json()]
+        if lazy:
+            return [LazyInstance(self, data) for data in self._json(request)]
 
-    @inherit
-    def get_instance(self, name):
+        return [
+            self._format_instance(instance) for instance in self._json(request)
+        ]
+
+    def _load_instance(self, name):
         request = self._get('instances/{}'.format(name))
         self._check_bad_request(request)
 
         if request.status_code == 404:
             return None
 
-        return self._format_instance(request.json())
+        return self._format_instance(self._json(request))
+
+    def get_instance(self, name, settings=True):
+        """
+        Retrieve a specific live instance from the API.
+
+        Args:
+            name (str): The name of the instance.
+            settings (bool): Whether the instance must have its parameters
+                and options. Lookups that are batched are resolved with the
+                listing of instances, which lacks them, so such instances are
+                looked up separately. Callers that only need the state of the
+                instance can disable this, in which case the parameters and
+                options of batched lookups may be `None`.
+
+        Returns:
+            :obj:`bigboat.instance.Instance` or `None`: The instance
+            if it was found or `None` if the instance does not exist.
+        """
+
+        if self._is_missing('instance', name):
+            return None
+
+        generation = self._missing_generation()
+        if self._batcher is not None:
+            instance = self._batcher.get(name)
+            if settings and instance is not None and \
+                    (instance.parameters is None or instance.options is None):
+                instance = self._load_instance(name)
+        else:
+            instance = self._load_instance(name)
+
+        if instance is None:
+            self._set_missing(True, 'instance', name, generation=generation)
+
+        return instance
 
     @inherit
     def update_instance(self, name, app_name, version, **kwargs):
@@ -416,16 +1022,95 @@ class Client_v2(Client):
         request = self._put('instances/{}'.format(name), json=data)
 
         self._check_bad_request(request)
+        self._invalidate(('instances', False), ('instances', True))
+        self._set_missing(False, 'instance', name)
 
-        return self._format_instance(request.json())
+        return self._format_instance(self._json(request))
 
     @inherit
     def delete_instance(self, name):
         request = self._delete('instances/{}'.format(name))
 
         self._check_bad_request(request)
+        self._invalidate(('instances', False), ('instances', True))
+
+        return self._format_instance(self._json(request))
+
+    def get_instances(self, names, max_workers=DEFAULT_WORKERS,
+                      errors=(ValueError,), settings=True):
+        """
+        Retrieve many live instances concurrently.
+
+        Args:
+            names: Iterable of names of the instances.
+            max_workers (int): The maximum number of concurrent requests, if
+                the client has no adaptive concurrency limiter.
+            errors (tuple): Exception classes that are reported in the
+                results instead of being raised, by default only `ValueError`.
+            settings (bool): Whether the instances must have their parameters
+                and options, see `get_instance`.
+
+        Returns:
+            A generator of :obj:`bigboat.bulk.BulkResult` named tuples, in
+            order of completion. The `key` is the instance name, the `result`
+            is the return value of `get_instance` and the `error` is the
+            `ValueError` raised for a bad request, if any.
+        """
+
+        return self._parallel(lambda name: self.get_instance(name, settings),
+                              names, max_workers, errors)
+
+    def update_instances(self, mapping, max_workers=DEFAULT_WORKERS,
+                         errors=(ValueError,)):
+        """
+        Request many instances to be created concurrently.
+
+        Args:
+            mapping (dict): Mapping of instance names to dictionaries with
+                the 'app' name and 'version' of the application to start and
+                optionally the 'parameters' and 'options' of the instance.
+            max_workers (int): The maximum number of concurrent requests, if
+                the client has no adaptive concurrency limiter.
+            errors (tuple): Exception classes that are reported in the
+                results instead of being raised, by default only `ValueError`.
+
+        Returns:
+            A generator of :obj:`bigboat.bulk.BulkResult` named tuples, in
+            order of completion. The `key` is the instance name, the `result`
+            is the return value of `update_instance` and the `error` is the
+            `ValueError` raised for a bad request, if any.
+        """
+
+        def _update(name):
+            spec = mapping[name]
+            return self.update_instance(name, spec['app'], spec['version'],
+                                        parameters=spec.get('parameters'),
+                                        options=spec.get('options'))
+
+        return self._parallel(_update, list(mapping.keys()), max_workers,
+                              errors)
+
+    def delete_instances(self, names, max_workers=DEFAULT_WORKERS,
+                         errors=(ValueError,)):
+        """
+        Request many instances to be stopped concurrently.
+
+        Args:
+            names: Iterable of names of the instances.
+            max_workers (int): The maximum number of concurrent requests, if
+                the client has no adaptive concurrency limiter.
+            errors (tuple): Exception classes that are reported in the
+                results instead of being raised, by default only `ValueError`.
+
+        Returns:
+            A generator of :obj:`bigboat.bulk.BulkResult` named tuples, in
+            order of completion. The `key` is the instance name, the `result`
+            is the return value of `delete_instance` and the `error` is the
+            `ValueError` raised for a bad request, if any.
+        """
 
-        return self._format_instance(request.json())
+        return self._parallel(self.delete_instance, names, max_workers,
+                              errors)
 
     def statuses(self):
         """
@@ -437,4 +1122,4 @@ class Client_v2(Client):
 
         request = self._get('status')
         self._check_bad_request(request)
-        return request.json()
+        return self._json(request)
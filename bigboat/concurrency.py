@@ -0,0 +1,200 @@
+"""
+Adaptive concurrency control for bulk operations on the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+import threading
+from timeit import default_timer
+
+class AdaptiveLimiter(object):
+    """
+    Concurrency limit that adapts to the observed latency and error rate
+    using additive increase, multiplicative decrease (AIMD).
+
+    Every healthy response increases the limit by `increase` divided by the
+    current limit, so a full window of healthy responses increases it by
+    `increase`. An error, such as a server error or timeout, or a latency
+    spike decreases the limit by the `decrease` factor, at most once per
+    `cooldown` seconds so that the responses to a single overloaded window do
+    not collapse the limit.
+
+    Args:
+        initial (int): The initial concurrency limit.
+        minimum (int): The lowest concurrency limit.
+        maximum (int): The highest concurrency limit.
+        increase (float): The additive increase per window.
+        decrease (float): The multiplicative decrease factor.
+        latency_threshold (float or `None`): Latency in seconds above which
+            a response is considered a spike, or `None` to only compare with
+            the average latency.
+        spike_factor (float): Factor of the average latency of successful
+            responses above which a response is considered a spike.
+        cooldown (float): Seconds between multiplicative decreases.
+    """
+
+    # Number of healthy responses before the average latency is trusted.
+    WARMUP = 5
+    # Weight of a new latency measurement in the average.
+    ALPHA = 0.2
+
+    def __init__(self, initial=4, minimum=1, maximum=64, **kwargs):
+        self._minimum = minimum
+        self._maximum = maximum
+        self._limit = float(min(max(initial, minimum), maximum))
+        self._increase = kwargs.get('increase', 1.0)
+        self._decrease = kwargs.get('decrease', 0.5)
+        self._latency_threshold = kwargs.get('latency_threshold')
+        self._spike_factor = kwargs.get('spike_factor', 3.0)
+        self._cooldown = kwargs.get('cooldown', 1.0)
+
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._average_latency = None
+        self._samples = 0
+        self._last_decrease = None
+
+    @property
+    def limit(self):
+        """
+        The current number of operations that may be performed concurrently.
+        """
+
+        return int(self._limit)
+
+    @property
+    def minimum(self):
+        """
+        The lowest concurrency limit.
+        """
+
+        return self._minimum
+
+    @property
+    def maximum(self):
+        """
+        The highest concurrency limit.
+        """
+
+        return self._maximum
+
+    @property
+    def in_flight(self):
+        """
+        The number of operations that are currently performed.
+        """
+
+        return self._in_flight
+
+    @property
+    def average_latency(self):
+        """
+        The moving average latency of successful responses in seconds, or
+        `None` if there were none.
+        """
+
+        return self._average_latency
+
+    def acquire(self):
+        """
+        Wait until an operation may be performed within the current limit.
+        """
+
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+
+            self._in_flight += 1
+
+    def release(self):
+        """
+        Indicate that an operation is done.
+        """
+
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def _is_spike(self, latency):
+        if self._latency_threshold is not None and \
+            latency > self._latency_threshold:
+            return True
+
+        return self._samples >= self.WARMUP and \
+            latency > self._spike_factor * self._average_latency
+
+    def record(self, latency, error=False):
+        """
+        Adapt the limit to the outcome of a request.
+
+        Args:
+            latency (float): The duration of the request in seconds.
+            error (bool): Whether the request failed due to overload, such as
+                a server error or a timeout.
+        """
+
+        with self._condition:
+            spike = self._is_spike(latency)
+            if not error:
+                # Spikes also count, so that a lasting change in latency
+                # becomes the new baseline.
+                if self._average_latency is None:
+                    self._average_latency = latency
+                else:
+                    self._average_latency += \
+                        self.ALPHA * (latency - self._average_latency)
+
+                self._samples += 1
+
+            if error or spike:
+                now = default_timer()
+                if self._last_decrease is None or \
+                    now - self._last_decrease >= self._cooldown:
+                    self._limit = max(self._minimum,
+                                      self._limit * self._decrease)
+                    self._last_decrease = now
+            else:
+                self._limit = min(self._maximum,
+                                  self._limit + self._increase / self._limit)
+                self._condition.notify_all()
+
+    def __getstate__(self):
+        # The observed latencies and operations in flight are not pickled.
+        return {
+            'initial': self.limit,
+            'minimum': self._minimum,
+            'maximum': self._maximum,
+            'increase': self._increase,
+            'decrease': self._decrease,
+            'latency_threshold': self._latency_threshold,
+            'spike_factor': self._spike_factor,
+            'cooldown': self._cooldown
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __repr__(self):
+        return 'AdaptiveLimiter(limit={}, in_flight={}, minimum={}, ' \
+            'maximum={})'.format(self.limit, self._in_flight, self._minimum,
+                                 self._maximum)
@@ -0,0 +1,418 @@
+"""
+Real-time instance updates through the Meteor DDP protocol of BigBoat.
+
+This module requires the optional `websocket-client` package, unless another
+connection function is provided.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object, str
+import json
+import socket
+import threading
+from .instance import LazyInstance
+from .watch import InstanceTracker, InstanceWatcher
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+class DDPError(IOError):
+    """
+    Error in the communication with a DDP server.
+    """
+
+    pass
+
+def _timeout_errors():
+    if websocket is None:
+        return (socket.timeout,)
+
+    return (socket.timeout, websocket.WebSocketTimeoutException)
+
+def _transport_errors():
+    if websocket is None:
+        return (EnvironmentError,)
+
+    return (EnvironmentError, websocket.WebSocketException)
+
+def websocket_connect(url, timeout):
+    """
+    Open a websocket connection using the `websocket-client` package.
+
+    Args:
+        url (str): The websocket URL.
+        timeout (float): Seconds to wait for a message before `recv` raises
+            a timeout error.
+
+    Returns:
+        A connection object with `send`, `recv` and `close` methods.
+    """
+
+    if websocket is None:
+        raise ImportError('The websocket-client package is required for DDP '
+                          'subscriptions')
+
+    return websocket.create_connection(url, timeout=timeout)
+
+class DDPConnection(object):
+    """
+    Minimal client connection for the Distributed Data Protocol of Meteor.
+
+    Args:
+        url (str): The websocket URL of the DDP server.
+        connect: Callable that opens a websocket connection given the URL and
+            a receive timeout, see :func:`websocket_connect`.
+        timeout (float): Seconds to wait for a message in `receive`.
+    """
+
+    VERSIONS = ['1', 'pre2', 'pre1']
+
+    def __init__(self, url, connect=websocket_connect, timeout=1.0):
+        self._url = url
+        self._connect = connect
+        self._timeout = timeout
+        self._socket = None
+        self._next_id = 0
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        The session identifier provided by the server, or `None` if the
+        connection is not established.
+        """
+
+        return self._session
+
+    def _send(self, message):
+        try:
+            self._socket.send(json.dumps(message))
+        except _transport_errors() as error:
+            raise DDPError('Could not send DDP message: {}'.format(error))
+
+    def _recv(self):
+        try:
+            data = self._socket.recv()
+        except _timeout_errors():
+            return None
+        except _transport_errors() as error:
+            raise DDPError('Could not receive DDP message: {}'.format(error))
+
+        if not data:
+            raise DDPError('DDP connection closed')
+
+        try:
+            return json.loads(data)
+        except ValueError:
+            raise DDPError('Invalid DDP message: {!r}'.format(data))
+
+    def open(self, attempts=10):
+        """
+        Connect to the server and negotiate the protocol version.
+
+        Args:
+            attempts (int): The number of receive timeouts to allow before the
+                server must have accepted the connection.
+        """
+
+        try:
+            self._socket = self._connect(self._url, self._timeout)
+        except _transport_errors() as error:
+            raise DDPError('Could not connect to {}: {}'.format(self._url,
+                                                                error))
+
+        self._send({
+            'msg': 'connect',
+            'version': self.VERSIONS[0],
+            'support': self.VERSIONS
+        })
+        for _ in range(attempts):
+            message = self.receive()
+            if message is None:
+                continue
+            if message.get('msg') == 'connected':
+                self._session = message.get('session')
+                return
+            if message.get('msg') == 'failed':
+                raise DDPError('DDP server requires version {}'.format(
+                    message.get('version')
+                ))
+
+        raise DDPError('DDP server did not accept the connection')
+
+    def subscribe(self, name, params=None):
+        """
+        Subscribe to a publication.
+
+        Returns:
+            str: The identifier of the subscription.
+        """
+
+        self._next_id += 1
+        identifier = str(self._next_id)
+        self._send({
+            'msg': 'sub',
+            'id': identifier,
+            'name': name,
+            'params': list(params or [])
+        })
+        return identifier
+
+    def receive(self):
+        """
+        Receive the next message, answering heartbeats of the server.
+
+        Returns:
+            dict or `None`: The message, or `None` if no message arrived
+            within the timeout.
+        """
+
+        message = self._recv()
+        if message is not None and message.get('msg') == 'ping':
+            pong = {'msg': 'pong'}
+            if 'id' in message:
+                pong['id'] = message['id']
+
+            self._send(pong)
+            return None
+
+        return message
+
+    def close(self):
+        """
+        Close the connection.
+        """
+
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except _transport_errors():
+                pass
+
+            self._socket = None
+            self._session = None
+
+class InstanceSubscription(object):
+    """
+    Subscription to the instances of a BigBoat instance over DDP, which
+    reports the same change events as the polling
+    :obj:`bigboat.watch.InstanceWatcher`.
+
+    When the connection fails, the subscription polls the REST API while it
+    attempts to reconnect and subscribe again with an increasing delay.
+
+    Args:
+        client (:obj:`bigboat.client.Client_v2`): The client of the BigBoat
+            instance, used for the REST fallback and for the entities.
+        **kwargs: Additional options:
+            - url (str): The websocket URL; by default derived from the base
+              URL of the client.
+            - publication (str): The name of the publication of instances.
+              Defaults to 'instances'.
+            - collection (str): The name of the collection of instance
+              documents. Defaults to 'instances'.
+            - params (list): Parameters of the subscription.
+            - connect: Callable that opens a websocket connection, see
+              :func:`websocket_connect`.
+            - fallback_interval (float): Seconds between polls of the REST API
+              while the subscription is unavailable. Defaults to 5.
+            - retry_delay (float): The number of seconds before the first
+              reconnection attempt, which doubles after every failed attempt.
+              Defaults to 1.
+            - max_retry_delay (float): The maximum number of seconds between
+              reconnection attempts. Defaults to 60.
+            - tracker (:obj:`bigboat.watch.InstanceTracker`): The known state
+              of the instances.
+    """
+
+    def __init__(self, client, **kwargs):
+        self._client = client
+        self._url = kwargs.get('url', self._websocket_url(client.base_url))
+        self._publication = kwargs.get('publication', 'instances')
+        self._collection = kwargs.get('collection', 'instances')
+        self._params = kwargs.get('params', [])
+        self._connect = kwargs.get('connect', websocket_connect)
+        self._fallback_interval = kwargs.get('fallback_interval', 5.0)
+        self._retry_delay = kwargs.get('retry_delay', 1.0)
+        self._max_retry_delay = kwargs.get('max_retry_delay', 60.0)
+        tracker = kwargs.get('tracker')
+        self._tracker = InstanceTracker() if tracker is None else tracker
+        self._documents = {}
+        self._subscribed = threading.Event()
+        self._was_subscribed = False
+
+    @staticmethod
+    def _websocket_url(base_url):
+        if base_url.startswith('https://'):
+            url = 'wss://' + base_url[len('https://'):]
+        elif base_url.startswith('http://'):
+            url = 'ws://' + base_url[len('http://'):]
+        else:
+            url = base_url
+
+        return url.rstrip('/') + '/websocket'
+
+    @property
+    def url(self):
+        """
+        The websocket URL of the DDP server.
+        """
+
+        return self._url
+
+    @property
+    def tracker(self):
+        """
+        The known state of the instances.
+        """
+
+        return self._tracker
+
+    @property
+    def subscribed(self):
+        """
+        Whether the subscription is currently active, rather than the REST
+        polling fallback.
+        """
+
+        return self._subscribed.is_set()
+
+    def _instance(self, document):
+        return LazyInstance(self._client, document)
+
+    def _handle(self, message, subscription):
+        kind = message.get('msg')
+        if kind in ('added', 'changed', 'removed') and \
+            message.get('collection') != self._collection:
+            return []
+
+        identifier = message.get('id')
+        if kind == 'added':
+            document = dict(message.get('fields') or {})
+            self._documents[identifier] = document
+            return [self._tracker.update(self._instance(document))]
+        if kind == 'changed':
+            document = dict(self._documents.get(identifier, {}))
+            document.update(message.get('fields') or {})
+            for field in message.get('cleared') or []:
+                document.pop(field, None)
+
+            self._documents[identifier] = document
+            return [self._tracker.update(self._instance(document))]
+        if kind == 'removed':
+            document = self._documents.pop(identifier, {})
+            return [self._tracker.remove(document.get('name'))]
+        if kind == 'ready' and subscription in message.get('subs', []):
+            # Instances that disappeared while not subscribed are removed.
+            self._subscribed.set()
+            names = set(document.get('name')
+                        for document in self._documents.values())
+            current = set(self._tracker.instances().keys())
+            return [self._tracker.remove(name)
+                    for name in sorted(current - names)]
+        if kind == 'nosub' and message.get('id') == subscription:
+            raise DDPError('Subscription to {} failed: {}'.format(
+                self._publication, message.get('error')
+            ))
+        if kind == 'error':
+            raise DDPError('DDP error: {}'.format(message.get('reason')))
+
+        return []
+
+    def listen(self, callback, cancel):
+        """
+        Connect, subscribe and report changes until the connection fails or
+        listening is cancelled.
+
+        Args:
+            callback: Callable that receives each change event.
+            cancel (:obj:`threading.Event`): Event that stops listening.
+
+        Raises:
+            DDPError: When the connection or subscription fails.
+        """
+
+        connection = DDPConnection(self._url, connect=self._connect)
+        self._documents = {}
+        self._was_subscribed = False
+        try:
+            connection.open()
+            subscription = connection.subscribe(self._publication,
+                                                self._params)
+            while not cancel.is_set():
+                message = connection.receive()
+                if message is None:
+                    continue
+
+                for event in self._handle(message, subscription):
+                    if event is not None:
+                        callback(event)
+        finally:
+            self._was_subscribed = self._subscribed.is_set()
+            self._subscribed.clear()
+            connection.close()
+
+    def run(self, callback, cancel=None):
+        """
+        Report changes of instances until cancelled, using the subscription
+        when possible and polling the REST API otherwise. Failures of the
+        polls do not stop reporting changes.
+
+        Args:
+            callback: Callable that receives each
+                :obj:`bigboat.watch.InstanceEvent`.
+            cancel (:obj:`threading.Event` or `None`): Event that stops
+                reporting changes when it is set.
+        """
+
+        if cancel is None:
+            cancel = threading.Event()
+
+        watcher = InstanceWatcher(self._client, tracker=self._tracker)
+        delay = self._retry_delay
+        while not cancel.is_set():
+            try:
+                self.listen(callback, cancel)
+                delay = self._retry_delay
+            except DDPError:
+                if self._was_subscribed:
+                    # The subscription worked before it dropped, so earlier
+                    # failures no longer count towards the delay.
+                    delay = self._retry_delay
+
+                # Poll the REST API until the next reconnection attempt.
+                remaining = delay
+                while not cancel.is_set():
+                    try:
+                        events = watcher.poll()
+                    except (EnvironmentError, ValueError):
+                        # The REST API is often unavailable as well during
+                        # an outage, so keep trying both.
+                        events = []
+
+                    for event in events:
+                        callback(event)
+
+                    if remaining <= 0:
+                        break
+
+                    interval = min(self._fallback_interval, remaining)
+                    cancel.wait(interval)
+                    remaining -= interval
+
+                delay = min(delay * 2, self._max_retry_delay)
@@ -0,0 +1,192 @@
+"""
+Ephemeral environments of instances in the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+import warnings
+from .bulk import parallel, DEFAULT_WORKERS
+from .wait import wait_for_state
+
+# Errors of single instances that do not stop the other instances from being
+# started or stopped.
+ERRORS = (ValueError, EnvironmentError)
+
+class StartError(RuntimeError):
+    """
+    Error raised when not all instances of an environment could be started.
+
+    The `failed` attribute maps the names of the instances that could not be
+    started to the error, or to `None` if the instance failed or did not
+    become running in time.
+    """
+
+    def __init__(self, failed):
+        super(StartError, self).__init__(
+            'Instances failed to start: {}'.format(', '.join(sorted(failed)))
+        )
+        self.failed = failed
+
+class StopError(RuntimeError):
+    """
+    Error raised when not all instances of an environment could be stopped,
+    so that they may still be running.
+
+    The `failed` attribute maps the names of these instances to the error.
+    """
+
+    def __init__(self, failed):
+        super(StopError, self).__init__(
+            'Instances failed to stop: {}'.format(', '.join(sorted(failed)))
+        )
+        self.failed = failed
+
+class Environment(object):
+    """
+    Context manager for a set of instances that are started concurrently when
+    entering the context and are stopped concurrently when leaving it, also
+    when an exception occurs.
+
+    If some instances cannot be stopped when leaving the context, a
+    :obj:`StopError` is raised. When the context is left because of another
+    exception, a `RuntimeWarning` is issued instead, so that the original
+    exception is not replaced.
+
+    Args:
+        client (:obj:`bigboat.client.Client_v2`): The client to manage the
+            instances with.
+        instances (dict): Mapping of instance names to dictionaries with the
+            'app' name and 'version' of the application to start and
+            optionally the 'parameters' and 'options' of the instance.
+        **kwargs: Additional options:
+            - max_workers (int): The maximum number of concurrent requests, if
+              the client has no adaptive concurrency limiter.
+            - wait (bool): Whether to wait until all instances are running.
+              Defaults to `True`.
+            - interval (float): Seconds between polls of the instances.
+            - timeout (float): Seconds to wait for the instances to be running.
+    """
+
+    def __init__(self, client, instances, **kwargs):
+        self._client = client
+        self._specs = dict(instances)
+        self._max_workers = kwargs.get('max_workers', DEFAULT_WORKERS)
+        self._wait = kwargs.get('wait', True)
+        self._interval = kwargs.get('interval', 2.0)
+        self._timeout = kwargs.get('timeout', 300)
+        self._instances = {}
+
+    @property
+    def instances(self):
+        """
+        The started instances.
+
+        Returns:
+            dict: Mapping of instance names to
+            :obj:`bigboat.instance.Instance` objects.
+        """
+
+        return dict(self._instances)
+
+    def _parallel(self, func, names):
+        return parallel(func, names, max_workers=self._max_workers,
+                        errors=ERRORS,
+                        limiter=getattr(self._client, 'concurrency', None))
+
+    def _start(self, name):
+        spec = self._specs[name]
+        return self._client.update_instance(name, spec['app'], spec['version'],
+                                            parameters=spec.get('parameters'),
+                                            options=spec.get('options'))
+
+    def start(self):
+        """
+        Start the instances concurrently and wait until they are running.
+
+        Returns:
+            dict: Mapping of instance names to the started
+            :obj:`bigboat.instance.Instance` objects. If the instances were
+            waited for, the objects describe the running instances.
+
+        Raises:
+            StartError: If any instance could not be started or did not become
+                running. The instances are not stopped.
+        """
+
+        failed = {}
+        for result in self._parallel(self._start, list(self._specs.keys())):
+            if result.error is not None or result.result is None:
+                failed[result.key] = result.error
+            else:
+                self._instances[result.key] = result.result
+
+        if failed:
+            raise StartError(failed)
+
+        if self._wait and self._instances:
+            outcome = wait_for_state(self._client, self._instances.keys(),
+                                     interval=self._interval,
+                                     timeout=self._timeout)
+            if outcome.failed or outcome.pending:
+                raise StartError(dict((name, None) for name in
+                                      outcome.failed | outcome.pending))
+
+            for instance in self._client.instances():
+                if instance.name in self._instances:
+                    self._instances[instance.name] = instance
+
+        return self.instances
+
+    def stop(self):
+        """
+        Stop all instances of the environment concurrently.
+
+        Returns:
+            dict: Mapping of the names of the instances that could not be
+            stopped to the error.
+        """
+
+        failed = {}
+        for result in self._parallel(self._client.delete_instance,
+                                     list(self._specs.keys())):
+            if result.error is not None:
+                failed[result.key] = result.error
+
+        self._instances = {}
+        return failed
+
+    def _teardown(self, raising):
+        failed = self.stop()
+        if not failed:
+            return
+
+        error = StopError(failed)
+        if raising:
+            warnings.warn(str(error), RuntimeWarning)
+        else:
+            raise error
+
+    def __enter__(self):
+        try:
+            return self.start()
+        except BaseException:
+            # Instances that were requested may have been created.
+            self._teardown(True)
+            raise
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._teardown(exc_type is not None)
+        return False
@@ -16,7 +16,9 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from .application import Application
 from .entity import Entity
+from .service import parse_services
 from .utils import readonly
 
 @readonly("name", "current_state", "desired_state", "application", "services",
@@ -37,6 +39,17 @@ class Instance(Entity):
         self._parameters = kwargs.get('parameters')
         self._options = kwargs.get('options')
 
+    def __reduce__(self):
+        state = dict((key, value) for key, value in (
+            ('_desired_state', self._desired_state),
+            ('_application', self._application),
+            ('_services', self._services),
+            ('_parameters', self._parameters),
+            ('_options', self._options)
+        ) if value is not None)
+        return (self.__class__, (self.client, self._name, self._current_state),
+                state)
+
     def update(self):
         """
         Request the instance to be created with a desired state of 'running'.
@@ -57,6 +70,17 @@ class Instance(Entity):
 
         return self.client.delete_instance(self.name)
 
+    def get_services(self):
+        """
+        Retrieve typed representations of the services of the instance.
+
+        Returns:
+            :obj:`list` of :obj:`bigboat.service.Service`: The services,
+            sorted by name.
+        """
+
+        return parse_services(self.name, self.services)
+
     def __repr__(self):
         parts = [
             ('name', self.name),
@@ -70,3 +94,83 @@ class Instance(Entity):
         properties = ['{}={!r}'.format(key, value) for (key, value) in parts]
 
         return 'Instance({})'.format(', '.join(properties))
+
+class LazyInstance(Instance):
+    """
+    A deployed application instance entity that wraps the decoded data from
+    the BigBoat v2 API, creating nested entities only when they are accessed.
+    """
+
+    def __init__(self, client, data):
+        # pylint: disable=super-init-not-called,non-parent-init-called
+        Entity.__init__(self, client)
+        self._data = data
+
+    def __reduce__(self):
+        # Nested entities are created again when they are accessed.
+        return (self.__class__, (self.client, self._data))
+
+    @property
+    def name(self):
+        """
+        The name of the instance.
+        """
+
+        return self._data.get('name')
+
+    @property
+    def current_state(self):
+        """
+        The current state of the instance.
+        """
+
+        return self._data.get('state', {}).get('current', 'running')
+
+    @property
+    def desired_state(self):
+        """
+        The desired state of the instance.
+        """
+
+        return self._data.get('state', {}).get('desired')
+
+    @property
+    def application(self):
+        """
+        The application definition of the instance, or `None` if it is
+        not known.
+        """
+
+        if '_application' not in self.__dict__:
+            app = self._data.get('app')
+            if app:
+                self._application = Application(self.client, app['name'],
+                                                app['version'])
+            else:
+                self._application = None
+
+        return self._application
+
+    @property
+    def services(self):
+        """
+        The services of the instance.
+        """
+
+        return self._data.get('services')
+
+    @property
+    def parameters(self):
+        """
+        The parameters of the instance.
+        """
+
+        return self._data.get('parameters')
+
+    @property
+    def options(self):
+        """
+        The options of the instance.
+        """
+
+        return self._data.get('options')
@@ -0,0 +1,110 @@
+"""
+Metrics of the data transferred by clients of the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+from collections import namedtuple
+import threading
+
+TransferStats = namedtuple('TransferStats', [
+    'requests', 'compressed_requests', 'compressed_responses', 'sent_raw',
+    'sent_wire', 'received_raw', 'received_wire'
+])
+
+class TransferMetrics(object):
+    """
+    Thread-safe counters of the requests performed by a client and of the
+    bytes of their bodies, both before compression (raw) and as transferred
+    over the network (wire).
+
+    Only the counters of one process are kept; pickled metrics start without
+    any counts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * len(TransferStats._fields)
+
+    def __getstate__(self):
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    def _add(self, **counts):
+        with self._lock:
+            for field, count in counts.items():
+                self._counts[TransferStats._fields.index(field)] += count
+
+    def record_request(self, raw, wire, compressed=False):
+        """
+        Register a request that was sent.
+
+        Args:
+            raw (int): The number of bytes of the request body before
+                compression.
+            wire (int): The number of bytes of the request body that were
+                sent.
+            compressed (bool): Whether the request body was compressed.
+        """
+
+        self._add(requests=1, compressed_requests=int(compressed),
+                  sent_raw=raw, sent_wire=wire)
+
+    def record_response(self, raw, wire, compressed=False):
+        """
+        Register a response that was received.
+
+        Args:
+            raw (int): The number of bytes of the decoded response body.
+            wire (int): The number of bytes of the response body that were
+                received.
+            compressed (bool): Whether the response body was compressed.
+        """
+
+        self._add(compressed_responses=int(compressed), received_raw=raw,
+                  received_wire=wire)
+
+    def stats(self):
+        """
+        Retrieve the current counts.
+
+        Returns:
+            :obj:`TransferStats`: Named tuple with the number of `requests`,
+            the number of `compressed_requests` and `compressed_responses`,
+            and the `sent_raw`, `sent_wire`, `received_raw` and
+            `received_wire` bytes of the bodies.
+        """
+
+        with self._lock:
+            return TransferStats(*self._counts)
+
+    def reset(self):
+        """
+        Set all counts to zero.
+        """
+
+        with self._lock:
+            self._counts = [0] * len(TransferStats._fields)
+
+    def __repr__(self):
+        stats = self.stats()
+        return 'TransferMetrics(requests={}, sent_raw={}, sent_wire={}, ' \
+            'received_raw={}, received_wire={})'.format(
+                stats.requests, stats.sent_raw, stats.sent_wire,
+                stats.received_raw, stats.received_wire
+            )
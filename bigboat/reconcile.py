@@ -0,0 +1,390 @@
+"""
+Reconciliation of a BigBoat instance with a desired state specification.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from __future__ import print_function
+from builtins import str, object
+import sys
+from .bulk import parallel, DEFAULT_WORKERS
+from .utils import basestring, load_yaml
+
+COMPOSE_FILES = ('dockerCompose', 'bigboatCompose')
+
+def _check_versions(spec, key):
+    items = spec.get(key) or []
+    if not isinstance(items, list):
+        raise ValueError('Specification {} must be a list'.format(key))
+
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('Items of specification {} must be '
+                             'mappings'.format(key))
+
+        # YAML parses an unquoted version such as 1.10 as the number 1.1.
+        version = item.get('version')
+        if version is not None and not isinstance(version, basestring):
+            raise ValueError('Version {!r} of {} must be quoted as a string '
+                             'in the specification'.format(version,
+                                                           item.get('name')))
+
+def load_spec(path):
+    """
+    Read a desired state specification from a YAML file.
+
+    The specification is a mapping with an `apps` list, whose items have
+    `name` and `version` keys and optional `dockerCompose` and `bigboatCompose`
+    file contents, and an `instances` list, whose items have `name`, `app`
+    and `version` keys and optional `parameters` and `options` mappings.
+    Versions must be strings, so versions that YAML parses as numbers must be
+    quoted.
+
+    Args:
+        path (str): The path to the specification file.
+
+    Returns:
+        dict: The specification.
+
+    Raises:
+        ValueError: If the specification is not a mapping or contains
+            a version that is not a string.
+    """
+
+    with open(path, 'rb') as spec_file:
+        spec = load_yaml(spec_file)
+
+    if spec is None:
+        return {}
+    if not isinstance(spec, dict):
+        raise ValueError('Specification must be a mapping')
+
+    _check_versions(spec, 'apps')
+    _check_versions(spec, 'instances')
+    return spec
+
+class Operation(object):
+    """
+    A single API call that brings the BigBoat instance closer to the
+    desired state.
+
+    Operations in a lower stage must be performed before those in a higher
+    stage, since the latter may depend on the former.
+    """
+
+    STAGES = {
+        'update_app': 0,
+        'delete_instance': 0,
+        'update_compose': 1,
+        'update_instance': 2
+    }
+
+    def __init__(self, method, *args, **kwargs):
+        self._method = method
+        self._args = args
+        self._kwargs = kwargs
+
+    @property
+    def method(self):
+        """
+        The name of the client method that performs the operation.
+        """
+
+        return self._method
+
+    @property
+    def args(self):
+        """
+        The positional arguments of the client method.
+        """
+
+        return self._args
+
+    @property
+    def stage(self):
+        """
+        The dependency stage of the operation.
+        """
+
+        return self.STAGES[self._method]
+
+    def apply(self, client):
+        """
+        Perform the operation using a client.
+
+        Returns:
+            The return value of the client method.
+        """
+
+        return getattr(client, self._method)(*self._args, **self._kwargs)
+
+    def __repr__(self):
+        # Leave out the potentially long compose file contents.
+        args = self._args[:3] if self._method == 'update_compose' else self._args
+        parts = [repr(arg) for arg in args]
+        parts.extend('{}={!r}'.format(key, value)
+                     for key, value in sorted(self._kwargs.items()))
+        return '{}({})'.format(self._method, ', '.join(parts))
+
+class Plan(object):
+    """
+    An ordered collection of operations to reconcile a BigBoat instance.
+    """
+
+    def __init__(self, operations, read_calls=0):
+        self._operations = sorted(operations, key=lambda op: (op.stage,
+                                                              op.method,
+                                                              op.args[:3]))
+        self._read_calls = read_calls
+
+    @property
+    def operations(self):
+        """
+        The operations in order of their stages, methods and arguments.
+        """
+
+        return list(self._operations)
+
+    @property
+    def read_calls(self):
+        """
+        The number of API calls that were made to determine the plan.
+        """
+
+        return self._read_calls
+
+    @property
+    def api_calls(self):
+        """
+        The number of API calls that executing the plan performs.
+        """
+
+        return len(self._operations)
+
+    def stages(self):
+        """
+        Group the operations by their stage.
+
+        Returns:
+            :obj:`list` of :obj:`list` of :obj:`Operation`: Operations for
+            each stage that has operations, in order.
+        """
+
+        stages = []
+        for operation in self._operations:
+            if not stages or stages[-1][0].stage != operation.stage:
+                stages.append([])
+
+            stages[-1].append(operation)
+
+        return stages
+
+    def describe(self):
+        """
+        Describe the plan in human-readable lines.
+
+        Returns:
+            :obj:`list` of :obj:`str`: The description.
+        """
+
+        lines = []
+        for index, stage in enumerate(self.stages()):
+            lines.append('Stage {}:'.format(index + 1))
+            lines.extend('  {!r}'.format(operation) for operation in stage)
+
+        lines.append('API calls: {} to plan, {} to execute'.format(
+            self._read_calls, self.api_calls
+        ))
+        return lines
+
+    def __len__(self):
+        return len(self._operations)
+
+class Reconciler(object):
+    """
+    Engine that determines and performs the minimal set of API calls that
+    make a BigBoat instance match a desired state specification.
+
+    Args:
+        client (:obj:`bigboat.client.Client_v2`): The client of the instance.
+        spec (dict): The desired state, see :func:`load_spec`.
+        prune (bool): Whether to delete instances that are not in the
+            specification.
+        max_workers (int): The maximum number of concurrent API calls, if
+            the client has no adaptive concurrency limiter.
+    """
+
+    def __init__(self, client, spec, prune=False, max_workers=DEFAULT_WORKERS):
+        self._client = client
+        self._apps = spec.get('apps') or []
+        self._instances = spec.get('instances') or []
+        self._prune = prune
+        self._max_workers = max_workers
+        self._limiter = getattr(client, 'concurrency', None)
+
+    @staticmethod
+    def _compose_files(app):
+        for file_name in COMPOSE_FILES:
+            if app.get(file_name) is not None:
+                yield file_name, app[file_name]
+
+    def _plan_apps(self, current_apps):
+        operations = []
+        fetch_keys = []
+        for app in self._apps:
+            name = app['name']
+            version = str(app['version'])
+            exists = (name, version) in current_apps
+            if not exists:
+                operations.append(Operation('update_app', name, version))
+
+            for file_name, content in self._compose_files(app):
+                if exists:
+                    fetch_keys.append((name, version, file_name))
+                else:
+                    operations.append(Operation('update_compose', name, version,
+                                                file_name, content))
+
+        return operations, fetch_keys
+
+    def _plan_composes(self, fetch_keys):
+        desired = {}
+        for app in self._apps:
+            for file_name, content in self._compose_files(app):
+                desired[(app['name'], str(app['version']), file_name)] = content
+
+        operations = []
+        results = parallel(lambda key: self._client.get_compose(*key),
+                           fetch_keys, max_workers=self._max_workers,
+                           limiter=self._limiter)
+        for result in sorted(results):
+            if result.result != desired[result.key]:
+                args = result.key + (desired[result.key],)
+                operations.append(Operation('update_compose', *args))
+
+        return operations
+
+    @staticmethod
+    def _differs(instance, spec):
+        if instance.desired_state not in (None, 'running'):
+            return True
+
+        application = instance.application
+        if application is None or \
+            (application.name, str(application.version)) != \
+            (spec['app'], str(spec['version'])):
+            return True
+
+        # Only compare properties that the API reports.
+        for key in ('parameters', 'options'):
+            current = getattr(instance, key)
+            if current is not None and current != (spec.get(key) or {}):
+                return True
+
+        return False
+
+    def _plan_instances(self, current_instances):
+        operations = []
+        names = set()
+        for spec in self._instances:
+            name = spec['name']
+            names.add(name)
+            instance = current_instances.get(name)
+            if instance is None or self._differs(instance, spec):
+                operations.append(Operation('update_instance', name,
+                                            spec['app'], str(spec['version']),
+                                            parameters=spec.get('parameters') or {},
+                                            options=spec.get('options') or {}))
+
+        if self._prune:
+            for name in sorted(set(current_instances.keys()) - names):
+                if current_instances[name].desired_state != 'stopped':
+                    operations.append(Operation('delete_instance', name))
+
+        return operations
+
+    def plan(self):
+        """
+        Determine the operations to reconcile the BigBoat instance with the
+        desired state, based on its current application definitions,
+        compose files and instances.
+
+        Returns:
+            :obj:`Plan`: The plan.
+        """
+
+        current_apps = set((app.name, str(app.version))
+                           for app in self._client.apps())
+        current_instances = dict((instance.name, instance)
+                                 for instance in self._client.instances())
+
+        operations, fetch_keys = self._plan_apps(current_apps)
+        operations.extend(self._plan_composes(fetch_keys))
+        operations.extend(self._plan_instances(current_instances))
+
+        return Plan(operations, read_calls=2 + len(fetch_keys))
+
+    def execute(self, plan):
+        """
+        Perform the operations of a plan, stage by stage. Operations within
+        a stage are performed concurrently. When an operation of a stage
+        fails, the later stages are not performed.
+
+        Args:
+            plan (:obj:`Plan`): The plan to execute.
+
+        Returns:
+            :obj:`list` of :obj:`bigboat.bulk.BulkResult`: The results of the
+            performed operations, with the :obj:`Operation` as key. An
+            operation failed if its `error` is set or its `result` is falsy.
+        """
+
+        results = []
+        for stage in plan.stages():
+            stage_results = list(parallel(lambda op: op.apply(self._client),
+                                          stage, max_workers=self._max_workers,
+                                          limiter=self._limiter))
+            results.extend(stage_results)
+            if any(result.error is not None or not result.result
+                   for result in stage_results):
+                break
+
+        return results
+
+    def run(self, dry_run=False, out=None):
+        """
+        Plan and, unless this is a dry run, execute the reconciliation.
+
+        Args:
+            dry_run (bool): Whether to only print the plan.
+            out (file): The stream to print the plan to, by default the
+                standard output.
+
+        Returns:
+            :obj:`list` of :obj:`bigboat.bulk.BulkResult`: The results of the
+            performed operations.
+        """
+
+        if out is None:
+            out = sys.stdout
+
+        plan = self.plan()
+        for line in plan.describe():
+            print(line, file=out)
+
+        if dry_run:
+            return []
+
+        return self.execute(plan)
@@ -0,0 +1,209 @@
+"""
+Rolling upgrades of application instances in the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object, str
+from collections import namedtuple
+import threading
+from .bulk import parallel
+from .wait import wait_for_state
+
+UpgradeResult = namedtuple('UpgradeResult',
+                           ['upgraded', 'failed', 'pending', 'aborted'])
+
+class RollingUpgrade(object):
+    """
+    Operation that re-points instances of an application to a new version in
+    batches, waiting for each batch to be running before continuing.
+
+    Args:
+        client (:obj:`bigboat.client.Client`): The client to upgrade with.
+        application (:obj:`bigboat.application.Application`): The application
+            whose instances are upgraded. Only instances of its version are
+            upgraded, unless `all_versions` is enabled.
+        version (str): The new version of the application.
+        **kwargs: Additional options:
+            - instances (list): Names of the instances to upgrade, instead of
+              all instances of the application.
+            - all_versions (bool): Whether to upgrade the instances of every
+              version of the application other than the new version, which
+              may downgrade instances of newer versions. Defaults to `False`.
+            - settings (dict): Mapping of instance names to dictionaries with
+              the 'parameters' and 'options' to start the new version with.
+              Other instances keep the parameters and options from the
+              listing of instances.
+            - max_in_flight (int): The number of instances that are upgraded
+              at the same time. Defaults to 5.
+            - max_failures (int): The number of failed instances that is
+              tolerated before the upgrade stops. Defaults to 0.
+            - on_failure (str): What to do when there are more failures:
+              'abort' (the default) stops the upgrade and 'pause' waits until
+              another thread calls `resume` or `abort`.
+            - interval (float): Seconds between polls of the instances.
+            - timeout (float): Seconds to wait for a batch to be running.
+    """
+
+    def __init__(self, client, application, version, **kwargs):
+        self._client = client
+        self._application = application
+        self._version = str(version)
+        self._names = kwargs.get('instances')
+        self._all_versions = kwargs.get('all_versions', False)
+        self._settings = kwargs.get('settings') or {}
+        self._max_in_flight = kwargs.get('max_in_flight', 5)
+        self._max_failures = kwargs.get('max_failures', 0)
+        self._on_failure = kwargs.get('on_failure', 'abort')
+        self._interval = kwargs.get('interval', 2.0)
+        self._timeout = kwargs.get('timeout', 300)
+
+        self._running = threading.Event()
+        self._running.set()
+        self._aborted = threading.Event()
+
+    def pause(self):
+        """
+        Pause the upgrade before its next batch.
+        """
+
+        self._running.clear()
+
+    def resume(self):
+        """
+        Resume a paused upgrade.
+        """
+
+        self._running.set()
+
+    def abort(self):
+        """
+        Stop the upgrade before its next batch, or stop waiting for the
+        current batch.
+        """
+
+        self._aborted.set()
+        self._running.set()
+
+    @property
+    def paused(self):
+        """
+        Whether the upgrade is paused.
+        """
+
+        return not self._running.is_set()
+
+    def _targets(self):
+        instances = []
+        names = None if self._names is None else set(self._names)
+        for instance in self._client.instances():
+            application = instance.application
+            if names is not None and instance.name not in names:
+                continue
+            if application is None or \
+                application.name != self._application.name or \
+                str(application.version) == self._version:
+                continue
+            if not self._all_versions and \
+                str(application.version) != str(self._application.version):
+                continue
+
+            instances.append(instance)
+
+        return sorted(instances, key=lambda instance: instance.name)
+
+    def _setting(self, instance, key):
+        if key in self._settings.get(instance.name, {}):
+            return self._settings[instance.name][key]
+
+        return getattr(instance, key)
+
+    def _check_settings(self, targets):
+        # Starting an instance without its parameters would erase them.
+        unknown = [instance.name for instance in targets
+                   if self._setting(instance, 'parameters') is None or
+                   self._setting(instance, 'options') is None]
+        if unknown:
+            raise ValueError('Parameters and options of instances are '
+                             'unknown, provide them as settings: {}'.format(
+                                 ', '.join(unknown)
+                             ))
+
+    def _update(self, instance):
+        return self._client.update_instance(
+            instance.name, self._application.name, self._version,
+            parameters=self._setting(instance, 'parameters'),
+            options=self._setting(instance, 'options')
+        )
+
+    def _upgrade_batch(self, batch):
+        started = []
+        failed = set()
+        for result in parallel(self._update, batch,
+                               max_workers=len(batch)):
+            if result.error is None and result.result is not None:
+                started.append(result.key.name)
+            else:
+                failed.add(result.key.name)
+
+        wait = wait_for_state(self._client, started, 'running',
+                              interval=self._interval, timeout=self._timeout,
+                              cancel=self._aborted, version=self._version)
+        return wait.reached, failed | wait.failed, wait.pending
+
+    def run(self):
+        """
+        Perform the upgrade.
+
+        Returns:
+            :obj:`UpgradeResult`: Named tuple with sets of instance names that
+            were `upgraded` and are running, that `failed` to upgrade or to
+            reach the running state, and whose upgrade is still `pending`
+            (not started or not yet running), and whether the upgrade was
+            `aborted`.
+
+        Raises:
+            ValueError: If the parameters or options of an instance to upgrade
+                are neither provided as settings nor known from the listing
+                of instances. No instances are upgraded in that case.
+        """
+
+        targets = self._targets()
+        self._check_settings(targets)
+        upgraded = set()
+        failed = set()
+        pending = set(instance.name for instance in targets)
+        for start in range(0, len(targets), self._max_in_flight):
+            self._running.wait()
+            if self._aborted.is_set():
+                break
+
+            batch = targets[start:start + self._max_in_flight]
+            reached, batch_failed, batch_pending = self._upgrade_batch(batch)
+            upgraded |= reached
+            failed |= batch_failed
+            pending -= reached | batch_failed
+            if batch_pending and not self._aborted.is_set():
+                # Timed out while waiting for the batch.
+                failed |= batch_pending
+                pending -= batch_pending
+
+            if len(failed) > self._max_failures:
+                if self._on_failure == 'pause':
+                    self.pause()
+                else:
+                    self.abort()
+
+        return UpgradeResult(upgraded, failed, pending, self._aborted.is_set())
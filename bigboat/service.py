@@ -0,0 +1,161 @@
+"""
+Services of instances and fleet-wide service health from the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+from collections import namedtuple, Counter
+
+Service = namedtuple('Service', ['instance', 'name', 'state'])
+
+# Service states that do not indicate a problem.
+OK_STATES = frozenset(['running', 'created', 'pulling', 'starting',
+                       'stopping', 'stopped'])
+
+def _state(data):
+    if isinstance(data, dict):
+        return data.get('state')
+
+    return None
+
+def parse_services(instance_name, services):
+    """
+    Parse the services of an instance from the BigBoat v2 API.
+
+    Args:
+        instance_name (str): The name of the instance.
+        services (dict or `None`): The services of the instance, as found in
+            its `services` property.
+
+    Returns:
+        :obj:`list` of :obj:`Service`: Named tuples with the `instance` name,
+        the service `name` and the service `state`, sorted by service name.
+    """
+
+    if not services:
+        return []
+
+    return [Service(instance_name, name, _state(data))
+            for name, data in sorted(services.items())]
+
+class FleetHealth(object):
+    """
+    Aggregated health of the services of many instances.
+
+    The aggregation is performed in a single pass over a listing of
+    instances. Only services that are failing are kept as :obj:`Service`
+    objects; other services are only counted.
+
+    Args:
+        instances: Iterable of :obj:`bigboat.instance.Instance` objects, such
+            as the result of `Client_v2.instances(lazy=True)`.
+        ok_states: Service states that are not considered to be failing.
+    """
+
+    def __init__(self, instances, ok_states=OK_STATES):
+        self._service_states = Counter()
+        self._instance_states = Counter()
+        self._failing = {}
+        self._instances = 0
+
+        for instance in instances:
+            self._instances += 1
+            self._instance_states[instance.current_state] += 1
+            services = instance.services
+            if not services:
+                continue
+
+            failing = None
+            for name, data in services.items():
+                state = _state(data)
+                self._service_states[state] += 1
+                if state not in ok_states:
+                    if failing is None:
+                        failing = self._failing_list(instance)
+
+                    failing.append(Service(instance.name, name, state))
+
+    def _failing_list(self, instance):
+        application = instance.application
+        if application is None:
+            key = (None, None)
+        else:
+            key = (application.name, application.version)
+
+        return self._failing.setdefault(key, [])
+
+    @property
+    def instances(self):
+        """
+        The number of aggregated instances.
+        """
+
+        return self._instances
+
+    @property
+    def service_states(self):
+        """
+        The number of services in each state.
+
+        Returns:
+            :obj:`collections.Counter`: Counts keyed by service state.
+        """
+
+        return Counter(self._service_states)
+
+    @property
+    def instance_states(self):
+        """
+        The number of instances in each current state.
+
+        Returns:
+            :obj:`collections.Counter`: Counts keyed by instance state.
+        """
+
+        return Counter(self._instance_states)
+
+    def failing(self, name=None, version=None):
+        """
+        Retrieve the failing services.
+
+        Args:
+            name (str or `None`): Only return services of instances of the
+                application with this name.
+            version (str or `None`): Only return services of instances of the
+                application with this version.
+
+        Returns:
+            dict: Mapping of (application name, version) tuples to lists of
+            failing :obj:`Service` objects. Instances without application
+            information are listed under (`None`, `None`).
+        """
+
+        return dict(
+            (key, list(services)) for key, services in self._failing.items()
+            if (name is None or key[0] == name) and
+            (version is None or key[1] == version)
+        )
+
+    def failing_instances(self):
+        """
+        The names of the instances that have failing services.
+
+        Returns:
+            set: The instance names.
+        """
+
+        return set(service.instance for services in self._failing.values()
+                   for service in services)
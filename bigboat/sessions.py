@@ -0,0 +1,97 @@
+"""
+Pool of HTTP sessions that are shared by the threads of a client.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+from contextlib import contextmanager
+import threading
+
+class SessionPool(object):
+    """
+    Bounded pool of sessions, each of which is used by one thread at a time.
+
+    A thread that performs a request takes an idle session from the pool, or
+    creates a new one if none are idle, and returns it afterwards. Sessions
+    and their connections are therefore reused by later requests, also from
+    other threads such as those of later bulk operations. At most `max_idle`
+    sessions are kept; sessions returned to a full pool are closed.
+
+    Args:
+        factory: Callable that creates a new session.
+        max_idle (int): The maximum number of idle sessions to keep.
+    """
+
+    def __init__(self, factory, max_idle=32):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @property
+    def idle(self):
+        """
+        The number of idle sessions in the pool.
+        """
+
+        return len(self._idle)
+
+    def acquire(self):
+        """
+        Take an idle session from the pool, or create a new session.
+        """
+
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+
+        return self._factory()
+
+    def release(self, session):
+        """
+        Return a session to the pool, or close it if the pool is full.
+        """
+
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(session)
+                return
+
+        session.close()
+
+    @contextmanager
+    def session(self):
+        """
+        Use a session of the pool within a context.
+        """
+
+        session = self.acquire()
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def close(self):
+        """
+        Close all idle sessions.
+        """
+
+        with self._lock:
+            idle = self._idle
+            self._idle = []
+
+        for session in idle:
+            session.close()
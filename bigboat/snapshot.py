@@ -0,0 +1,375 @@
+"""
+Export and import of the full state of a BigBoat instance.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object, str
+from collections import namedtuple
+import gzip
+import io
+import json
+import os
+import time
+from .bulk import parallel, DEFAULT_WORKERS
+from .reconcile import COMPOSE_FILES
+
+SnapshotProgress = namedtuple('SnapshotProgress',
+                              ['stage', 'completed', 'failed', 'skipped'])
+SnapshotFailure = namedtuple('SnapshotFailure', ['stage', 'key', 'error'])
+
+FORMAT_VERSION = 1
+
+# The stages of an export and import, in the order of the records.
+STAGES = ('app', 'compose', 'instance')
+
+# The number of records of a stage that are imported concurrently at a time.
+CHUNK_SIZE = 256
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+
+    return io.open(path, mode, encoding='utf-8')
+
+def _key(record):
+    if record['type'] == 'app':
+        return '{}/{}'.format(record['name'], record['version'])
+    if record['type'] == 'compose':
+        return '{}/{}/{}'.format(record['name'], record['version'],
+                                 record['file_name'])
+
+    return record['name']
+
+class _Tracker(object):
+    """
+    Counter of the completed, failed and skipped records of each stage, which
+    reports progress and collects failures.
+    """
+
+    def __init__(self, progress):
+        self._progress = progress
+        self._counts = dict((stage, [0, 0, 0]) for stage in STAGES)
+        self.failures = []
+
+    def count(self, stage, index):
+        counts = self._counts[stage]
+        counts[index] += 1
+        if self._progress is not None:
+            self._progress(SnapshotProgress(stage, *counts))
+
+    def completed(self, stage):
+        self.count(stage, 0)
+
+    def failed(self, stage, key, error):
+        self.failures.append(SnapshotFailure(stage, key, error))
+        self.count(stage, 1)
+
+    def skipped(self, stage):
+        self.count(stage, 2)
+
+def _unknown_settings(name):
+    return ValueError('Parameters and options of instance {} are unknown, '
+                      'provide them as settings'.format(name))
+
+class _Writer(object):
+    """
+    Writer of compact JSON Lines records.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, record):
+        self._stream.write(json.dumps(record, sort_keys=True,
+                                      separators=(',', ':')))
+        self._stream.write(u'\n')
+
+def _instance_settings(client, instances, settings, max_workers):
+    # The listing of instances has no parameters or options, so these are
+    # taken from the settings or else retrieved per instance.
+    found = dict((instance.name, {
+        'parameters': instance.parameters,
+        'options': instance.options
+    }) for instance in instances)
+    for name, setting in settings.items():
+        if name in found:
+            found[name].update(setting)
+
+    missing = [name for name, setting in found.items()
+               if setting['parameters'] is None or setting['options'] is None]
+    errors = {}
+    for result in client.get_instances(missing, max_workers=max_workers):
+        if result.error is not None:
+            errors[result.key] = result.error
+        elif result.result is not None:
+            setting = found[result.key]
+            if setting['parameters'] is None:
+                setting['parameters'] = result.result.parameters
+            if setting['options'] is None:
+                setting['options'] = result.result.options
+
+    return found, errors
+
+def export_snapshot(client, path, max_workers=DEFAULT_WORKERS, progress=None,
+                    settings=None):
+    """
+    Write the application definitions, their compose files and the instances
+    of a BigBoat instance to a snapshot file.
+
+    The snapshot is a JSON Lines file, which is compressed with gzip if the
+    path ends in '.gz'. Records are written as soon as they are retrieved, and
+    compose files are retrieved concurrently. The listing of instances has no
+    parameters or options, so these are retrieved for each instance unless
+    they are provided in `settings`. Instances whose parameters or options
+    remain unknown are not exported, since importing them would start them
+    without their parameters.
+
+    Args:
+        client (:obj:`bigboat.client.Client_v2`): The client to export with.
+        path (str): The path of the snapshot file to write.
+        max_workers (int): The maximum number of concurrent requests, if the
+            client has no adaptive concurrency limiter.
+        progress: Callable that receives a :obj:`SnapshotProgress` named tuple
+            after each record.
+        settings (dict): Mapping of instance names to dictionaries with the
+            'parameters' and 'options' of the instance.
+
+    Returns:
+        :obj:`list` of :obj:`SnapshotFailure`: The compose files that could
+        not be retrieved and the instances whose parameters or options are
+        unknown.
+    """
+
+    tracker = _Tracker(progress)
+    with _open(path, 'w') as stream:
+        writer = _Writer(stream)
+        writer.write({'type': 'header', 'format': FORMAT_VERSION,
+                      'url': client.base_url, 'time': time.time()})
+
+        apps = client.apps()
+        for app in apps:
+            writer.write({'type': 'app', 'name': app.name,
+                          'version': app.version})
+            tracker.completed('app')
+
+        keys = [(app.name, app.version, file_name)
+                for app in apps for file_name in COMPOSE_FILES]
+        for result in client.get_composes(keys, max_workers=max_workers):
+            name, version, file_name = result.key
+            if result.error is not None:
+                tracker.failed('compose', '/'.join(result.key), result.error)
+            elif result.result is None:
+                tracker.skipped('compose')
+            else:
+                writer.write({'type': 'compose', 'name': name,
+                              'version': version, 'file_name': file_name,
+                              'content': result.result})
+                tracker.completed('compose')
+
+        instances = []
+        for instance in client.instances(lazy=True):
+            if instance.application is None:
+                tracker.skipped('instance')
+            else:
+                instances.append(instance)
+
+        found, errors = _instance_settings(client, instances, settings or {},
+                                           max_workers)
+        for instance in instances:
+            setting = found[instance.name]
+            if setting['parameters'] is None or setting['options'] is None:
+                tracker.failed('instance', instance.name,
+                               errors.get(instance.name,
+                                          _unknown_settings(instance.name)))
+                continue
+
+            application = instance.application
+            writer.write({'type': 'instance', 'name': instance.name,
+                          'app': application.name,
+                          'version': application.version,
+                          'parameters': setting['parameters'],
+                          'options': setting['options']})
+            tracker.completed('instance')
+
+    return tracker.failures
+
+def read_snapshot(path):
+    """
+    Read the records of a snapshot file one at a time.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        A generator of dictionaries, one per record, without the header.
+
+    Raises:
+        ValueError: If the file is not a snapshot of a supported format.
+    """
+
+    with _open(path, 'r') as stream:
+        header = json.loads(stream.readline() or 'null')
+        if not isinstance(header, dict) or header.get('type') != 'header':
+            raise ValueError('Not a BigBoat snapshot: {}'.format(path))
+        if header.get('format') != FORMAT_VERSION:
+            raise ValueError('Unsupported snapshot format: {}'.format(
+                header.get('format')
+            ))
+
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+class _Journal(object):
+    """
+    Append-only file of the records that were successfully imported.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._done = set()
+        self._stream = None
+        if path is not None and os.path.exists(path):
+            with io.open(path, 'r', encoding='utf-8') as journal:
+                self._done = set(line.rstrip(u'\n') for line in journal)
+
+    def __contains__(self, entry):
+        return entry in self._done
+
+    def add(self, entry):
+        if self._path is None:
+            return
+
+        if self._stream is None:
+            self._stream = io.open(self._path, 'a', encoding='utf-8')
+
+        self._stream.write(str(entry) + u'\n')
+        self._stream.flush()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+def _chunks(records):
+    chunk = []
+    for record in records:
+        if record['type'] not in STAGES:
+            continue
+        if chunk and (chunk[0]['type'] != record['type'] or
+                      len(chunk) >= CHUNK_SIZE):
+            yield chunk
+            chunk = []
+
+        chunk.append(record)
+
+    if chunk:
+        yield chunk
+
+def _import_chunk(client, chunk, max_workers):
+    stage = chunk[0]['type']
+    if stage == 'app':
+        keys = dict((_key(record), record) for record in chunk)
+        limiter = getattr(client, 'concurrency', None)
+        return parallel(lambda key: client.update_app(keys[key]['name'],
+                                                      keys[key]['version']),
+                        list(keys.keys()), max_workers=max_workers,
+                        limiter=limiter)
+    if stage == 'compose':
+        mapping = dict(((record['name'], record['version'],
+                         record['file_name']), record['content'])
+                       for record in chunk)
+        return client.update_composes(mapping, max_workers=max_workers)
+
+    mapping = dict((record['name'], {
+        'app': record['app'],
+        'version': record['version'],
+        'parameters': record['parameters'],
+        'options': record['options']
+    }) for record in chunk)
+    return client.update_instances(mapping, max_workers=max_workers)
+
+def import_snapshot(client, path, max_workers=DEFAULT_WORKERS, progress=None,
+                    journal=None):
+    """
+    Recreate the application definitions, compose files and instances from
+    a snapshot file.
+
+    The records are read in chunks, and the records within a chunk are
+    imported concurrently. Application definitions are imported before the
+    compose files, which are imported before the instances. Instances without
+    parameters or options are reported as failures instead of being started
+    without them.
+
+    Args:
+        client (:obj:`bigboat.client.Client_v2`): The client to import with.
+        path (str): The path of the snapshot file, which is decompressed with
+            gzip if the path ends in '.gz'.
+        max_workers (int): The maximum number of concurrent requests, if the
+            client has no adaptive concurrency limiter.
+        progress: Callable that receives a :obj:`SnapshotProgress` named tuple
+            after each record.
+        journal (str or `None`): Path of a journal file that records the
+            successfully imported records. When an import is interrupted or
+            some records fail, importing again with the same journal skips the
+            records that were already imported.
+
+    Returns:
+        :obj:`list` of :obj:`SnapshotFailure`: The records that could not be
+        imported.
+    """
+
+    tracker = _Tracker(progress)
+    done = _Journal(journal)
+    try:
+        for chunk in _chunks(read_snapshot(path)):
+            stage = chunk[0]['type']
+            pending = []
+            for record in chunk:
+                if u'{}:{}'.format(stage, _key(record)) in done:
+                    tracker.skipped(stage)
+                elif stage == 'instance' and \
+                        (record.get('parameters') is None or
+                         record.get('options') is None):
+                    tracker.failed(stage, _key(record),
+                                   _unknown_settings(_key(record)))
+                else:
+                    pending.append(record)
+
+            if not pending:
+                continue
+
+            for result in _import_chunk(client, pending, max_workers):
+                key = result.key
+                if isinstance(key, tuple):
+                    key = '/'.join(key)
+
+                # Update methods return a false value if they failed.
+                if result.error is not None or not result.result:
+                    error = result.error
+                    if error is None:
+                        error = ValueError('Could not import {} {}'.format(
+                            stage, key
+                        ))
+
+                    tracker.failed(stage, key, error)
+                else:
+                    done.add(u'{}:{}'.format(stage, key))
+                    tracker.completed(stage)
+    finally:
+        done.close()
+
+    return tracker.failures
@@ -0,0 +1,410 @@
+"""
+Typed status items and compact status history from the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object, range
+from array import array
+from collections import namedtuple
+import numbers
+import threading
+import time
+
+StatusRecord = namedtuple('StatusRecord', ['name', 'time', 'is_ok', 'details'])
+StatusChange = namedtuple('StatusChange',
+                          ['name', 'metric', 'previous', 'current'])
+WindowStats = namedtuple('WindowStats', ['minimum', 'maximum', 'average',
+                                         'count'])
+
+OK_METRIC = 'isOk'
+
+def parse_status(item):
+    """
+    Parse a status item from the BigBoat v2 API.
+
+    Args:
+        item (dict): The status item as returned by `Client_v2.statuses`.
+
+    Returns:
+        :obj:`StatusRecord`: Named tuple with the `name` of the status check,
+        the `time` of the last check in seconds since the epoch (or `None`),
+        whether the check `is_ok` and the numeric `details` of the check.
+    """
+
+    last_check = item.get('lastCheck') or {}
+    check_time = last_check.get('time')
+    if check_time is not None:
+        check_time = check_time / 1000.0
+
+    details = dict(
+        (key, float(value))
+        for key, value in (item.get('details') or {}).items()
+        if isinstance(value, numbers.Real) and not isinstance(value, bool)
+    )
+
+    return StatusRecord(item.get('name'), check_time, bool(item.get('isOk')),
+                        details)
+
+class RingBuffer(object):
+    """
+    Fixed-size series of timestamped values, stored in arrays of doubles.
+
+    When the buffer is full, appending a value overwrites the oldest value.
+    Values must be appended in order of their time.
+    """
+
+    def __init__(self, capacity):
+        self._capacity = capacity
+        self._times = array('d', [0.0] * capacity)
+        self._values = array('d', [0.0] * capacity)
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self):
+        """
+        The maximum number of values in the buffer.
+        """
+
+        return self._capacity
+
+    def __len__(self):
+        return self._size
+
+    def _index(self, position):
+        return (self._start + position) % self._capacity
+
+    def append(self, timestamp, value):
+        """
+        Add a value to the end of the buffer.
+        """
+
+        if self._size < self._capacity:
+            index = self._index(self._size)
+            self._size += 1
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self._capacity
+
+        self._times[index] = timestamp
+        self._values[index] = value
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError('RingBuffer index out of range')
+
+        index = self._index(position)
+        return self._times[index], self._values[index]
+
+    def __iter__(self):
+        for position in range(self._size):
+            yield self[position]
+
+    def oldest_time(self):
+        """
+        The time of the oldest value, or `None` if the buffer is empty.
+        """
+
+        return self[0][0] if self._size else None
+
+    def _search(self, timestamp, after=False):
+        # Position of the first value at (or only after) the time.
+        low = 0
+        high = self._size
+        while low < high:
+            middle = (low + high) // 2
+            time = self._times[self._index(middle)]
+            if time < timestamp or (after and time == timestamp):
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def since(self, timestamp):
+        """
+        Retrieve the values at or after a time, using a binary search.
+
+        Returns:
+            :obj:`list` of float: The values in order of their time.
+        """
+
+        return [self._values[self._index(position)]
+                for position in range(self._search(timestamp), self._size)]
+
+    def between(self, start, end):
+        """
+        Retrieve the values at or after a start time and at or before an end
+        time, using binary searches.
+
+        Returns:
+            :obj:`list` of float: The values in order of their time.
+        """
+
+        return [self._values[self._index(position)]
+                for position in range(self._search(start),
+                                      self._search(end, after=True))]
+
+class MetricHistory(object):
+    """
+    History of a single metric with a raw ring buffer of recent values and
+    a downsampled ring buffer of averages of `downsample` raw values, which
+    covers a longer period in the same amount of memory.
+    """
+
+    def __init__(self, capacity=1024, downsample=10):
+        self._raw = RingBuffer(capacity)
+        self._coarse = RingBuffer(capacity)
+        self._downsample = downsample
+        self._bucket_sum = 0.0
+        self._bucket_count = 0
+
+    @property
+    def raw(self):
+        """
+        The ring buffer of raw values.
+        """
+
+        return self._raw
+
+    @property
+    def coarse(self):
+        """
+        The ring buffer of downsampled values.
+        """
+
+        return self._coarse
+
+    def append(self, timestamp, value):
+        """
+        Add a value to the history.
+        """
+
+        self._raw.append(timestamp, value)
+        self._bucket_sum += value
+        self._bucket_count += 1
+        if self._bucket_count >= self._downsample:
+            self._coarse.append(timestamp,
+                                self._bucket_sum / self._bucket_count)
+            self._bucket_sum = 0.0
+            self._bucket_count = 0
+
+    def latest(self):
+        """
+        The most recent (time, value) pair, or `None` if there are none.
+        """
+
+        return self._raw[-1] if self._raw else None
+
+    def stats(self, window, now=None):
+        """
+        Calculate statistics over the values in a recent time window.
+
+        The raw values are used if they cover the window, otherwise the
+        downsampled values are used.
+
+        Args:
+            window (float): The length of the window in seconds.
+            now (float or `None`): The end of the window, by default the time
+                of the most recent value.
+
+        Returns:
+            :obj:`WindowStats` or `None`: The `minimum`, `maximum`, `average`
+            and `count` of the values in the window, or `None` if there are no
+            values in the window.
+        """
+
+        if not self._raw:
+            return None
+
+        if now is None:
+            now = self._raw[-1][0]
+
+        start = now - window
+        buffer = self._raw
+        if self._raw.oldest_time() > start and \
+            len(self._coarse) and self._coarse.oldest_time() < \
+            self._raw.oldest_time():
+            buffer = self._coarse
+
+        values = buffer.between(start, now)
+        if not values:
+            return None
+
+        return WindowStats(min(values), max(values),
+                           sum(values) / len(values), len(values))
+
+class StatusCollector(object):
+    """
+    Collector that polls the status items of a BigBoat instance and keeps
+    a bounded history of the outcome and numeric details of every check.
+
+    Metrics are identified by the name of the status check and either
+    'isOk' (1.0 when the check is OK, 0.0 otherwise) or a key of its details.
+
+    Args:
+        client (:obj:`bigboat.client.Client_v2`): The client to poll with.
+        capacity (int): The number of raw and of downsampled values to keep
+            for each metric.
+        downsample (int): The number of raw values per downsampled value.
+    """
+
+    def __init__(self, client, capacity=1024, downsample=10):
+        self._client = client
+        self._capacity = capacity
+        self._downsample = downsample
+        self._histories = {}
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def _history(self, key):
+        if key not in self._histories:
+            self._histories[key] = MetricHistory(self._capacity,
+                                                 self._downsample)
+
+        return self._histories[key]
+
+    def add(self, record):
+        """
+        Add the values of a status record to the history. Records of a check
+        that is not newer than the latest record of that check are ignored.
+
+        Args:
+            record (:obj:`StatusRecord`): The parsed status item.
+
+        Returns:
+            :obj:`list` of :obj:`StatusChange`: The metrics whose values
+            differ from their previous value.
+        """
+
+        timestamp = record.time if record.time is not None else time.time()
+        values = [(OK_METRIC, 1.0 if record.is_ok else 0.0)]
+        values.extend(sorted(record.details.items()))
+
+        changes = []
+        with self._lock:
+            self._records[record.name] = record
+            for metric, value in values:
+                history = self._history((record.name, metric))
+                latest = history.latest()
+                if latest is not None:
+                    if timestamp <= latest[0]:
+                        continue
+                    if latest[1] != value:
+                        changes.append(StatusChange(record.name, metric,
+                                                    latest[1], value))
+
+                history.append(timestamp, value)
+
+        return changes
+
+    def poll(self):
+        """
+        Retrieve the status items from the API and add them to the history.
+
+        Returns:
+            :obj:`list` of :obj:`StatusChange`: The metrics whose values
+            changed since the previous poll.
+        """
+
+        changes = []
+        for item in self._client.statuses():
+            changes.extend(self.add(parse_status(item)))
+
+        return changes
+
+    def run(self, interval=10.0, cancel=None, callback=None):
+        """
+        Poll the status items until cancelled.
+
+        Args:
+            interval (float): Seconds between polls.
+            cancel (:obj:`threading.Event` or `None`): Event that stops the
+                polling when it is set.
+            callback: Callable that receives the list of changes of each poll
+                that detected changes.
+        """
+
+        if cancel is None:
+            cancel = threading.Event()
+
+        while not cancel.is_set():
+            changes = self.poll()
+            if changes and callback is not None:
+                callback(changes)
+
+            cancel.wait(interval)
+
+    def records(self):
+        """
+        The most recent typed record of each status check.
+
+        Returns:
+            dict: Mapping of status check names to :obj:`StatusRecord`.
+        """
+
+        with self._lock:
+            return dict(self._records)
+
+    def metrics(self):
+        """
+        The metrics that have a history.
+
+        Returns:
+            :obj:`list` of tuple: The (name, metric) pairs.
+        """
+
+        with self._lock:
+            return sorted(self._histories.keys())
+
+    def history(self, name, metric=OK_METRIC):
+        """
+        The history of a metric, or `None` if it has no values.
+
+        Returns:
+            :obj:`MetricHistory` or `None`
+        """
+
+        return self._histories.get((name, metric))
+
+    def latest(self, name, metric=OK_METRIC):
+        """
+        The most recent value of a metric.
+
+        Returns:
+            tuple or `None`: The (time, value) pair, or `None` if the metric
+            has no values.
+        """
+
+        history = self.history(name, metric)
+        return history.latest() if history is not None else None
+
+    def stats(self, name, metric=OK_METRIC, window=3600.0, now=None):
+        """
+        Calculate statistics of a metric over a recent time window.
+
+        Returns:
+            :obj:`WindowStats` or `None`: See :obj:`MetricHistory.stats`.
+        """
+
+        history = self.history(name, metric)
+        if history is None:
+            return None
+
+        with self._lock:
+            return history.stats(window, now=now)
@@ -16,8 +16,135 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from contextlib import contextmanager
 from functools import partial, wraps, WRAPPER_ASSIGNMENTS
-from past.builtins import basestring
+from importlib import import_module
+import json
+import zlib
+
+try:
+    basestring
+except NameError:
+    basestring = str # pylint: disable=redefined-builtin,invalid-name
+
+# Optional modules that are imported upon first use, to keep importing
+# bigboat fast. Required dependencies are imported within the functions that
+# use them for the same reason.
+_MODULES = {}
+
+def optional_module(name):
+    """
+    Import an optional module upon first use.
+
+    Args:
+        name (str): The name of the module.
+
+    Returns:
+        The module, or `None` if it is not installed. The outcome is
+        remembered, so that a missing module is not looked up again.
+    """
+
+    if name not in _MODULES:
+        try:
+            _MODULES[name] = import_module(name)
+        except ImportError:
+            _MODULES[name] = None
+
+    return _MODULES[name]
+
+def yaml_loader():
+    """
+    Retrieve the YAML loader class to parse documents safely with.
+
+    Returns:
+        The libyaml-based loader if PyYAML was built with it, otherwise the
+        pure Python safe loader.
+    """
+
+    import yaml
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+def load_yaml(stream):
+    """
+    Parse a YAML document safely, using the fastest available loader.
+
+    Args:
+        stream (str or bytes or file): The YAML document.
+
+    Returns:
+        The Python representation of the document.
+
+    Raises:
+        yaml.error.YAMLError: When the document is not valid YAML.
+    """
+
+    import yaml
+    return yaml.load(stream, Loader=yaml_loader())
+
+def load_json(data):
+    """
+    Parse a JSON document, using the fastest available decoder.
+
+    If `orjson` is installed, it decodes the document directly from bytes.
+    Documents that it rejects, such as those with `NaN` values, are parsed
+    again with the standard library decoder.
+
+    Args:
+        data (bytes or str): The JSON document, encoded as UTF-8 if in bytes.
+
+    Returns:
+        The Python representation of the document.
+
+    Raises:
+        ValueError: When the document is not valid JSON.
+    """
+
+    orjson = optional_module('orjson')
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+
+    return json.loads(data)
+
+def gzip_compress(data, level=6):
+    """
+    Compress data in the gzip format, as used for `Content-Encoding: gzip`.
+
+    Args:
+        data (bytes): The data to compress.
+        level (int): The compression level from 1 (fastest) to 9 (smallest).
+
+    Returns:
+        bytes: The compressed data.
+    """
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+@contextmanager
+def open_binary(target, mode):
+    """
+    Open a file in binary mode, or use an already opened file.
+
+    Args:
+        target (str or file): The path of the file, or a binary file-like
+            object, which is not closed when the context is left.
+        mode (str): The binary mode to open a path with, such as 'rb'.
+
+    Returns:
+        A context manager that provides the binary file-like object.
+    """
+
+    if isinstance(target, basestring):
+        with open(target, mode) as stream:
+            yield stream
+    else:
+        yield target
 
 def readonly(*args, **kwargs):
     """
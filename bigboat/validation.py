@@ -0,0 +1,118 @@
+"""
+Local validation of compose files before they are sent to the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import str
+from .bulk import BulkResult
+from .utils import load_yaml
+
+def _matches(value, expected):
+    if str(value) == str(expected):
+        return True
+
+    # YAML may have parsed a version such as 1.10 as a number.
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return float(expected) == value
+        except ValueError:
+            return False
+
+    return False
+
+def validate_compose(name, version, file_name, content):
+    """
+    Check whether a docker compose or bigboat compose file would be accepted
+    by the BigBoat API for an application.
+
+    Args:
+        name (str): The name of the application
+        version (str): The version of the application
+        file_name (str): 'dockerCompose' or 'bigboatCompose'
+        content (str): The file contents
+
+    Returns:
+        The parsed YAML document.
+
+    Raises:
+        ValueError: When the compose file could not be parsed as a valid
+        YAML file.
+        ValueError: When the bigboatCompose file contains name or version
+        properties that do not match the provided application name/verison.
+    """
+
+    import yaml
+    try:
+        document = load_yaml(content)
+    except yaml.error.YAMLError as yaml_error:
+        raise ValueError('Problem asserting validity of YAML: {}'.format(yaml_error))
+
+    if document is not None and not isinstance(document, dict):
+        raise ValueError('Problem asserting validity of YAML: '
+                         'document is not a mapping')
+
+    if file_name == 'bigboatCompose' and document:
+        if 'name' in document and not _matches(document['name'], name):
+            raise ValueError('Name property of Bigboat compose needs to be '
+                             'equal to name property of App')
+        if 'version' in document and \
+            not _matches(document['version'], version):
+            raise ValueError('Version property of Bigboat compose needs to be '
+                             'equal to version property of App')
+
+    return document
+
+def _validate_item(item):
+    key, content = item
+    try:
+        validate_compose(*key, content=content)
+    except ValueError as error:
+        return BulkResult(key, False, error)
+
+    return BulkResult(key, True, None)
+
+def validate_composes(mapping, processes=None, chunksize=32):
+    """
+    Validate many docker compose or bigboat compose files, optionally using
+    a pool of processes to parse them in parallel.
+
+    Args:
+        mapping (dict): Mapping of (name, version, file_name) tuples to the
+            file contents to validate.
+        processes (int or `None`): The number of worker processes to use, or
+            `None` to use one per CPU. With one process, the files are
+            validated in the current process.
+        chunksize (int): The number of files that each worker process
+            validates per task, limiting the overhead of communication.
+
+    Returns:
+        A generator of :obj:`bigboat.bulk.BulkResult` named tuples, in the
+        order of the mapping. The `key` is the (name, version, file_name)
+        tuple, the `result` is whether the file is valid and the `error` is
+        the `ValueError` describing why the file is invalid, if so.
+    """
+
+    items = list(mapping.items())
+    if processes == 1 or len(items) <= 1:
+        for item in items:
+            yield _validate_item(item)
+
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for result in executor.map(_validate_item, items, chunksize=chunksize):
+            yield result
@@ -0,0 +1,224 @@
+"""
+Ordering and indexing of the versions of application definitions.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+import bisect
+import re
+import threading
+import time
+
+SEMVER = re.compile(r'^[vV]?(\d+(?:\.\d+)*)(?:-([0-9A-Za-z.-]+))?'
+                    r'(?:\+[0-9A-Za-z.-]+)?$')
+NATURAL = re.compile(r'\d+|\D+')
+
+def _natural(text):
+    return tuple((0, int(part)) if part.isdigit() else (1, part)
+                 for part in NATURAL.findall(text))
+
+def version_key(version):
+    """
+    Create a sort key for a version of an application.
+
+    Versions in the form of semantic versions, with an optional 'v' prefix
+    and any number of numeric components, are ordered by their numeric
+    components, with pre-releases such as '1.0-rc.1' before the release and
+    build metadata ignored. Other versions are ordered naturally, comparing
+    runs of digits numerically, and before all semantic versions.
+
+    Args:
+        version (str): The version.
+
+    Returns:
+        tuple: The key, which compares with the keys of all other versions.
+    """
+
+    match = SEMVER.match(version)
+    if match is None:
+        return (0, _natural(version))
+
+    release = tuple(int(part) for part in match.group(1).split('.'))
+    prerelease = match.group(2)
+    if prerelease is None:
+        return (1, release, 1, ())
+
+    return (1, release, 0, tuple((0, int(part)) if part.isdigit() else
+                                 (1, part) for part in prerelease.split('.')))
+
+def sort_versions(versions, reverse=False):
+    """
+    Sort versions of an application from oldest to newest.
+
+    Args:
+        versions: Iterable of version strings.
+        reverse (bool): Whether to sort from newest to oldest instead.
+
+    Returns:
+        :obj:`list` of str: The sorted versions.
+    """
+
+    return sorted(versions, key=version_key, reverse=reverse)
+
+class VersionIndex(object):
+    """
+    Index of the versions of the application definitions of a BigBoat
+    instance, grouped per application and ordered with :func:`version_key`.
+
+    The index is built from the listing of `apps()` of the client, so it
+    benefits from a read cache of the client. A refresh only updates the
+    applications whose versions changed since the previous listing.
+
+    Args:
+        client (:obj:`bigboat.client.Client`): The client to list the
+            application definitions with.
+        max_age (float or `None`): The number of seconds after which queries
+            refresh the index. If `None`, the index is only refreshed when it
+            is first queried and when `refresh` is called.
+        clock: Callable that returns the current time in seconds.
+    """
+
+    def __init__(self, client, max_age=60, clock=time.time):
+        self._client = client
+        self._max_age = max_age
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._loaded = None
+        # Sorted lists of (key, version) tuples and the applications per name.
+        self._versions = {}
+        self._apps = {}
+
+    def _ensure(self):
+        loaded = self._loaded
+        if loaded is None or (self._max_age is not None and
+                              self._clock() - loaded >= self._max_age):
+            self.refresh()
+
+    def refresh(self):
+        """
+        Update the index with the current application definitions.
+
+        Returns:
+            set: The names of the applications whose versions changed.
+        """
+
+        listing = {}
+        for app in self._client.apps():
+            listing.setdefault(app.name, {})[app.version] = app
+
+        changed = set()
+        with self._lock:
+            for name in set(self._apps) - set(listing):
+                del self._apps[name]
+                del self._versions[name]
+                changed.add(name)
+
+            for name, apps in listing.items():
+                current = self._apps.get(name, {})
+                if set(current) == set(apps):
+                    # Keep the newest entities of unchanged versions.
+                    self._apps[name] = apps
+                    continue
+
+                versions = self._versions.setdefault(name, [])
+                for version in set(current) - set(apps):
+                    entry = (version_key(version), version)
+                    del versions[bisect.bisect_left(versions, entry)]
+                for version in set(apps) - set(current):
+                    bisect.insort(versions, (version_key(version), version))
+
+                self._apps[name] = apps
+                changed.add(name)
+
+            self._loaded = self._clock()
+
+        return changed
+
+    def names(self):
+        """
+        The names of the applications with at least one version.
+
+        Returns:
+            :obj:`list` of str: The sorted names.
+        """
+
+        self._ensure()
+        with self._lock:
+            return sorted(self._apps)
+
+    def versions(self, name):
+        """
+        The versions of an application.
+
+        Args:
+            name (str): The name of the application.
+
+        Returns:
+            :obj:`list` of str: The versions from oldest to newest, or an
+            empty list if the application is unknown.
+        """
+
+        self._ensure()
+        with self._lock:
+            return [version for _, version in self._versions.get(name, [])]
+
+    def latest(self, name):
+        """
+        The newest version of an application.
+
+        Args:
+            name (str): The name of the application.
+
+        Returns:
+            :obj:`bigboat.application.Application` or `None`: The application
+            definition of the newest version, or `None` if the application is
+            unknown.
+        """
+
+        self._ensure()
+        with self._lock:
+            versions = self._versions.get(name)
+            if not versions:
+                return None
+
+            return self._apps[name][versions[-1][1]]
+
+    def between(self, name, minimum=None, maximum=None):
+        """
+        The versions of an application within a range.
+
+        Args:
+            name (str): The name of the application.
+            minimum (str or `None`): The oldest version to include, which
+                does not need to exist, or `None` for no lower bound.
+            maximum (str or `None`): The version up to which versions are
+                included, excluding the version itself, or `None` for no upper
+                bound.
+
+        Returns:
+            :obj:`list` of str: The versions from oldest to newest.
+        """
+
+        self._ensure()
+        with self._lock:
+            versions = self._versions.get(name, [])
+            # Versions with equal keys are ordered by their text, so bound
+            # the search by the key alone.
+            start = 0 if minimum is None else \
+                bisect.bisect_left(versions, (version_key(minimum),))
+            end = len(versions) if maximum is None else \
+                bisect.bisect_left(versions, (version_key(maximum),))
+            return [version for _, version in versions[start:end]]
@@ -0,0 +1,98 @@
+"""
+Waiting for instances to reach a state in the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import str
+from collections import namedtuple
+import threading
+import time
+
+WaitResult = namedtuple('WaitResult', ['reached', 'failed', 'pending'])
+
+FAILED_STATES = ('failed', 'stopped')
+
+def _runs_version(instance, version):
+    application = instance.application
+    return application is not None and str(application.version) == version
+
+def wait_for_state(client, names, state='running', interval=2.0, timeout=300,
+                   failed_states=FAILED_STATES, cancel=None, version=None):
+    """
+    Wait until instances reach a state, polling all of them at once with
+    a single listing of instances per interval.
+
+    Args:
+        client (:obj:`bigboat.client.Client`): The client to poll with.
+        names: Iterable of names of the instances to wait for.
+        state (str): The current state that the instances should reach.
+        interval (float): The number of seconds between polls.
+        timeout (float or `None`): The maximum number of seconds to wait, or
+            `None` to wait until all instances reached the state or failed.
+        failed_states (tuple): Current states that indicate that an instance
+            will not reach the desired state. An instance that is no longer
+            listed has also failed, unless the desired state is 'stopped'.
+        cancel (:obj:`threading.Event` or `None`): Event that stops waiting
+            when it is set.
+        version (str or `None`): The application version that the instances
+            should run when they reach the state, or `None` to accept any.
+
+    Returns:
+        :obj:`WaitResult`: Named tuple with sets of the instance names that
+        `reached` the state, that `failed`, and that are still `pending`
+        because of a timeout or cancellation.
+    """
+
+    pending = set(names)
+    reached = set()
+    failed = set()
+    if cancel is None:
+        cancel = threading.Event()
+
+    deadline = None if timeout is None else time.time() + timeout
+    while pending:
+        listing = dict((instance.name, instance)
+                       for instance in client.instances())
+        for name in list(pending):
+            instance = listing.get(name)
+            if instance is None:
+                target = reached if state == 'stopped' else failed
+            elif instance.current_state == state and \
+                (version is None or _runs_version(instance, version)):
+                target = reached
+            elif instance.current_state in failed_states:
+                target = failed
+            else:
+                continue
+
+            target.add(name)
+            pending.remove(name)
+
+        if not pending:
+            break
+
+        remaining = interval
+        if deadline is not None:
+            now = time.time()
+            if now >= deadline:
+                break
+
+            remaining = min(interval, deadline - now)
+
+        if cancel.wait(remaining):
+            break
+
+    return WaitResult(reached, failed, pending)
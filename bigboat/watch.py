@@ -0,0 +1,165 @@
+"""
+Change events of instances in the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+from collections import namedtuple
+import threading
+
+InstanceEvent = namedtuple('InstanceEvent',
+                           ['kind', 'name', 'instance', 'previous'])
+
+def _fingerprint(instance):
+    application = instance.application
+    app = None if application is None else \
+        (application.name, application.version)
+    return (instance.current_state, instance.desired_state, app,
+            instance.services)
+
+class InstanceTracker(object):
+    """
+    Known state of the instances of a BigBoat instance, which converts new
+    information about instances into change events.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def instances(self):
+        """
+        The currently known instances.
+
+        Returns:
+            dict: Mapping of instance names to :obj:`bigboat.instance.Instance`.
+        """
+
+        with self._lock:
+            return dict(self._instances)
+
+    def update(self, instance):
+        """
+        Register the current data of an instance.
+
+        Returns:
+            :obj:`InstanceEvent` or `None`: An 'added' or 'changed' event, or
+            `None` if the instance is unchanged.
+        """
+
+        with self._lock:
+            previous = self._instances.get(instance.name)
+            self._instances[instance.name] = instance
+
+        if previous is None:
+            return InstanceEvent('added', instance.name, instance, None)
+        if _fingerprint(previous) != _fingerprint(instance):
+            return InstanceEvent('changed', instance.name, instance, previous)
+
+        return None
+
+    def remove(self, name):
+        """
+        Register that an instance no longer exists.
+
+        Returns:
+            :obj:`InstanceEvent` or `None`: A 'removed' event, or `None` if the
+            instance was not known.
+        """
+
+        with self._lock:
+            previous = self._instances.pop(name, None)
+
+        if previous is None:
+            return None
+
+        return InstanceEvent('removed', name, None, previous)
+
+    def replace(self, instances):
+        """
+        Register a complete listing of the current instances.
+
+        Returns:
+            :obj:`list` of :obj:`InstanceEvent`: The changes compared to the
+            previously known instances.
+        """
+
+        events = []
+        names = set()
+        for instance in instances:
+            names.add(instance.name)
+            event = self.update(instance)
+            if event is not None:
+                events.append(event)
+
+        for name in sorted(set(self.instances().keys()) - names):
+            event = self.remove(name)
+            if event is not None:
+                events.append(event)
+
+        return events
+
+class InstanceWatcher(object):
+    """
+    Watcher that polls the listing of instances and reports changes.
+
+    Args:
+        client (:obj:`bigboat.client.Client`): The client to poll with.
+        tracker (:obj:`InstanceTracker` or `None`): The known state of the
+            instances, for example to share it with a subscription.
+    """
+
+    def __init__(self, client, tracker=None):
+        self._client = client
+        self._tracker = InstanceTracker() if tracker is None else tracker
+
+    @property
+    def tracker(self):
+        """
+        The known state of the instances.
+        """
+
+        return self._tracker
+
+    def poll(self):
+        """
+        Retrieve the instances and determine the changes since the last poll.
+
+        Returns:
+            :obj:`list` of :obj:`InstanceEvent`: The changes.
+        """
+
+        return self._tracker.replace(self._client.instances())
+
+    def run(self, callback, interval=5.0, cancel=None):
+        """
+        Poll the instances until cancelled.
+
+        Args:
+            callback: Callable that receives each :obj:`InstanceEvent`.
+            interval (float): Seconds between polls.
+            cancel (:obj:`threading.Event` or `None`): Event that stops the
+                polling when it is set.
+        """
+
+        if cancel is None:
+            cancel = threading.Event()
+
+        while not cancel.is_set():
+            for event in self.poll():
+                callback(event)
+
+            cancel.wait(interval)
@@ -33,12 +33,20 @@ do similar operations for instances and poll for status''',
       license='Apache License, Version 2.0',
       packages=find_packages(exclude=['tests*']),
       scripts=[],
+      entry_points={
+          'console_scripts': ['bigboat=bigboat.cli:main']
+      },
       include_package_data=True,
       install_requires=[
           'future>=0.16.0',
+          'futures>=3.1.1; python_version < "3.0"',
           'requests>=2.17.3',
           'pyyaml>=3.12'
       ],
+      extras_require={
+          'speedups': ['orjson>=3.0; python_version >= "3.8"'],
+          'ddp': ['websocket-client>=0.40.0']
+      },
       test_suite='tests',
       classifiers=[
           'Development Status :: 3 - Alpha',
@@ -64,6 +64,16 @@ class ApplicationTest(unittest.TestCase):
                                                             'latest',
                                                             options={'hi': 'y'})
 
+    def test_upgrade(self):
+        """
+        Test the Application.upgrade method.
+        """
+
+        self.client.instances.return_value = []
+        result = self.application.upgrade('1.13', interval=0)
+        self.assertEqual(result, (set(), set(), set(), False))
+        self.client.update_instance.assert_not_called()
+
     def test_repr(self):
         """
         Test the Application.__repr__ method.
@@ -0,0 +1,213 @@
+"""
+Tests for micro-batching of point lookups.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import time
+import unittest
+from bigboat.batch import LookupBatcher
+from bigboat.client import Client_v2
+from tests.client import RequestsTestCase
+
+def lookup_concurrently(get, keys):
+    """
+    Perform a lookup for each key in its own thread, starting all lookups at
+    the same time.
+
+    Returns:
+        dict: The results of the lookups by key, or the raised exceptions.
+    """
+
+    barrier = threading.Barrier(len(keys))
+    results = {}
+
+    def work(key):
+        """
+        Perform one lookup.
+        """
+
+        barrier.wait()
+        try:
+            results[key] = get(key)
+        except IOError as error:
+            results[key] = error
+
+    threads = [threading.Thread(target=work, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+class LookupBatcherTest(unittest.TestCase):
+    """
+    Tests for collecting point lookups into listings.
+    """
+
+    def setUp(self):
+        self.calls = []
+        self.items = {'foo': 1, 'bar': 2, 'baz': 3}
+        self.batcher = LookupBatcher(self.lookup, self.listing,
+                                     lambda item: item[0], window=0.05)
+
+    def lookup(self, key):
+        """
+        Look up a single item.
+        """
+
+        self.calls.append(('lookup', key))
+        return self.items.get(key)
+
+    def listing(self):
+        """
+        List all items.
+        """
+
+        self.calls.append(('listing',))
+        return list(self.items.items())
+
+    def test_batch(self):
+        """
+        Test that concurrent lookups are resolved with a single listing.
+        """
+
+        results = lookup_concurrently(self.batcher.get,
+                                      ['foo', 'bar', 'qux'])
+        self.assertEqual(results, {'foo': ('foo', 1), 'bar': ('bar', 2),
+                                   'qux': None})
+        self.assertEqual(self.calls, [('listing',)])
+
+    def test_single(self):
+        """
+        Test that a lone lookup does not retrieve the listing.
+        """
+
+        self.assertEqual(self.batcher.get('baz'), 3)
+        self.assertEqual(self.calls, [('lookup', 'baz')])
+
+    def test_below_threshold(self):
+        """
+        Test that lookups below the threshold are performed in parallel by
+        their callers.
+        """
+
+        def slow_lookup(key):
+            """
+            Look up a single item slowly.
+            """
+
+            time.sleep(0.1)
+            return self.lookup(key)
+
+        batcher = LookupBatcher(slow_lookup, self.listing,
+                                lambda item: item[0], window=0.01,
+                                min_batch=10)
+        start = time.time()
+        results = lookup_concurrently(batcher.get, ['foo', 'bar', 'baz'])
+        self.assertLess(time.time() - start, 0.25)
+        self.assertEqual(results, {'foo': 1, 'bar': 2, 'baz': 3})
+        self.assertEqual(sorted(self.calls), [('lookup', 'bar'),
+                                              ('lookup', 'baz'),
+                                              ('lookup', 'foo')])
+
+    def test_min_fraction(self):
+        """
+        Test that the listing is not used for few keys compared to the size
+        of the previous listing.
+        """
+
+        batcher = LookupBatcher(self.lookup, self.listing,
+                                lambda item: item[0], window=0.05,
+                                min_fraction=0.9)
+        lookup_concurrently(batcher.get, ['foo', 'bar'])
+        self.assertEqual(self.calls, [('listing',)])
+        lookup_concurrently(batcher.get, ['foo', 'bar'])
+        self.assertEqual(sorted(self.calls[1:]), [('lookup', 'bar'),
+                                                  ('lookup', 'foo')])
+
+    def test_error(self):
+        """
+        Test that an error of the listing is raised to all callers.
+        """
+
+        def fail():
+            """
+            Fail to retrieve the listing.
+            """
+
+            raise IOError('Connection failed')
+
+        batcher = LookupBatcher(self.lookup, fail, lambda item: item[0],
+                                window=0.05)
+        results = lookup_concurrently(batcher.get, ['foo', 'bar'])
+        self.assertIsInstance(results['foo'], IOError)
+        self.assertIsInstance(results['bar'], IOError)
+
+class Client_v2_BatchTest(RequestsTestCase):
+    """
+    Tests for the BigBoat v2 API client with batched instance lookups.
+    """
+
+    URL = 'http://dashboard.example/'
+    PATH = 'api/v2/'
+
+    def test_get_instance(self):
+        """
+        Test that concurrent Client_v2.get_instance calls share a listing.
+        """
+
+        client = Client_v2(self.URL, 'my-api-key', batch_window=0.05)
+        self.requests_mock.get(self.URL + self.PATH + 'instances', json=[
+            {'name': 'web', 'state': {'current': 'running'}},
+            {'name': 'db', 'state': {'current': 'starting'}}
+        ])
+        results = lookup_concurrently(
+            lambda name: client.get_instance(name, settings=False),
+            ['web', 'db', 'cache']
+        )
+        self.assertEqual(results['web'].current_state, 'running')
+        self.assertEqual(results['db'].current_state, 'starting')
+        self.assertIsNone(results['cache'])
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+        self.requests_mock.get(self.URL + self.PATH + 'instances/web',
+                               json={'name': 'web'})
+        self.assertEqual(client.get_instance('web').name, 'web')
+        self.assertEqual(self.requests_mock.last_request.path,
+                         '/api/v2/instances/web')
+
+    def test_get_instance_settings(self):
+        """
+        Test that batched lookups of instances whose parameters and options
+        are not in the listing look up those instances separately.
+        """
+
+        client = Client_v2(self.URL, 'my-api-key', batch_window=0.05)
+        self.requests_mock.get(self.URL + self.PATH + 'instances', json=[
+            {'name': 'web', 'state': {'current': 'running'}},
+            {'name': 'db', 'parameters': {}, 'options': {}}
+        ])
+        self.requests_mock.get(self.URL + self.PATH + 'instances/web', json={
+            'name': 'web', 'parameters': {'SETTING': 'value'}, 'options': {}
+        })
+        results = lookup_concurrently(client.get_instance, ['web', 'db'])
+        self.assertEqual(results['web'].parameters, {'SETTING': 'value'})
+        self.assertEqual(results['db'].parameters, {})
+        self.assertEqual([request.path for request
+                          in self.requests_mock.request_history],
+                         ['/api/v2/instances', '/api/v2/instances/web'])
@@ -0,0 +1,97 @@
+"""
+Tests for concurrent execution of bulk operations.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import unittest
+from bigboat.bulk import parallel
+
+class ParallelTest(unittest.TestCase):
+    """
+    Tests for the concurrent bulk operation executor.
+    """
+
+    def test_results(self):
+        """
+        Test that parallel reports results and errors per key.
+        """
+
+        def operation(key):
+            if key < 0:
+                raise ValueError('negative')
+
+            return key * 2
+
+        results = sorted(parallel(operation, [1, -1, 2, 3]))
+        self.assertEqual([result.key for result in results], [-1, 1, 2, 3])
+        self.assertEqual([result.result for result in results],
+                         [None, 2, 4, 6])
+        self.assertIsNone(results[1].error)
+        self.assertIsInstance(results[0].error, ValueError)
+
+    def test_unexpected_error(self):
+        """
+        Test that errors that are not reported per key are raised.
+        """
+
+        def operation(key):
+            raise KeyError(key)
+
+        with self.assertRaises(KeyError):
+            list(parallel(operation, ['a']))
+
+    def test_max_workers(self):
+        """
+        Test that the number of concurrent operations is bounded.
+        """
+
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+        barrier = threading.Event()
+
+        def operation(key):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+
+            barrier.wait(0.01)
+            with lock:
+                state['running'] -= 1
+
+            return key
+
+        results = list(parallel(operation, range(20), max_workers=3))
+        self.assertEqual(len(results), 20)
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_streaming(self):
+        """
+        Test that results are generated as soon as they complete.
+        """
+
+        release = threading.Event()
+
+        def operation(key):
+            if key == 'slow':
+                release.wait(5)
+
+            return key
+
+        results = parallel(operation, ['slow', 'fast'], max_workers=2)
+        self.assertEqual(next(results).key, 'fast')
+        release.set()
+        self.assertEqual(next(results).key, 'slow')
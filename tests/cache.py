@@ -0,0 +1,562 @@
+"""
+Tests for caches of data retrieved from the BigBoat API.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from bigboat.cache import ComposeCache, NegativeCache, RevalidatingCache, \
+    content_hash
+from bigboat.client import Client_v2
+from tests.client import RequestsTestCase
+
+class ComposeCacheTest(unittest.TestCase):
+    """
+    Tests for the content-addressed compose file cache.
+    """
+
+    DASHBOARD = 'http://dashboard.example'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ComposeCache(self.directory, max_size=100)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get(self):
+        """
+        Test the ComposeCache.get and ComposeCache.put methods.
+        """
+
+        self.assertIsNone(self.cache.get(self.DASHBOARD, 'nginx', 'latest',
+                                         'dockerCompose'))
+        digest = self.cache.put(self.DASHBOARD, 'nginx', 'latest',
+                                'dockerCompose', u'www:\n  image: nginx\n')
+        self.assertEqual(digest, content_hash(u'www:\n  image: nginx\n'))
+        self.assertEqual(self.cache.get(self.DASHBOARD, 'nginx', 'latest',
+                                        'dockerCompose'),
+                         u'www:\n  image: nginx\n')
+
+        # The cache is keyed by all identifying properties.
+        self.assertIsNone(self.cache.get(self.DASHBOARD, 'nginx', 'latest',
+                                         'bigboatCompose'))
+        self.assertIsNone(self.cache.get('http://other.example', 'nginx',
+                                         'latest', 'dockerCompose'))
+
+        # Caches in other processes share the same directory contents.
+        other = ComposeCache(self.directory)
+        self.assertEqual(other.get(self.DASHBOARD, 'nginx', 'latest',
+                                   'dockerCompose'),
+                         u'www:\n  image: nginx\n')
+
+    def test_content_addressed(self):
+        """
+        Test that identical contents are stored only once.
+        """
+
+        self.cache.put(self.DASHBOARD, 'nginx', '1', 'dockerCompose', u'same')
+        self.cache.put(self.DASHBOARD, 'nginx', '2', 'dockerCompose', u'same')
+        self.assertEqual(self.cache.size(), len('same'))
+
+    def test_corrupted(self):
+        """
+        Test that corrupted contents are treated as a cache miss.
+        """
+
+        digest = self.cache.put(self.DASHBOARD, 'nginx', 'latest',
+                                'dockerCompose', u'content')
+        path = os.path.join(self.directory, 'objects', digest[:2], digest)
+        with open(path, 'w') as cache_file:
+            cache_file.write('tampered')
+
+        self.assertIsNone(self.cache.get(self.DASHBOARD, 'nginx', 'latest',
+                                         'dockerCompose'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_discard(self):
+        """
+        Test the ComposeCache.discard method.
+        """
+
+        self.cache.put(self.DASHBOARD, 'nginx', 'latest', 'dockerCompose',
+                       u'content')
+        self.cache.discard(self.DASHBOARD, 'nginx', 'latest', 'dockerCompose')
+        self.assertIsNone(self.cache.get(self.DASHBOARD, 'nginx', 'latest',
+                                         'dockerCompose'))
+
+        # Discarding a missing file is not an error.
+        self.cache.discard(self.DASHBOARD, 'nginx', 'latest', 'dockerCompose')
+
+    def test_evict(self):
+        """
+        Test the size-bounded eviction of the least recently used contents.
+        """
+
+        for version in range(3):
+            self.cache.put(self.DASHBOARD, 'nginx', str(version),
+                           'dockerCompose', u'{}'.format(version) * 40)
+            path = os.path.join(self.directory, 'objects')
+            # Give each file a distinct modification time.
+            for prefix in os.listdir(path):
+                for name in os.listdir(os.path.join(path, prefix)):
+                    object_path = os.path.join(path, prefix, name)
+                    if name == content_hash(u'{}'.format(version) * 40):
+                        os.utime(object_path, (version, version))
+
+        self.assertLessEqual(self.cache.size(), 100)
+        self.assertIsNone(self.cache.get(self.DASHBOARD, 'nginx', '0',
+                                         'dockerCompose'))
+        self.assertEqual(self.cache.get(self.DASHBOARD, 'nginx', '2',
+                                        'dockerCompose'), u'2' * 40)
+
+    def test_evict_estimate(self):
+        """
+        Test that contents are only scanned for eviction when the estimated
+        size exceeds the maximum size or the last scan is too old.
+        """
+
+        clock = Clock()
+        cache = ComposeCache(self.directory, max_size=100, scan_interval=60,
+                             clock=clock)
+        scans = []
+        evict = cache.evict
+        cache.evict = lambda: scans.append(clock.now) or evict()
+
+        for version in range(3):
+            cache.put(self.DASHBOARD, 'nginx', str(version), 'dockerCompose',
+                      u'{}'.format(version) * 20)
+
+        self.assertEqual(len(scans), 1)
+        cache.put(self.DASHBOARD, 'nginx', '3', 'dockerCompose', u'3' * 50)
+        self.assertEqual(len(scans), 2)
+        self.assertLessEqual(cache.size(), 100)
+
+        clock.now += 60
+        cache.put(self.DASHBOARD, 'nginx', '3', 'dockerCompose', u'3' * 50)
+        self.assertEqual(len(scans), 3)
+
+    def test_unwritable(self):
+        """
+        Test that failure to write to the cache is not an error.
+        """
+
+        cache = ComposeCache(self.directory)
+        shutil.rmtree(self.directory)
+        with open(self.directory, 'w'):
+            pass
+
+        try:
+            self.assertIsNone(cache.put(self.DASHBOARD, 'nginx', 'latest',
+                                        'dockerCompose', u'content'))
+        finally:
+            os.remove(self.directory)
+            os.mkdir(self.directory)
+
+class Client_v2_CacheTest(RequestsTestCase):
+    """
+    Tests for the BigBoat v2 API client using a compose file cache.
+    """
+
+    URL = 'http://dashboard.example/'
+    PATH = 'api/v2/'
+
+    def setUp(self):
+        super(Client_v2_CacheTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.cache = ComposeCache(self.directory)
+        self.client = Client_v2(self.URL, 'my-api-key',
+                                compose_cache=self.cache)
+
+    def tearDown(self):
+        super(Client_v2_CacheTest, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_get_compose(self):
+        """
+        Test that Client_v2.get_compose serves repeated fetches from the cache.
+        """
+
+        url = self.URL + self.PATH + 'apps/nginx/latest/files/dockerCompose'
+        adapter = self.requests_mock.get(url, text='www:\n  image: nginx\n',
+                                         headers={'Content-Type': 'text/yaml'})
+
+        for _ in range(3):
+            self.assertEqual(self.client.get_compose('nginx', 'latest',
+                                                     'dockerCompose'),
+                             'www:\n  image: nginx\n')
+
+        self.assertEqual(adapter.call_count, 1)
+
+        # Another client with the same cache does not fetch the file either.
+        client = Client_v2(self.URL, 'other-key', compose_cache=self.cache)
+        self.assertEqual(client.get_compose('nginx', 'latest', 'dockerCompose'),
+                         'www:\n  image: nginx\n')
+        self.assertEqual(adapter.call_count, 1)
+
+    def test_update_compose(self):
+        """
+        Test that Client_v2.update_compose stores uploaded files in the cache.
+        """
+
+        url = self.URL + self.PATH + 'apps/nginx/latest/files/dockerCompose'
+        self.requests_mock.put(url, status_code=201)
+        self.assertTrue(self.client.update_compose('nginx', 'latest',
+                                                   'dockerCompose', 'new'))
+        self.assertEqual(self.cache.get(self.URL.rstrip('/'), 'nginx',
+                                        'latest', 'dockerCompose'), 'new')
+
+class Clock(object):
+    """
+    Clock whose time is set by the test.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class RevalidatingCacheTest(unittest.TestCase):
+    """
+    Tests for the stale-while-revalidate cache.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = RevalidatingCache(max_age=5, stale=60, clock=self.clock)
+        self.loads = []
+
+    def load(self, value):
+        """
+        Create a loader that records its calls.
+        """
+
+        def _load():
+            self.loads.append(value)
+            return value
+
+        return _load
+
+    def test_get(self):
+        """
+        Test fresh, stale and expired values.
+        """
+
+        self.assertEqual(self.cache.get('apps', self.load(1)), 1)
+        self.clock.now += 5
+        self.assertEqual(self.cache.get('apps', self.load(2)), 1)
+        self.assertEqual(self.loads, [1])
+
+        # A stale value is returned while it is refreshed.
+        self.clock.now += 1
+        self.assertEqual(self.cache.get('apps', self.load(2)), 1)
+        self.cache.wait()
+        self.assertEqual(self.loads, [1, 2])
+        self.assertEqual(self.cache.get('apps', self.load(3)), 2)
+
+        # An expired value is loaded before returning.
+        self.clock.now += 66
+        self.assertEqual(self.cache.get('apps', self.load(4)), 4)
+        self.assertEqual(self.loads, [1, 2, 4])
+
+    def test_single_refresh(self):
+        """
+        Test that a stale value is refreshed by one thread at a time.
+        """
+
+        self.cache.get('apps', self.load(1))
+        self.clock.now += 10
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def slow():
+            """
+            Load a value after the test allows it.
+            """
+
+            started.set()
+            proceed.wait(5)
+            self.loads.append('slow')
+            return 'slow'
+
+        self.assertEqual(self.cache.get('apps', slow), 1)
+        started.wait(5)
+        self.assertEqual(self.cache.get('apps', self.load(2)), 1)
+        proceed.set()
+        self.cache.wait()
+        self.assertEqual(self.loads, [1, 'slow'])
+
+    def test_refresh_invalidated(self):
+        """
+        Test that a refresh that started before an invalidation does not
+        store its outdated value.
+        """
+
+        self.cache.get('apps', self.load(1))
+        self.clock.now += 10
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def slow():
+            """
+            Load an outdated value after the test allows it.
+            """
+
+            started.set()
+            proceed.wait(5)
+            return 'outdated'
+
+        self.assertEqual(self.cache.get('apps', slow), 1)
+        started.wait(5)
+        self.cache.invalidate('apps')
+        proceed.set()
+        self.cache.wait()
+        self.assertEqual(self.cache.get('apps', self.load(2)), 2)
+
+        self.clock.now += 10
+        self.assertEqual(self.cache.get('apps', slow), 2)
+        self.cache.invalidate()
+        self.cache.wait()
+        self.assertEqual(self.cache.get('apps', self.load(3)), 3)
+
+    def test_refresh_error(self):
+        """
+        Test that a failed refresh keeps the stale value.
+        """
+
+        def fail():
+            """
+            Fail to load a value.
+            """
+
+            raise IOError('Connection failed')
+
+        self.cache.get('apps', self.load(1))
+        self.clock.now += 10
+        self.assertEqual(self.cache.get('apps', fail), 1)
+        self.cache.wait()
+        self.assertIsInstance(self.cache.error('apps'), IOError)
+        self.assertEqual(self.cache.get('apps', fail), 1)
+        self.cache.wait()
+
+        self.cache.invalidate('apps')
+        self.assertEqual(self.cache.get('apps', self.load(2)), 2)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get('apps', self.load(3)), 3)
+
+class Client_v2_ReadCacheTest(RequestsTestCase):
+    """
+    Tests for the BigBoat v2 API client using stale-while-revalidate reads.
+    """
+
+    URL = 'http://dashboard.example/'
+    PATH = 'api/v2/'
+
+    def setUp(self):
+        super(Client_v2_ReadCacheTest, self).setUp()
+        self.clock = Clock()
+        self.cache = RevalidatingCache(max_age=5, stale=60, clock=self.clock)
+        self.client = Client_v2(self.URL, 'my-api-key',
+                                read_cache=self.cache)
+
+    def test_apps(self):
+        """
+        Test that Client_v2.apps returns stale listings while refreshing them.
+        """
+
+        url = self.URL + self.PATH + 'apps'
+        self.requests_mock.get(url, json=[{'name': 'nginx',
+                                           'version': 'latest'}])
+        self.assertEqual(len(self.client.apps()), 1)
+
+        self.requests_mock.get(url, json=[])
+        self.clock.now += 10
+        self.assertEqual(len(self.client.apps()), 1)
+        self.cache.wait()
+        self.assertEqual(self.client.apps(), [])
+        self.assertEqual(self.requests_mock.call_count, 2)
+
+        # Updates through the client invalidate the listing.
+        self.requests_mock.put(url + '/nginx/1.13',
+                               json={'name': 'nginx', 'version': '1.13'})
+        self.client.update_app('nginx', '1.13')
+        self.requests_mock.get(url, json=[{'name': 'nginx',
+                                           'version': '1.13'}])
+        self.assertEqual(len(self.client.apps()), 1)
+
+    def test_instances(self):
+        """
+        Test that Client_v2.instances caches lazy and normal listings.
+        """
+
+        url = self.URL + self.PATH + 'instances'
+        self.requests_mock.get(url, json=[{'name': 'web'}])
+        self.assertEqual(self.client.instances()[0].name, 'web')
+        self.assertEqual(self.client.instances(lazy=True)[0].name, 'web')
+        self.assertEqual(self.client.instances()[0].name, 'web')
+        self.assertEqual(self.requests_mock.call_count, 2)
+
+        self.requests_mock.delete(url + '/web',
+                                  json={'name': 'web',
+                                        'state': {'desired': 'stopped'}})
+        self.client.delete_instance('web')
+        self.requests_mock.get(url, json=[])
+        self.assertEqual(self.client.instances(), [])
+        self.assertEqual(self.client.instances(lazy=True), [])
+
+class NegativeCacheTest(unittest.TestCase):
+    """
+    Tests for the cache of missing keys.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = NegativeCache(ttl=30, max_size=2, clock=self.clock)
+
+    def test_expiry(self):
+        """
+        Test that missing keys expire.
+        """
+
+        self.assertNotIn('foo', self.cache)
+        self.cache.add('foo')
+        self.assertIn('foo', self.cache)
+        self.clock.now += 30
+        self.assertNotIn('foo', self.cache)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_max_size(self):
+        """
+        Test that the oldest keys are removed when the cache is full.
+        """
+
+        for key in ('foo', 'bar', 'baz'):
+            self.cache.add(key)
+
+        self.assertNotIn('foo', self.cache)
+        self.assertIn('bar', self.cache)
+        self.cache.discard('bar')
+        self.assertNotIn('bar', self.cache)
+        self.cache.clear()
+        self.assertNotIn('baz', self.cache)
+
+    def test_generation(self):
+        """
+        Test that keys discarded after a lookup started are not remembered.
+        """
+
+        generation = self.cache.generation()
+        self.cache.discard('foo')
+        self.cache.add('foo', generation)
+        self.assertNotIn('foo', self.cache)
+        self.cache.add('bar', generation)
+        self.assertIn('bar', self.cache)
+        self.cache.add('foo', self.cache.generation())
+        self.assertIn('foo', self.cache)
+
+        # Discards that are no longer remembered reject older lookups.
+        generation = self.cache.generation()
+        for key in ('a', 'b', 'c'):
+            self.cache.discard(key)
+
+        self.cache.add('qux', generation)
+        self.assertNotIn('qux', self.cache)
+        generation = self.cache.generation()
+        self.cache.clear()
+        self.cache.add('qux', generation)
+        self.assertNotIn('qux', self.cache)
+
+class Client_v2_NegativeCacheTest(RequestsTestCase):
+    """
+    Tests for the BigBoat v2 API client using a negative cache.
+    """
+
+    URL = 'http://dashboard.example/'
+    PATH = 'api/v2/'
+
+    def setUp(self):
+        super(Client_v2_NegativeCacheTest, self).setUp()
+        self.clock = Clock()
+        self.cache = NegativeCache(ttl=30, clock=self.clock)
+        self.client = Client_v2(self.URL, 'my-api-key',
+                                negative_cache=self.cache)
+
+    def test_get_app(self):
+        """
+        Test that Client_v2.get_app remembers missing applications until
+        they are created.
+        """
+
+        url = self.URL + self.PATH + 'apps/nginx/1.13'
+        self.requests_mock.get(url, status_code=404)
+        self.assertIsNone(self.client.get_app('nginx', '1.13'))
+        self.assertIsNone(self.client.get_app('nginx', '1.13'))
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+        self.requests_mock.put(url, json={'name': 'nginx', 'version': '1.13'})
+        self.client.update_app('nginx', '1.13')
+        self.requests_mock.get(url, json={'name': 'nginx', 'version': '1.13'})
+        self.assertEqual(self.client.get_app('nginx', '1.13').version, '1.13')
+
+    def test_get_instance(self):
+        """
+        Test that Client_v2.get_instance remembers missing instances for
+        a limited time.
+        """
+
+        url = self.URL + self.PATH + 'instances/web'
+        self.requests_mock.get(url, status_code=404)
+        self.assertIsNone(self.client.get_instance('web'))
+        self.assertIsNone(self.client.get_instance('web'))
+        self.assertEqual(self.requests_mock.call_count, 1)
+
+        self.clock.now += 30
+        self.assertIsNone(self.client.get_instance('web'))
+        self.assertEqual(self.requests_mock.call_count, 2)
+
+        self.requests_mock.put(url, json={'name': 'web',
+                                          'state': {'desired': 'running'}})
+        self.client.update_instance('web', 'nginx', '1.13')
+        self.requests_mock.get(url, json={'name': 'web'})
+        self.assertEqual(self.client.get_instance('web').name, 'web')
+
+    def test_get_instance_created(self):
+        """
+        Test that an instance that is created during a lookup that does not
+        find it is not remembered as missing.
+        """
+
+        url = self.URL + self.PATH + 'instances/web'
+        self.requests_mock.put(url, json={'name': 'web',
+                                          'state': {'desired': 'running'}})
+
+        def create(request, context):
+            """
+            Create the instance while the lookup is in progress.
+            """
+
+            self.client.update_instance('web', 'nginx', '1.13')
+            context.status_code = 404
+            return ''
+
+        self.requests_mock.get(url, text=create)
+        self.assertIsNone(self.client.get_instance('web'))
+        self.requests_mock.get(url, json={'name': 'web'})
+        self.assertEqual(self.client.get_instance('web').name, 'web')
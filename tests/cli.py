@@ -0,0 +1,279 @@
+"""
+Tests for the command line interface.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from mock import patch
+from bigboat.cli import main, parse_fields, parse_instance
+from tests.client import RequestsTestCase
+
+class ParseTest(unittest.TestCase):
+    """
+    Tests for parsing items of batch operations.
+    """
+
+    def test_parse_fields(self):
+        """
+        Test the parse_fields function.
+        """
+
+        self.assertEqual(parse_fields('nginx/1.13', 2), ('nginx', '1.13'))
+        self.assertEqual(parse_fields(' nginx  1.13 ', 2), ('nginx', '1.13'))
+        with self.assertRaises(ValueError):
+            parse_fields('nginx', 2)
+
+    def test_parse_instance(self):
+        """
+        Test the parse_instance function.
+        """
+
+        self.assertEqual(parse_instance('web nginx 1.13'),
+                         ('web', {'app': 'nginx', 'version': '1.13'}))
+        self.assertEqual(parse_instance(
+            '{"name": "web", "app": "nginx", "version": "1.13", '
+            '"parameters": {"key": "value"}}'
+        ), ('web', {'app': 'nginx', 'version': '1.13',
+                    'parameters': {'key': 'value'}}))
+        with self.assertRaises(ValueError):
+            parse_instance('{"name": "web"}')
+
+class MainTest(RequestsTestCase):
+    """
+    Tests for running commands.
+    """
+
+    URL = 'http://dashboard.example/'
+    PATH = 'api/v2/'
+
+    def run_command(self, args, stdin=u''):
+        """
+        Run the command line interface and parse its JSON Lines output.
+        """
+
+        output = StringIO()
+        code = main(['--url', self.URL, '--api-key', 'my-api-key'] + args,
+                    stdin=StringIO(stdin), stdout=output)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        return code, lines
+
+    def test_apps(self):
+        """
+        Test the apps commands.
+        """
+
+        self.requests_mock.get(self.URL + self.PATH + 'apps', json=[
+            {'id': 'a', 'name': 'nginx', 'version': 'latest'}
+        ])
+        code, lines = self.run_command(['apps', 'list'])
+        self.assertEqual(code, 0)
+        self.assertEqual(lines, [{'name': 'nginx', 'version': 'latest'}])
+
+        self.requests_mock.put(self.URL + self.PATH + 'apps/nginx/1.13',
+                               json={'name': 'nginx', 'version': '1.13'})
+        self.requests_mock.put(self.URL + self.PATH + 'apps/nginx/bad',
+                               status_code=400,
+                               headers={'Content-Type': 'application/json'},
+                               json={'message': 'Invalid version'})
+        code, lines = self.run_command(['apps', 'register', 'nginx/1.13',
+                                        'nginx/bad'])
+        self.assertEqual(code, 1)
+        self.assertEqual(sorted(lines, key=lambda line: line['key']), [
+            {'key': 'nginx/1.13', 'ok': True, 'error': None,
+             'result': {'name': 'nginx', 'version': '1.13'}},
+            {'key': 'nginx/bad', 'ok': False, 'error': 'Invalid version',
+             'result': None}
+        ])
+
+    def test_instances(self):
+        """
+        Test the instances commands with items from standard input.
+        """
+
+        self.requests_mock.get(self.URL + self.PATH + 'instances', json=[
+            {'name': 'web', 'state': {'current': 'running',
+                                      'desired': 'running'},
+             'app': {'name': 'nginx', 'version': '1.13'}}
+        ])
+        code, lines = self.run_command(['instances', 'list'])
+        self.assertEqual(code, 0)
+        self.assertEqual(lines[0]['name'], 'web')
+        self.assertEqual(lines[0]['application'],
+                         {'name': 'nginx', 'version': '1.13'})
+
+        for name in ('web', 'db'):
+            self.requests_mock.delete(self.URL + self.PATH +
+                                      'instances/' + name,
+                                      json={'name': name,
+                                            'state': {'current': 'running',
+                                                      'desired': 'stopped'}})
+
+        code, lines = self.run_command(['instances', 'stop'],
+                                       stdin=u'web\n# comment\n\ndb\n')
+        self.assertEqual(code, 0)
+        self.assertEqual(sorted(line['key'] for line in lines), ['db', 'web'])
+        self.assertTrue(all(line['result']['desired_state'] == 'stopped'
+                            for line in lines))
+
+        self.requests_mock.put(self.URL + self.PATH + 'instances/web',
+                               json={'name': 'web',
+                                     'state': {'desired': 'running'},
+                                     'app': {'name': 'nginx',
+                                             'version': '1.13'}})
+        code, lines = self.run_command(['instances', 'start', '-'],
+                                       stdin=u'web/nginx/1.13\n')
+        self.assertEqual(code, 0)
+        self.assertEqual(lines[0]['key'], 'web')
+        self.assertEqual(self.requests_mock.last_request.json()['app'],
+                         'nginx')
+
+    def test_compose(self):
+        """
+        Test the compose commands with items from a file.
+        """
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        compose_path = os.path.join(directory, 'docker-compose.yml')
+        with open(compose_path, 'w') as compose_file:
+            compose_file.write('www:\n  image: nginx\n')
+
+        batch_path = os.path.join(directory, 'batch.txt')
+        with open(batch_path, 'w') as batch_file:
+            batch_file.write('nginx/1.13/dockerCompose {}\n'.format(
+                compose_path
+            ))
+
+        path = self.URL + self.PATH + 'apps/nginx/1.13/files/dockerCompose'
+        self.requests_mock.put(path, status_code=201)
+        code, lines = self.run_command(['compose', 'put', '--file',
+                                        batch_path])
+        self.assertEqual(code, 0)
+        self.assertEqual(lines, [{'key': 'nginx/1.13/dockerCompose',
+                                  'ok': True, 'result': True,
+                                  'error': None}])
+        self.assertEqual(self.requests_mock.last_request.text,
+                         'www:\n  image: nginx\n')
+
+        self.requests_mock.get(path, text='www:\n  image: nginx\n',
+                               headers={'Content-Type': 'text/yaml'})
+        code, lines = self.run_command(['compose', 'get',
+                                        'nginx 1.13 dockerCompose'])
+        self.assertEqual(code, 0)
+        self.assertEqual(lines[0]['result'], 'www:\n  image: nginx\n')
+
+    def test_snapshot(self):
+        """
+        Test the snapshot commands.
+        """
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'snapshot.jsonl.gz')
+
+        self.requests_mock.get(self.URL + self.PATH + 'apps', json=[
+            {'id': 'a', 'name': 'nginx', 'version': '1.13'}
+        ])
+        for file_name in ('dockerCompose', 'bigboatCompose'):
+            self.requests_mock.get(self.URL + self.PATH +
+                                   'apps/nginx/1.13/files/' + file_name,
+                                   text='name: nginx\n',
+                                   headers={'Content-Type': 'text/yaml'})
+        self.requests_mock.get(self.URL + self.PATH + 'instances', json=[])
+        code, lines = self.run_command(['snapshot', 'export', path])
+        self.assertEqual((code, lines), (0, []))
+
+        self.requests_mock.put(self.URL + self.PATH + 'apps/nginx/1.13',
+                               json={'name': 'nginx', 'version': '1.13'})
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/1.13/files/dockerCompose',
+                               status_code=201)
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/1.13/files/bigboatCompose',
+                               status_code=500)
+        code, lines = self.run_command(['snapshot', 'import', path])
+        self.assertEqual(code, 1)
+        self.assertEqual([(line['stage'], line['key']) for line in lines],
+                         [('compose', 'nginx/1.13/bigboatCompose')])
+
+    def test_status(self):
+        """
+        Test the status command.
+        """
+
+        self.requests_mock.get(self.URL + self.PATH + 'status', json=[
+            {'name': 'Available IPs', 'isOk': True}
+        ])
+        code, lines = self.run_command(['status'])
+        self.assertEqual(code, 0)
+        self.assertEqual(lines, [{'name': 'Available IPs', 'isOk': True}])
+
+    def test_errors(self):
+        """
+        Test reporting configuration and connection errors.
+        """
+
+        with patch.dict('os.environ', {'BIGBOAT_URL': '',
+                                       'BIGBOAT_API_KEY': ''}):
+            with patch('sys.stderr', new_callable=StringIO):
+                with self.assertRaises(SystemExit):
+                    main(['status'], stdout=StringIO())
+
+        import requests
+        self.requests_mock.get(self.URL + self.PATH + 'status',
+                               exc=requests.exceptions.ConnectionError)
+        with patch('sys.stderr', new_callable=StringIO) as stderr:
+            code, lines = self.run_command(['status'])
+
+        self.assertEqual(code, 1)
+        self.assertEqual(lines, [])
+        self.assertIn('bigboat: error', stderr.getvalue())
+
+    def test_item_failures(self):
+        """
+        Test that missing items, operations that were not performed and
+        connection errors are reported per item.
+        """
+
+        import requests
+        self.requests_mock.get(self.URL + self.PATH + 'instances/missing',
+                               status_code=404)
+        self.requests_mock.get(self.URL + self.PATH + 'instances/down',
+                               exc=requests.exceptions.ConnectionError)
+        self.requests_mock.get(self.URL + self.PATH + 'instances/web',
+                               json={'name': 'web'})
+        code, lines = self.run_command(['instances', 'get', 'missing', 'down',
+                                        'web'])
+        self.assertEqual(code, 1)
+        results = dict((line['key'], line) for line in lines)
+        self.assertEqual(sorted(results.keys()), ['down', 'missing', 'web'])
+        self.assertFalse(results['missing']['ok'])
+        self.assertIsNone(results['missing']['result'])
+        self.assertFalse(results['down']['ok'])
+        self.assertTrue(results['web']['ok'])
+
+        self.requests_mock.delete(self.URL + self.PATH + 'apps/foo/1',
+                                  status_code=404)
+        code, lines = self.run_command(['apps', 'delete', 'foo/1'])
+        self.assertEqual(code, 1)
+        self.assertEqual(lines[0]['key'], 'foo/1')
+        self.assertFalse(lines[0]['ok'])
+        self.assertFalse(lines[0]['result'])
@@ -16,12 +16,31 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import gzip
+import io
 import json
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
 import requests
 import requests_mock
 import yaml
-from bigboat.client import Client, Client_v1, Client_v2
+from bigboat.client import Client, Client_v1, Client_v2, EnvironmentKey
+from bigboat.concurrency import AdaptiveLimiter
+from bigboat.metrics import TransferMetrics
+
+def gzip_bytes(text):
+    """
+    Compress text with gzip.
+    """
+
+    stream = io.BytesIO()
+    with gzip.GzipFile(fileobj=stream, mode='wb', mtime=0) as gzip_file:
+        gzip_file.write(text.encode('utf-8'))
+
+    return stream.getvalue()
 
 class Client_Test(unittest.TestCase):
     """
@@ -217,6 +236,55 @@ class Client_v2_Test(RequestsTestCase):
         super(Client_v2_Test, self).setUp()
         self.client = Client_v2(self.URL, self.KEY)
 
+    def test_pickle(self):
+        """
+        Test pickling the client.
+        """
+
+        client = Client_v2(self.URL, self.KEY, validate_compose=True,
+                           concurrency=AdaptiveLimiter(initial=2),
+                           pickle_api_key=True)
+        self.requests_mock.delete(self.URL + self.PATH + 'apps/nginx/latest',
+                                  status_code=204)
+        self.assertTrue(client.delete_app('nginx', 'latest'))
+
+        clone = pickle.loads(pickle.dumps(client))
+        self.assertEqual(clone.base_url, 'http://dashboard.example')
+        self.assertEqual(clone._sessions.idle, 0)
+        self.assertTrue(clone._validate_compose)
+        self.assertEqual(clone.concurrency.limit, client.concurrency.limit)
+        self.assertIsNot(clone.concurrency, client.concurrency)
+
+        self.assertTrue(clone.delete_app('nginx', 'latest'))
+        self.assertEqual(self.requests_mock.last_request.headers['api-key'],
+                         self.KEY)
+
+    def test_pickle_api_key(self):
+        """
+        Test that pickled clients only contain a reference to the API key
+        unless embedding the key is enabled.
+        """
+
+        with self.assertRaises(TypeError):
+            pickle.dumps(self.client)
+
+        os.environ['BIGBOAT_TEST_API_KEY'] = self.KEY
+        self.addCleanup(os.environ.pop, 'BIGBOAT_TEST_API_KEY', None)
+        client = Client_v2(self.URL, EnvironmentKey('BIGBOAT_TEST_API_KEY'))
+        data = pickle.dumps(client)
+        self.assertNotIn(self.KEY.encode('ascii'), data)
+
+        clone = pickle.loads(data)
+        self.requests_mock.delete(self.URL + self.PATH + 'apps/nginx/latest',
+                                  status_code=204)
+        self.assertTrue(clone.delete_app('nginx', 'latest'))
+        self.assertEqual(self.requests_mock.last_request.headers['api-key'],
+                         self.KEY)
+
+        del os.environ['BIGBOAT_TEST_API_KEY']
+        with self.assertRaises(ValueError):
+            Client_v2(self.URL, EnvironmentKey('BIGBOAT_TEST_API_KEY')).apps()
+
     def test_apps(self):
         """
         Test the Client_v2.apps method.
@@ -240,6 +308,24 @@ class Client_v2_Test(RequestsTestCase):
         app_pairs = list(sorted((app.name, app.version) for app in apps))
         self.assertEqual(app_pairs, [('nginx', '1.11.4'), ('nginx', 'latest')])
 
+    def test_json_decoder(self):
+        """
+        Test that Client_v2 uses a custom JSON decoder on the response bytes.
+        """
+
+        decoded = []
+        def decoder(data):
+            decoded.append(data)
+            return json.loads(data.decode('utf-8'))
+
+        client = Client_v2(self.URL, self.KEY, json_decoder=decoder)
+        self.requests_mock.get(self.URL + self.PATH + 'apps',
+                               json=[{"name": "nginx", "version": "latest"}])
+
+        apps = client.apps()
+        self.assertEqual(apps[0].name, 'nginx')
+        self.assertEqual(decoded, [b'[{"name": "nginx", "version": "latest"}]'])
+
     def test_get_app(self):
         """
         Test the Client_v2.get_app method.
@@ -372,6 +458,306 @@ www:
         self.assertTrue(self.client.update_compose('nginx', 'latest',
                                                    'bigboatCompose', content))
 
+    def test_download_compose(self):
+        """
+        Test the Client_v2.download_compose method.
+        """
+
+        url = self.URL + self.PATH
+        content = 'name: nginx\nversion: latest\n' + 'www: {}\n' * 1000
+        self.requests_mock.get(url + 'apps/does/notexist/files/dockerCompose',
+                               status_code=404)
+        self.requests_mock.get(url + 'apps/nginx/latest/files/bigboatCompose',
+                               headers={'Content-Type': 'text/yaml'},
+                               text=content)
+
+        stream = io.BytesIO()
+        self.assertIsNone(self.client.download_compose('does', 'notexist',
+                                                       'dockerCompose',
+                                                       stream))
+        self.assertEqual(stream.getvalue(), b'')
+        size = self.client.download_compose('nginx', 'latest',
+                                            'bigboatCompose', stream,
+                                            chunk_size=100)
+        self.assertEqual(size, len(content))
+        self.assertEqual(stream.getvalue(), content.encode('utf-8'))
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'bigboat-compose.yml')
+        self.client.download_compose('nginx', 'latest', 'bigboatCompose',
+                                     path)
+        with open(path) as compose_file:
+            self.assertEqual(compose_file.read(), content)
+
+        # The digest of the download is known to sync_compose.
+        self.assertFalse(self.client.sync_compose('nginx', 'latest',
+                                                  'bigboatCompose',
+                                                  content).uploaded)
+
+    def test_upload_compose(self):
+        """
+        Test the Client_v2.upload_compose method.
+        """
+
+        url = self.URL + self.PATH
+        self.requests_mock.put(url + 'apps/does/notexist/files/dockerCompose',
+                               status_code=404)
+        uploads = []
+
+        def handler(request, context):
+            """
+            Read the streamed body and accept it if it is for the application.
+            """
+
+            uploads.append(request.body.read())
+            if not uploads[-1].startswith(b'name: nginx'):
+                context.status_code = 400
+                return 'Name property of Bigboat compose needs to be equal ' \
+                       'to name property of App'
+
+            context.status_code = 201
+            return ''
+
+        self.requests_mock.put(url + 'apps/nginx/latest/files/bigboatCompose',
+                               headers={'Content-Type': 'text/plain'},
+                               text=handler)
+
+        self.assertFalse(self.client.upload_compose('does', 'notexist',
+                                                    'dockerCompose',
+                                                    io.BytesIO(b'x: y')))
+        with self.assertRaises(ValueError):
+            self.client.upload_compose('nginx', 'latest', 'bigboatCompose',
+                                       io.BytesIO(b'name: other\n'))
+
+        content = 'name: nginx\nversion: latest\n\nwww:\n  enable_ssh: true\n'
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'bigboat-compose.yml')
+        with open(path, 'w') as compose_file:
+            compose_file.write(content)
+
+        self.assertTrue(self.client.upload_compose('nginx', 'latest',
+                                                   'bigboatCompose', path,
+                                                   chunk_size=8))
+        self.assertEqual(uploads[-1], content.encode('utf-8'))
+        self.assertFalse(self.client.sync_compose('nginx', 'latest',
+                                                  'bigboatCompose',
+                                                  content).uploaded)
+
+    def test_compress_requests(self):
+        """
+        Test compressing the bodies of compose file uploads.
+        """
+
+        metrics = TransferMetrics()
+        client = Client_v2(self.URL, self.KEY, compress_requests=100,
+                           metrics=metrics)
+        content = 'name: nginx\nversion: latest\n' + 'www: {}\n' * 100
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/latest/files/dockerCompose',
+                               status_code=201)
+
+        self.assertTrue(client.update_compose('nginx', 'latest',
+                                              'dockerCompose', content))
+        request = self.requests_mock.last_request
+        self.assertEqual(request.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(request.body)).read(),
+                         content.encode('utf-8'))
+
+        self.assertTrue(client.update_compose('nginx', 'latest',
+                                              'dockerCompose', 'x: y'))
+        self.assertNotIn('Content-Encoding',
+                         self.requests_mock.last_request.headers)
+
+        stats = metrics.stats()
+        self.assertEqual(stats.requests, 2)
+        self.assertEqual(stats.compressed_requests, 1)
+        self.assertEqual(stats.sent_raw, len(content) + 4)
+        self.assertLess(stats.sent_wire, len(content))
+
+    def test_compression_rejected(self):
+        """
+        Test that a compressed body that the server rejects is sent again
+        without compression, and that compression is no longer used.
+        """
+
+        client = Client_v2(self.URL, self.KEY, compress_requests=0)
+        responses = [{'status_code': 415}, {'status_code': 201},
+                     {'status_code': 201}]
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/latest/files/dockerCompose',
+                               responses)
+
+        self.assertTrue(client.update_compose('nginx', 'latest',
+                                              'dockerCompose', 'x: y'))
+        self.assertTrue(client.update_compose('nginx', 'latest',
+                                              'dockerCompose', 'x: z'))
+        history = self.requests_mock.request_history
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history[0].headers['Content-Encoding'], 'gzip')
+        self.assertEqual(history[1].body, b'x: y')
+        self.assertNotIn('Content-Encoding', history[2].headers)
+
+    def test_compression_invalid(self):
+        """
+        Test that compose files that are compressed are validated locally,
+        so that an invalid file does not cause a second request.
+        """
+
+        client = Client_v2(self.URL, self.KEY, compress_requests=0)
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/latest/files/dockerCompose',
+                               status_code=400, text='Invalid YAML',
+                               headers={'Content-Type': 'text/plain'})
+
+        with self.assertRaises(ValueError):
+            client.update_compose('nginx', 'latest', 'dockerCompose', ':')
+
+        self.assertEqual(self.requests_mock.call_count, 0)
+
+    def test_compression_bad_request(self):
+        """
+        Test the fallback for a bad request of a valid compose file, which
+        keeps compression if the plain body is rejected as well.
+        """
+
+        client = Client_v2(self.URL, self.KEY, compress_requests=0)
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/latest/files/dockerCompose',
+                               status_code=400, text='Invalid image',
+                               headers={'Content-Type': 'text/plain'})
+
+        with self.assertRaises(ValueError):
+            client.update_compose('nginx', 'latest', 'dockerCompose', 'x: y')
+
+        self.assertEqual(self.requests_mock.call_count, 2)
+        self.assertFalse(client._compression_rejected)
+
+        self.requests_mock.put(self.URL + self.PATH +
+                               'apps/nginx/latest/files/dockerCompose',
+                               [{'status_code': 400, 'text': 'Bad YAML'},
+                                {'status_code': 201}])
+        self.assertTrue(client.update_compose('nginx', 'latest',
+                                              'dockerCompose', 'x: y'))
+        self.assertTrue(client._compression_rejected)
+
+    def test_response_metrics(self):
+        """
+        Test measuring the raw and wire bytes of compressed responses.
+        """
+
+        metrics = TransferMetrics()
+        client = Client_v2(self.URL, self.KEY, metrics=metrics)
+        body = json.dumps([{'name': 'nginx', 'version': 'latest'}] * 50)
+        self.requests_mock.get(self.URL + self.PATH + 'apps',
+                               content=gzip_bytes(body),
+                               headers={'Content-Encoding': 'gzip'})
+
+        self.assertEqual(len(client.apps()), 50)
+        self.assertEqual(self.requests_mock.last_request.headers[
+            'Accept-Encoding'], 'gzip, deflate')
+        stats = metrics.stats()
+        self.assertEqual(stats.requests, 1)
+        self.assertEqual(stats.compressed_responses, 1)
+        self.assertEqual(stats.received_raw, len(body))
+        self.assertEqual(stats.received_wire, len(gzip_bytes(body)))
+
+    def test_sync_compose(self):
+        """
+        Test the Client_v2.sync_compose method.
+        """
+
+        url = self.URL + self.PATH + 'apps/nginx/latest/files/dockerCompose'
+        get = self.requests_mock.get(url, text='www:\n  image: nginx\n',
+                                     headers={'Content-Type': 'text/plain'})
+        put = self.requests_mock.put(url, status_code=201)
+
+        # Unchanged contents are not uploaded.
+        result = self.client.sync_compose('nginx', 'latest', 'dockerCompose',
+                                          'www:\n  image: nginx\n')
+        self.assertEqual(result, (True, False))
+        self.assertTrue(result.success)
+        self.assertFalse(result.uploaded)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(put.call_count, 0)
+
+        # Changed contents are uploaded.
+        result = self.client.sync_compose('nginx', 'latest', 'dockerCompose',
+                                          'www:\n  image: nginx:1.13\n')
+        self.assertEqual(result, (True, True))
+        self.assertEqual(put.call_count, 1)
+
+        # The uploaded contents are now known, so no fetches are necessary.
+        result = self.client.sync_compose('nginx', 'latest', 'dockerCompose',
+                                          'www:\n  image: nginx:1.13\n')
+        self.assertEqual(result, (True, False))
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(put.call_count, 1)
+
+        # Failed uploads are reported.
+        self.requests_mock.put(url, status_code=404)
+        result = self.client.sync_compose('nginx', 'latest', 'dockerCompose',
+                                          'www:\n  image: nginx:1.14\n')
+        self.assertEqual(result, (False, True))
+
+    def test_get_composes(self):
+        """
+        Test the Client_v2.get_composes method.
+        """
+
+        url = self.URL + self.PATH
+        self.requests_mock.get(url + 'apps/nginx/latest/files/dockerCompose',
+                               headers={'Content-Type': 'text/plain'},
+                               text='www:\n  image: nginx\n')
+        self.requests_mock.get(url + 'apps/does/notexist/files/dockerCompose',
+                               status_code=404)
+        self.requests_mock.get(url + 'apps/bad/request/files/dockerCompose',
+                               status_code=400, text='error',
+                               headers={'Content-Type': 'text/plain'})
+
+        keys = [
+            ('nginx', 'latest', 'dockerCompose'),
+            ('does', 'notexist', 'dockerCompose'),
+            ('bad', 'request', 'dockerCompose')
+        ]
+        results = dict((result.key, result)
+                       for result in self.client.get_composes(keys))
+        self.assertEqual(set(results.keys()), set(keys))
+        self.assertEqual(results[keys[0]].result, 'www:\n  image: nginx\n')
+        self.assertIsNone(results[keys[1]].result)
+        self.assertIsNone(results[keys[1]].error)
+        self.assertIsInstance(results[keys[2]].error, ValueError)
+
+    def test_update_composes(self):
+        """
+        Test the Client_v2.update_composes method.
+        """
+
+        url = self.URL + self.PATH
+        self.requests_mock.put(url + 'apps/nginx/latest/files/bigboatCompose',
+                               text=self._put_bigboat_compose_handler)
+        self.requests_mock.put(url + 'apps/nginx/latest/files/dockerCompose',
+                               status_code=201)
+
+        mapping = {
+            ('nginx', 'latest', 'bigboatCompose'): 'name: other',
+            ('nginx', 'latest', 'dockerCompose'): 'www:\n  image: nginx\n'
+        }
+        results = dict((result.key, result)
+                       for result in self.client.update_composes(mapping))
+        self.assertIsInstance(results[('nginx', 'latest',
+                                       'bigboatCompose')].error, ValueError)
+        self.assertTrue(results[('nginx', 'latest', 'dockerCompose')].result)
+
+        # Unchanged contents are skipped when requested.
+        mapping = {
+            ('nginx', 'latest', 'dockerCompose'): 'www:\n  image: nginx\n'
+        }
+        results = list(self.client.update_composes(mapping,
+                                                   skip_unchanged=True))
+        self.assertEqual(results[0].result, (True, False))
+
     def test_instances(self):
         """
         Test the Client_v2.instances method.
@@ -407,6 +793,12 @@ www:
             ('nginx2', 'starting', 'running')
         ])
 
+        lazy_instances = self.client.instances(lazy=True)
+        self.assertEqual(list(sorted([
+            (instance.name, instance.current_state, instance.desired_state)
+            for instance in lazy_instances
+        ])), instance_data)
+
     def test_get_instance(self):
         """
         Test the Client_v2.get_instance method.
@@ -0,0 +1,188 @@
+"""
+Tests for adaptive concurrency control.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import pickle
+import threading
+import unittest
+import requests
+from bigboat.bulk import parallel
+from bigboat.client import Client_v2
+from bigboat.concurrency import AdaptiveLimiter
+from tests.client import RequestsTestCase
+
+class AdaptiveLimiterTest(unittest.TestCase):
+    """
+    Tests for the AIMD concurrency limiter.
+    """
+
+    def test_increase(self):
+        """
+        Test that healthy responses increase the limit additively.
+        """
+
+        limiter = AdaptiveLimiter(initial=4, maximum=6)
+        for _ in range(4):
+            limiter.record(0.1)
+
+        self.assertEqual(limiter.limit, 4)
+        limiter.record(0.1)
+        self.assertEqual(limiter.limit, 5)
+        for _ in range(50):
+            limiter.record(0.1)
+
+        self.assertEqual(limiter.limit, 6)
+        self.assertAlmostEqual(limiter.average_latency, 0.1)
+
+    def test_decrease(self):
+        """
+        Test that errors and latency spikes decrease the limit
+        multiplicatively, at most once per cooldown.
+        """
+
+        limiter = AdaptiveLimiter(initial=16, cooldown=60)
+        limiter.record(1.0, error=True)
+        self.assertEqual(limiter.limit, 8)
+        limiter.record(1.0, error=True)
+        self.assertEqual(limiter.limit, 8)
+
+        limiter = AdaptiveLimiter(initial=16, cooldown=0)
+        for _ in range(AdaptiveLimiter.WARMUP):
+            limiter.record(0.1)
+
+        limiter.record(1.0)
+        self.assertEqual(limiter.limit, 8)
+        for _ in range(10):
+            limiter.record(1.0, error=True)
+
+        self.assertEqual(limiter.limit, 1)
+
+        limiter = AdaptiveLimiter(initial=16, latency_threshold=0.5)
+        limiter.record(0.6)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_acquire(self):
+        """
+        Test that the limiter bounds the number of concurrent operations.
+        """
+
+        limiter = AdaptiveLimiter(initial=2, maximum=8)
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+        release = threading.Event()
+
+        def operation(key):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+
+            release.wait(0.01)
+            with lock:
+                state['running'] -= 1
+
+            return key
+
+        results = list(parallel(operation, range(20), limiter=limiter))
+        self.assertEqual(len(results), 20)
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertIn('limit=2', repr(limiter))
+
+    def test_pickle(self):
+        """
+        Test that pickling the limiter keeps its configuration and limit.
+        """
+
+        limiter = AdaptiveLimiter(initial=8, minimum=2, maximum=16,
+                                  decrease=0.25, cooldown=0)
+        limiter.acquire()
+        limiter.record(0.1, error=True)
+        clone = pickle.loads(pickle.dumps(limiter))
+        self.assertEqual(clone.limit, 2)
+        self.assertEqual(clone.minimum, 2)
+        self.assertEqual(clone.maximum, 16)
+        self.assertEqual(clone.in_flight, 0)
+        self.assertIsNone(clone.average_latency)
+
+class Client_v2_ConcurrencyTest(RequestsTestCase):
+    """
+    Tests for the BigBoat v2 API client with adaptive concurrency.
+    """
+
+    URL = 'http://dashboard.example/api/v2/'
+
+    def setUp(self):
+        super(Client_v2_ConcurrencyTest, self).setUp()
+        self.limiter = AdaptiveLimiter(initial=8, cooldown=60)
+        self.client = Client_v2('http://dashboard.example', 'my-api-key',
+                                concurrency=self.limiter)
+
+    def test_record(self):
+        """
+        Test that the client reports the outcome of requests to the limiter.
+        """
+
+        self.assertIs(self.client.concurrency, self.limiter)
+        self.requests_mock.get(self.URL + 'apps', json=[])
+        self.client.apps()
+        self.assertIsNotNone(self.limiter.average_latency)
+        self.assertEqual(self.limiter.limit, 8)
+
+        self.requests_mock.delete(self.URL + 'apps/nginx/latest',
+                                  status_code=503)
+        self.client.delete_app('nginx', 'latest')
+        self.assertEqual(self.limiter.limit, 4)
+
+        self.requests_mock.get(self.URL + 'status',
+                               exc=requests.exceptions.ConnectTimeout)
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.client.statuses()
+
+    def test_bulk_instances(self):
+        """
+        Test the bulk instance methods of the client.
+        """
+
+        for name in ('a', 'b'):
+            data = {
+                "name": name,
+                "state": {"current": "running", "desired": "running"},
+                "app": {"name": "nginx", "version": "latest"}
+            }
+            self.requests_mock.get(self.URL + 'instances/' + name, json=data)
+            self.requests_mock.put(self.URL + 'instances/' + name, json=data)
+            self.requests_mock.delete(self.URL + 'instances/' + name,
+                                      json=data)
+
+        self.requests_mock.get(self.URL + 'instances/c', status_code=404)
+
+        results = dict((result.key, result.result) for result in
+                       self.client.get_instances(['a', 'b', 'c']))
+        self.assertEqual(results['a'].name, 'a')
+        self.assertIsNone(results['c'])
+
+        results = list(self.client.update_instances({
+            'a': {'app': 'nginx', 'version': 'latest'},
+            'b': {'app': 'nginx', 'version': 'latest',
+                  'parameters': {'SETTING': 'value'}}
+        }))
+        self.assertEqual(set(result.key for result in results), {'a', 'b'})
+        self.assertEqual(self.requests_mock.request_history[-1].method, 'PUT')
+
+        results = list(self.client.delete_instances(['a', 'b']))
+        self.assertEqual(sorted(result.result.name for result in results),
+                         ['a', 'b'])
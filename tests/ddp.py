@@ -0,0 +1,369 @@
+"""
+Tests for real-time instance updates over DDP.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import socket
+import threading
+import unittest
+from mock import MagicMock
+from bigboat.client import Client_v2
+from bigboat.ddp import DDPConnection, DDPError, InstanceSubscription
+from bigboat.instance import LazyInstance
+
+class FakeSocket(object):
+    """
+    In-memory stand-in for a websocket connection to a DDP server, which
+    replies with scripted messages.
+    """
+
+    def __init__(self, messages, cancel=None):
+        self.messages = [json.dumps(message) for message in messages]
+        self.sent = []
+        self.closed = False
+        self.cancel = cancel
+
+    def send(self, data):
+        """
+        Record a message sent by the client.
+        """
+
+        self.sent.append(json.loads(data))
+
+    def recv(self):
+        """
+        Provide the next scripted message. Once the script is done, the
+        connection is either cancelled or closed by the server.
+        """
+
+        if self.messages:
+            return self.messages.pop(0)
+        if self.cancel is not None:
+            self.cancel.set()
+            raise socket.timeout('timed out')
+
+        return ''
+
+    def close(self):
+        """
+        Close the connection.
+        """
+
+        self.closed = True
+
+class RecordingEvent(threading.Event):
+    """
+    Event that records the timeouts of waits instead of waiting.
+    """
+
+    def __init__(self):
+        super(RecordingEvent, self).__init__()
+        self.waits = []
+
+    def wait(self, timeout=None):
+        """
+        Record the timeout and return immediately.
+        """
+
+        self.waits.append(timeout)
+        return self.is_set()
+
+def document(name, state='running'):
+    """
+    Create the fields of an instance document.
+    """
+
+    return {
+        'name': name,
+        'state': {'current': state, 'desired': 'running'},
+        'app': {'name': 'nginx', 'version': '1.13'}
+    }
+
+class DDPConnectionTest(unittest.TestCase):
+    """
+    Tests for the DDP connection.
+    """
+
+    def test_open(self):
+        """
+        Test connecting to the DDP server.
+        """
+
+        fake = FakeSocket([
+            {'server_id': '0'},
+            {'msg': 'ping', 'id': 'p1'},
+            {'msg': 'connected', 'session': 'abc'}
+        ])
+        connection = DDPConnection('ws://bigboat/websocket',
+                                   connect=lambda url, timeout: fake)
+        connection.open()
+        self.assertEqual(connection.session, 'abc')
+        self.assertEqual(fake.sent, [
+            {'msg': 'connect', 'version': '1',
+             'support': ['1', 'pre2', 'pre1']},
+            {'msg': 'pong', 'id': 'p1'}
+        ])
+
+        self.assertEqual(connection.subscribe('instances', ['x']), '1')
+        self.assertEqual(fake.sent[-1], {'msg': 'sub', 'id': '1',
+                                         'name': 'instances',
+                                         'params': ['x']})
+        connection.close()
+        self.assertTrue(fake.closed)
+        self.assertIsNone(connection.session)
+
+    def test_open_failed(self):
+        """
+        Test failing to connect to the DDP server.
+        """
+
+        fake = FakeSocket([{'msg': 'failed', 'version': '2'}])
+        connection = DDPConnection('ws://bigboat/websocket',
+                                   connect=lambda url, timeout: fake)
+        with self.assertRaises(DDPError) as context:
+            connection.open()
+        self.assertIn('version 2', str(context.exception))
+
+        def refuse(url, timeout):
+            """
+            Refuse the connection.
+            """
+
+            raise socket.error('Connection refused')
+
+        connection = DDPConnection('ws://bigboat/websocket', connect=refuse)
+        with self.assertRaises(DDPError) as context:
+            connection.open()
+        self.assertIn('Connection refused', str(context.exception))
+
+        connection = DDPConnection('ws://bigboat/websocket',
+                                   connect=lambda url, timeout: FakeSocket([]))
+        with self.assertRaises(DDPError) as context:
+            connection.open()
+        self.assertIn('closed', str(context.exception))
+
+class InstanceSubscriptionTest(unittest.TestCase):
+    """
+    Tests for the subscription to instances over DDP.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client_v2)
+        self.client.base_url = 'https://bigboat.example'
+        self.cancel = threading.Event()
+        self.sockets = []
+
+    def subscription(self, scripts, **kwargs):
+        """
+        Create a subscription whose connections follow the scripts. The last
+        connection is cancelled once its script is done, earlier connections
+        are closed by the server.
+        """
+
+        scripts = list(scripts)
+
+        def connect(url, timeout):
+            """
+            Open a fake connection, or refuse it when out of scripts.
+            """
+
+            if not scripts:
+                raise socket.error('Connection refused')
+
+            script = scripts.pop(0)
+            fake = FakeSocket(script, cancel=None if scripts else self.cancel)
+            self.sockets.append(fake)
+            return fake
+
+        return InstanceSubscription(self.client, connect=connect, **kwargs)
+
+    def test_url(self):
+        """
+        Test the websocket URL derived from the base URL of the client.
+        """
+
+        subscription = InstanceSubscription(self.client)
+        self.assertEqual(subscription.url, 'wss://bigboat.example/websocket')
+        self.client.base_url = 'http://localhost:8080'
+        subscription = InstanceSubscription(self.client)
+        self.assertEqual(subscription.url, 'ws://localhost:8080/websocket')
+
+    def test_listen(self):
+        """
+        Test the InstanceSubscription.listen method.
+        """
+
+        subscription = self.subscription([[
+            {'msg': 'connected', 'session': 'abc'},
+            {'msg': 'added', 'collection': 'instances', 'id': 'a',
+             'fields': document('web')},
+            {'msg': 'added', 'collection': 'instances', 'id': 'b',
+             'fields': document('db')},
+            {'msg': 'added', 'collection': 'users', 'id': 'u',
+             'fields': {'name': 'admin'}},
+            {'msg': 'ready', 'subs': ['1']},
+            {'msg': 'changed', 'collection': 'instances', 'id': 'a',
+             'fields': {'state': {'current': 'stopped',
+                                  'desired': 'stopped'}}},
+            {'msg': 'changed', 'collection': 'instances', 'id': 'a',
+             'fields': {}, 'cleared': ['app']},
+            {'msg': 'changed', 'collection': 'instances', 'id': 'b',
+             'fields': {'logs': 'ignored'}},
+            {'msg': 'removed', 'collection': 'instances', 'id': 'b'}
+        ]])
+
+        events = []
+        subscription.listen(events.append, self.cancel)
+        self.assertEqual([(event.kind, event.name) for event in events], [
+            ('added', 'web'), ('added', 'db'), ('changed', 'web'),
+            ('changed', 'web'), ('removed', 'db')
+        ])
+        self.assertEqual(events[2].instance.current_state, 'stopped')
+        self.assertIsNone(events[3].instance.application)
+        self.assertEqual(list(subscription.tracker.instances().keys()),
+                         ['web'])
+        self.assertEqual(self.sockets[0].sent[-1]['msg'], 'sub')
+        self.assertTrue(self.sockets[0].closed)
+        self.assertFalse(subscription.subscribed)
+
+    def test_listen_nosub(self):
+        """
+        Test a subscription that is refused by the server.
+        """
+
+        subscription = self.subscription([[
+            {'msg': 'connected', 'session': 'abc'},
+            {'msg': 'nosub', 'id': '1', 'error': {'error': 404}}
+        ]])
+        with self.assertRaises(DDPError) as context:
+            subscription.listen(lambda event: None, self.cancel)
+        self.assertIn('instances failed', str(context.exception))
+
+    def test_run_fallback(self):
+        """
+        Test resubscribing after polling the REST API while the connection
+        is unavailable.
+        """
+
+        self.client.instances.return_value = [
+            LazyInstance(self.client, document('web'))
+        ]
+        subscription = self.subscription([[
+            {'msg': 'connected', 'session': 'abc'},
+            {'msg': 'added', 'collection': 'instances', 'id': 'a',
+             'fields': document('db')},
+            {'msg': 'ready', 'subs': ['1']}
+        ], [
+            {'msg': 'connected', 'session': 'def'},
+            {'msg': 'added', 'collection': 'instances', 'id': 'a',
+             'fields': document('web', 'stopped')},
+            {'msg': 'ready', 'subs': ['1']}
+        ]], retry_delay=0, max_retry_delay=0)
+
+        events = []
+        subscription.run(events.append, cancel=self.cancel)
+        self.assertEqual([(event.kind, event.name) for event in events], [
+            ('added', 'db'), ('added', 'web'), ('removed', 'db'),
+            ('changed', 'web')
+        ])
+        self.assertEqual(len(self.sockets), 2)
+        self.client.instances.assert_called_once_with()
+
+    def test_run_outage(self):
+        """
+        Test that failures of both the connection and the REST API do not
+        stop the subscription.
+        """
+
+        errors = [IOError('Connection refused'), ValueError('Bad gateway')]
+
+        def instances():
+            """
+            Fail the first polls of the REST API.
+            """
+
+            if errors:
+                raise errors.pop(0)
+
+            return [LazyInstance(self.client, document('web'))]
+
+        self.client.instances.side_effect = instances
+        scripts = [[
+            {'msg': 'connected', 'session': 'abc'},
+            {'msg': 'added', 'collection': 'instances', 'id': 'a',
+             'fields': document('web')},
+            {'msg': 'ready', 'subs': ['1']}
+        ]]
+        attempts = []
+
+        def connect(url, timeout):
+            """
+            Refuse the connection until the REST API has been polled three
+            times.
+            """
+
+            attempts.append(url)
+            if self.client.instances.call_count < 3:
+                raise socket.error('Connection refused')
+
+            fake = FakeSocket(scripts.pop(0), cancel=self.cancel)
+            self.sockets.append(fake)
+            return fake
+
+        subscription = InstanceSubscription(self.client, connect=connect,
+                                            fallback_interval=0.001,
+                                            retry_delay=0.001,
+                                            max_retry_delay=0.001)
+        events = []
+        subscription.run(events.append, cancel=self.cancel)
+        self.assertEqual([(event.kind, event.name) for event in events],
+                         [('added', 'web')])
+        self.assertGreaterEqual(self.client.instances.call_count, 3)
+        self.assertGreaterEqual(len(attempts), 2)
+        self.assertEqual(len(self.sockets), 1)
+
+    def test_run_retry_delay(self):
+        """
+        Test that the retry delay starts over when a subscription that became
+        ready drops, instead of growing over repeated outages.
+        """
+
+        self.client.instances.return_value = []
+        cancel = RecordingEvent()
+        ready = [
+            {'msg': 'connected', 'session': 'abc'},
+            {'msg': 'ready', 'subs': ['1']}
+        ]
+        scripts = [None, None, ready, ready, ready]
+
+        def connect(url, timeout):
+            """
+            Refuse the first connections, then drop ready subscriptions until
+            the last one is cancelled.
+            """
+
+            script = scripts.pop(0)
+            if script is None:
+                raise socket.error('Connection refused')
+
+            return FakeSocket(script, cancel=None if scripts else cancel)
+
+        subscription = InstanceSubscription(self.client, connect=connect,
+                                            fallback_interval=100,
+                                            retry_delay=1, max_retry_delay=60)
+        subscription.run(lambda event: None, cancel=cancel)
+        self.assertEqual(cancel.waits, [1, 2, 1, 1])
@@ -0,0 +1,185 @@
+"""
+Tests for ephemeral environments of instances.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import unittest
+import warnings
+from bigboat.application import Application
+from bigboat.client import Client
+from bigboat.environment import Environment, StartError, StopError
+from bigboat.instance import Instance
+
+class FakeClient(Client):
+    """
+    Client that keeps instances in memory. Started instances are running
+    after one poll, unless their name starts with 'bad'. Instances whose name
+    starts with 'error' cannot be started at all, and those whose name starts
+    with 'stuck' cannot be stopped.
+    """
+
+    def __init__(self):
+        super(FakeClient, self).__init__('http://dashboard.example')
+        self.lock = threading.Lock()
+        self.states = {}
+        self.versions = {}
+        self.deleted = []
+
+    def instances(self):
+        with self.lock:
+            listing = [
+                Instance(self, name, current_state=self.states[name],
+                         application=Application(self, 'app', version))
+                for name, version in self.versions.items()
+            ]
+            for name, state in list(self.states.items()):
+                if state == 'starting':
+                    self.states[name] = 'failed' if name.startswith('bad') \
+                        else 'running'
+
+        return listing
+
+    def update_instance(self, name, app_name, version, **kwargs):
+        if name.startswith('error'):
+            raise ValueError('Invalid instance')
+
+        with self.lock:
+            self.versions[name] = version
+            self.states[name] = 'starting'
+
+        return Instance(self, name, 'starting')
+
+    def delete_instance(self, name):
+        if name.startswith('stuck'):
+            raise IOError('Connection refused')
+
+        with self.lock:
+            self.deleted.append(name)
+            self.versions.pop(name, None)
+            self.states.pop(name, None)
+
+        return Instance(self, name, 'stopping')
+
+class EnvironmentTest(unittest.TestCase):
+    """
+    Tests for the ephemeral environment context manager.
+    """
+
+    def setUp(self):
+        self.client = FakeClient()
+
+    def environment(self, *names):
+        """
+        Create an environment with instances of the given names.
+        """
+
+        specs = dict((name, {'app': 'app', 'version': '1.0'})
+                     for name in names)
+        return Environment(self.client, specs, interval=0, timeout=5)
+
+    def test_context(self):
+        """
+        Test starting and stopping the instances of an environment.
+        """
+
+        with self.environment('one', 'two') as instances:
+            self.assertEqual(sorted(instances.keys()), ['one', 'two'])
+            self.assertEqual(instances['one'].current_state, 'running')
+            self.assertEqual(self.client.states,
+                             {'one': 'running', 'two': 'running'})
+
+        self.assertEqual(sorted(self.client.deleted), ['one', 'two'])
+        self.assertEqual(self.client.states, {})
+
+    def test_exception(self):
+        """
+        Test that the instances are stopped when the context raises an error.
+        """
+
+        with self.assertRaises(KeyError):
+            with self.environment('one', 'two'):
+                raise KeyError('test')
+
+        self.assertEqual(sorted(self.client.deleted), ['one', 'two'])
+
+    def test_start_error(self):
+        """
+        Test that all instances are stopped when one cannot be started.
+        """
+
+        with self.assertRaises(StartError) as context:
+            with self.environment('one', 'error'):
+                self.fail('Context should not be entered')
+
+        self.assertEqual(list(context.exception.failed.keys()), ['error'])
+        self.assertIsInstance(context.exception.failed['error'], ValueError)
+        self.assertEqual(sorted(self.client.deleted), ['error', 'one'])
+        self.assertEqual(self.client.states, {})
+
+    def test_failed_state(self):
+        """
+        Test that an instance that fails while starting causes a start error.
+        """
+
+        environment = self.environment('one', 'bad')
+        with self.assertRaises(StartError) as context:
+            environment.start()
+
+        self.assertEqual(context.exception.failed, {'bad': None})
+        self.assertEqual(environment.stop(), {})
+        self.assertEqual(self.client.states, {})
+
+    def test_no_wait(self):
+        """
+        Test starting an environment without waiting for the instances.
+        """
+
+        environment = Environment(self.client,
+                                  {'one': {'app': 'app', 'version': '1.0'}},
+                                  wait=False)
+        instances = environment.start()
+        self.assertEqual(instances['one'].current_state, 'starting')
+        self.assertEqual(environment.instances, instances)
+        environment.stop()
+        self.assertEqual(environment.instances, {})
+
+    def test_stop_error(self):
+        """
+        Test that instances that could not be stopped are reported.
+        """
+
+        with self.assertRaises(StopError) as context:
+            with self.environment('one', 'stuck'):
+                pass
+
+        self.assertEqual(list(context.exception.failed.keys()), ['stuck'])
+        self.assertIsInstance(context.exception.failed['stuck'], IOError)
+        self.assertEqual(self.client.deleted, ['one'])
+
+    def test_stop_error_warning(self):
+        """
+        Test that a failed teardown does not replace the error of the context.
+        """
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with self.assertRaises(KeyError):
+                with self.environment('stuck'):
+                    raise KeyError('test')
+
+        self.assertEqual(len(caught), 1)
+        self.assertIn('stuck', str(caught[0].message))
@@ -0,0 +1,71 @@
+"""
+Tests for importing the package.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import json
+import subprocess
+import sys
+import unittest
+
+# Dependencies that must not be imported until a client makes a request.
+HEAVY_MODULES = ('requests', 'yaml', 'past', 'concurrent.futures', 'orjson')
+
+def imported_modules(code):
+    """
+    Run code in a new interpreter and determine which of the heavy modules
+    it imported.
+    """
+
+    script = '{}\nimport json, sys\nprint(json.dumps([name for name in {!r} ' \
+        'if name in sys.modules]))'.format(code, HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+class ImportTest(unittest.TestCase):
+    """
+    Tests for importing the package without loading heavy dependencies.
+    """
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     'Clients are imported lazily since Python 3.7')
+    def test_import(self):
+        """
+        Test that importing the package and creating a client does not import
+        the dependencies that are needed to make requests.
+        """
+
+        self.assertEqual(imported_modules('import bigboat'), [])
+        self.assertEqual(imported_modules(
+            'import bigboat\n'
+            'bigboat.Client_v2("http://dashboard.example", "key")'
+        ), [])
+        self.assertEqual(imported_modules(
+            'from bigboat import Client_v1\n'
+            'Client_v1("http://dashboard.example")'
+        ), [])
+
+    def test_client_access(self):
+        """
+        Test that the clients are available from the package.
+        """
+
+        import bigboat
+        from bigboat.client import Client_v1, Client_v2
+        self.assertIs(bigboat.Client_v1, Client_v1)
+        self.assertIs(bigboat.Client_v2, Client_v2)
+        with self.assertRaises(AttributeError):
+            bigboat.Client_v3 # pylint: disable=no-member,pointless-statement
@@ -16,11 +16,21 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+from concurrent.futures import ProcessPoolExecutor
+import pickle
 import unittest
 from mock import MagicMock
-from bigboat.client import Client
+from bigboat.client import Client, Client_v2, EnvironmentKey
 from bigboat.application import Application
-from bigboat.instance import Instance
+from bigboat.instance import Instance, LazyInstance
+
+def describe(instance):
+    """
+    Describe an instance in a worker process.
+    """
+
+    return (instance.name, instance.application.version,
+            instance.client.base_url)
 
 class ApplicationTest(unittest.TestCase):
     """
@@ -67,6 +77,16 @@ class ApplicationTest(unittest.TestCase):
         self.client.delete_instance.assert_called_once_with('nginx')
         self.assertEqual(value, self.client.delete_instance.return_value)
 
+    def test_get_services(self):
+        """
+        Test the Instance.get_services method.
+        """
+
+        services = self.instance.get_services()
+        self.assertEqual(services, [('nginx', 'www', 'starting')])
+        self.assertEqual(services[0].state, 'starting')
+        self.assertEqual(Instance(self.client, 'foo').get_services(), [])
+
     def test_repr(self):
         """
         Test the Instance.__repr__ method.
@@ -80,3 +100,136 @@ class ApplicationTest(unittest.TestCase):
                    "parameters={'SETTING': 'value'}, " + \
                    "options={'storageBucket': 'custom'})"
         self.assertEqual(repr(self.instance), instance)
+
+class LazyInstanceTest(unittest.TestCase):
+    """
+    Tests for the lazily materialized application instance entity.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client)
+        self.data = {
+            'name': 'nginx',
+            'state': {'current': 'starting', 'desired': 'running'},
+            'app': {'name': 'nginx', 'version': 'latest'},
+            'services': {'www': {'state': 'starting'}},
+            'parameters': {'SETTING': 'value'},
+            'options': {'storageBucket': 'custom'}
+        }
+        self.instance = LazyInstance(self.client, self.data)
+
+    def test_properties(self):
+        """
+        Test the properties of the lazy instance.
+        """
+
+        self.assertEqual(self.instance.name, 'nginx')
+        self.assertEqual(self.instance.current_state, 'starting')
+        self.assertEqual(self.instance.desired_state, 'running')
+        self.assertIs(self.instance.services, self.data['services'])
+        self.assertEqual(self.instance.parameters, {'SETTING': 'value'})
+        self.assertEqual(self.instance.options, {'storageBucket': 'custom'})
+
+        # The application is created once upon first access.
+        self.assertNotIn('_application', self.instance.__dict__)
+        application = self.instance.application
+        self.assertEqual(application.name, 'nginx')
+        self.assertEqual(application.version, 'latest')
+        self.assertIs(self.instance.application, application)
+        self.assertIs(application.client, self.client)
+
+        # Missing data is reported in the same way as the normal instance.
+        instance = LazyInstance(self.client, {'name': 'foo'})
+        self.assertEqual(instance.current_state, 'running')
+        self.assertIsNone(instance.desired_state)
+        self.assertIsNone(instance.application)
+        self.assertIsNone(instance.services)
+
+    def test_update(self):
+        """
+        Test the LazyInstance.update method.
+        """
+
+        with self.assertRaises(ValueError):
+            LazyInstance(self.client, {'name': 'foo'}).update()
+
+        self.instance.update()
+        update_instance = self.client.update_instance
+        update_instance.assert_called_once_with('nginx', 'nginx', 'latest',
+                                                parameters={
+                                                    'SETTING': 'value'
+                                                },
+                                                options={
+                                                    'storageBucket': 'custom'
+                                                })
+
+    def test_repr(self):
+        """
+        Test that the lazy instance is represented as a normal instance.
+        """
+
+        instance = Instance(self.client, 'nginx', current_state='starting',
+                            desired_state='running',
+                            application=self.instance.application,
+                            services={'www': {'state': 'starting'}},
+                            parameters={'SETTING': 'value'},
+                            options={'storageBucket': 'custom'})
+        self.assertEqual(repr(self.instance), repr(instance))
+
+class PickleTest(unittest.TestCase):
+    """
+    Tests for pickling entities.
+    """
+
+    def setUp(self):
+        self.client = Client_v2('http://dashboard.example',
+                                EnvironmentKey('BIGBOAT_API_KEY'))
+        self.data = {
+            'name': 'nginx',
+            'state': {'current': 'running', 'desired': 'running'},
+            'app': {'name': 'nginx', 'version': 'latest'}
+        }
+
+    def test_pickle(self):
+        """
+        Test pickling application, instance and lazy instance entities.
+        """
+
+        application = Application(self.client, 'nginx', 'latest')
+        instance = Instance(self.client, 'nginx', current_state='running',
+                            application=application,
+                            parameters={'SETTING': 'value'})
+        lazy = LazyInstance(self.client, self.data)
+        self.assertEqual(lazy.application.name, 'nginx')
+
+        clones = pickle.loads(pickle.dumps([application, instance, lazy]))
+        self.assertEqual((clones[0].name, clones[0].version),
+                         ('nginx', 'latest'))
+        self.assertEqual(clones[1].name, 'nginx')
+        self.assertEqual(clones[1].current_state, 'running')
+        self.assertIsNone(clones[1].desired_state)
+        self.assertEqual(clones[1].application.version, 'latest')
+        self.assertEqual(clones[1].parameters, {'SETTING': 'value'})
+        self.assertEqual(clones[2].name, 'nginx')
+        self.assertNotIn('_application', clones[2].__dict__)
+        self.assertEqual(clones[2].application.version, 'latest')
+
+        # The client is pickled once and shared by the entities.
+        self.assertIs(clones[0].client, clones[1].client)
+        self.assertIs(clones[1].client, clones[2].client)
+        self.assertEqual(clones[0].client.base_url, 'http://dashboard.example')
+
+    def test_process_pool(self):
+        """
+        Test distributing entities across a process pool.
+        """
+
+        instances = [LazyInstance(self.client, dict(self.data, name=name))
+                     for name in ('foo', 'bar')]
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(describe, instances))
+
+        self.assertEqual(results, [
+            ('foo', 'latest', 'http://dashboard.example'),
+            ('bar', 'latest', 'http://dashboard.example')
+        ])
@@ -0,0 +1,65 @@
+"""
+Tests for the transfer metrics of clients.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import pickle
+import unittest
+from bigboat.metrics import TransferMetrics, TransferStats
+
+class TransferMetricsTest(unittest.TestCase):
+    """
+    Tests for the transfer metrics.
+    """
+
+    def setUp(self):
+        self.metrics = TransferMetrics()
+
+    def test_record(self):
+        """
+        Test counting requests and responses.
+        """
+
+        self.metrics.record_request(1000, 200, compressed=True)
+        self.metrics.record_request(0, 0)
+        self.metrics.record_response(5000, 800, compressed=True)
+        self.metrics.record_response(10, 10)
+        self.assertEqual(self.metrics.stats(),
+                         TransferStats(requests=2, compressed_requests=1,
+                                       compressed_responses=1, sent_raw=1000,
+                                       sent_wire=200, received_raw=5010,
+                                       received_wire=810))
+
+    def test_reset(self):
+        """
+        Test resetting the counts.
+        """
+
+        self.metrics.record_request(10, 10)
+        self.metrics.reset()
+        self.assertEqual(self.metrics.stats(),
+                         TransferStats(0, 0, 0, 0, 0, 0, 0))
+
+    def test_pickle(self):
+        """
+        Test that pickled metrics start without counts.
+        """
+
+        self.metrics.record_request(10, 10)
+        clone = pickle.loads(pickle.dumps(self.metrics))
+        self.assertEqual(clone.stats().requests, 0)
+        clone.record_request(5, 5)
+        self.assertEqual(clone.stats().sent_raw, 5)
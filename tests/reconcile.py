@@ -0,0 +1,247 @@
+"""
+Tests for reconciliation with a desired state specification.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+from bigboat.client import Client_v2
+from bigboat.reconcile import load_spec, Reconciler
+from tests.client import RequestsTestCase
+
+SPEC = u'''apps:
+  - name: nginx
+    version: latest
+    dockerCompose: |
+      www:
+        image: nginx
+    bigboatCompose: |
+      name: nginx
+      version: latest
+  - name: redis
+    version: '3.2'
+    dockerCompose: |
+      db:
+        image: redis:3.2
+instances:
+  - name: web
+    app: nginx
+    version: latest
+  - name: cache
+    app: redis
+    version: '3.2'
+    parameters:
+      SETTING: value
+'''
+
+class LoadSpecTest(unittest.TestCase):
+    """
+    Tests for reading desired state specifications.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'spec.yml')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, content):
+        with open(self.path, 'w') as spec_file:
+            spec_file.write(content)
+
+    def test_load_spec(self):
+        """
+        Test the load_spec function.
+        """
+
+        self._write(SPEC)
+        spec = load_spec(self.path)
+        self.assertEqual(len(spec['apps']), 2)
+        self.assertEqual(spec['instances'][1]['parameters'],
+                         {'SETTING': 'value'})
+
+        self._write('')
+        self.assertEqual(load_spec(self.path), {})
+
+        self._write('- not\n- a mapping\n')
+        with self.assertRaises(ValueError):
+            load_spec(self.path)
+
+    def test_unquoted_version(self):
+        """
+        Test that versions which YAML parses as numbers are rejected.
+        """
+
+        self._write('apps:\n  - name: nginx\n    version: 1.10\n')
+        with self.assertRaises(ValueError) as context:
+            load_spec(self.path)
+
+        self.assertIn('1.1', str(context.exception))
+        self.assertIn('quoted', str(context.exception))
+
+        self._write('instances:\n  - name: web\n    app: nginx\n'
+                    '    version: 1.10\n')
+        with self.assertRaises(ValueError):
+            load_spec(self.path)
+
+        self._write("apps:\n  - name: nginx\n    version: '1.10'\n")
+        self.assertEqual(load_spec(self.path)['apps'][0]['version'], '1.10')
+
+class ReconcilerTest(RequestsTestCase):
+    """
+    Tests for the reconcile engine.
+    """
+
+    URL = 'http://dashboard.example/api/v2/'
+
+    def setUp(self):
+        super(ReconcilerTest, self).setUp()
+        self.client = Client_v2('http://dashboard.example', 'my-api-key')
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'spec.yml')
+            with open(path, 'w') as spec_file:
+                spec_file.write(SPEC)
+            self.spec = load_spec(path)
+        finally:
+            shutil.rmtree(directory)
+
+        self.requests_mock.get(self.URL + 'apps', json=[
+            {"name": "nginx", "version": "latest"}
+        ])
+        self.requests_mock.get(self.URL + 'instances', json=[
+            {
+                "name": "web",
+                "state": {"current": "running", "desired": "running"},
+                "app": {"name": "nginx", "version": "latest"}
+            },
+            {
+                "name": "old",
+                "state": {"current": "running", "desired": "running"},
+                "app": {"name": "nginx", "version": "1.0"}
+            },
+            {
+                "name": "stopping",
+                "state": {"current": "stopping", "desired": "stopped"},
+                "app": {"name": "nginx", "version": "1.0"}
+            }
+        ])
+        files = self.URL + 'apps/nginx/latest/files/'
+        self.requests_mock.get(files + 'dockerCompose',
+                               headers={'Content-Type': 'text/plain'},
+                               text='www:\n  image: nginx\n')
+        self.requests_mock.get(files + 'bigboatCompose',
+                               headers={'Content-Type': 'text/plain'},
+                               text='name: nginx\n')
+
+    def test_plan(self):
+        """
+        Test that the plan contains the minimal operations in stages.
+        """
+
+        plan = Reconciler(self.client, self.spec, prune=True).plan()
+        stages = [[(operation.method, operation.args[:3])
+                   for operation in stage] for stage in plan.stages()]
+        self.assertEqual(stages, [
+            [
+                ('delete_instance', ('old',)),
+                ('update_app', ('redis', '3.2'))
+            ],
+            [
+                ('update_compose', ('nginx', 'latest', 'bigboatCompose')),
+                ('update_compose', ('redis', '3.2', 'dockerCompose'))
+            ],
+            [
+                ('update_instance', ('cache', 'redis', '3.2'))
+            ]
+        ])
+        self.assertEqual(plan.read_calls, 4)
+        self.assertEqual(plan.api_calls, 5)
+        self.assertEqual(len(plan), 5)
+
+        # Without pruning, other instances are left alone.
+        plan = Reconciler(self.client, self.spec).plan()
+        self.assertNotIn('delete_instance',
+                         [operation.method for operation in plan.operations])
+
+    def test_run(self):
+        """
+        Test executing the reconciliation.
+        """
+
+        redis = self.URL + 'apps/redis/3.2'
+        apps = self.requests_mock.put(redis, status_code=201,
+                                      json={"name": "redis", "version": "3.2"})
+        composes = [
+            self.requests_mock.put(self.URL + path, status_code=201)
+            for path in ('apps/redis/3.2/files/dockerCompose',
+                         'apps/nginx/latest/files/bigboatCompose')
+        ]
+        instances = self.requests_mock.put(self.URL + 'instances/cache', json={
+            "name": "cache",
+            "state": {"current": "created", "desired": "running"},
+            "app": {"name": "redis", "version": "3.2"}
+        })
+
+        out = StringIO()
+        results = Reconciler(self.client, self.spec).run(out=out)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result.result for result in results))
+        self.assertEqual(apps.call_count, 1)
+        self.assertEqual([compose.call_count for compose in composes], [1, 1])
+        self.assertEqual(instances.call_count, 1)
+        self.assertEqual(instances.last_request.json(), {
+            'app': 'redis',
+            'version': '3.2',
+            'parameters': {'SETTING': 'value'},
+            'options': {}
+        })
+        self.assertIn('API calls: 4 to plan, 4 to execute', out.getvalue())
+
+    def test_dry_run(self):
+        """
+        Test that a dry run prints the plan without performing it.
+        """
+
+        out = StringIO()
+        results = Reconciler(self.client, self.spec).run(dry_run=True, out=out)
+        self.assertEqual(results, [])
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'Stage 1:')
+        self.assertEqual(lines[1], "  update_app('redis', '3.2')")
+        self.assertEqual(lines[-1], 'API calls: 4 to plan, 4 to execute')
+        self.assertEqual(self.requests_mock.call_count, 4)
+
+    def test_failed_stage(self):
+        """
+        Test that later stages are not performed when a stage fails.
+        """
+
+        self.requests_mock.put(self.URL + 'apps/redis/3.2', status_code=400,
+                               headers={'Content-Type': 'text/plain'},
+                               text='error')
+        compose = self.requests_mock.put(self.URL + 'apps/redis/3.2/files/'
+                                         'dockerCompose', status_code=201)
+
+        reconciler = Reconciler(self.client, self.spec)
+        results = reconciler.execute(reconciler.plan())
+        self.assertEqual(len(results), 1)
+        self.assertIsInstance(results[0].error, ValueError)
+        self.assertEqual(compose.call_count, 0)
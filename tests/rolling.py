@@ -0,0 +1,197 @@
+"""
+Tests for rolling upgrades of application instances.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import unittest
+from bigboat.application import Application
+from bigboat.client import Client
+from bigboat.instance import Instance
+from bigboat.rolling import RollingUpgrade
+
+class FakeClient(Client):
+    """
+    Client that keeps instances in memory. Upgraded instances start running
+    after one poll, unless their name starts with 'bad'. The listing only
+    contains the parameters and options of the instances if `settings` is
+    enabled.
+    """
+
+    def __init__(self, instances, settings=True):
+        super(FakeClient, self).__init__('http://dashboard.example')
+        self.lock = threading.Lock()
+        self.settings = settings
+        self.versions = dict(instances)
+        self.parameters = dict((name, {}) for name in self.versions)
+        self.started = {}
+        self.states = dict((name, 'running') for name in self.versions)
+        self.updates = []
+        self.in_flight = 0
+        self.peak = 0
+
+    def instances(self):
+        with self.lock:
+            listing = [
+                Instance(self, name, current_state=self.states[name],
+                         application=Application(self, 'app', version),
+                         parameters=self.parameters[name] if self.settings
+                         else None, options={} if self.settings else None)
+                for name, version in self.versions.items()
+            ]
+            for name, state in list(self.states.items()):
+                if state == 'starting':
+                    self.states[name] = 'failed' if name.startswith('bad') \
+                        else 'running'
+                    self.in_flight -= 1
+
+        return listing
+
+    def update_instance(self, name, app_name, version, **kwargs):
+        with self.lock:
+            self.updates.append(name)
+            self.started[name] = kwargs
+            self.versions[name] = version
+            self.states[name] = 'starting'
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+        return Instance(self, name, 'starting')
+
+class RollingUpgradeTest(unittest.TestCase):
+    """
+    Tests for the rolling upgrade operation.
+    """
+
+    def test_run(self):
+        """
+        Test upgrading all instances with a maximum number in flight.
+        """
+
+        names = ['web{}'.format(index) for index in range(7)]
+        client = FakeClient([(name, '1') for name in names] + [('new', '2')])
+        application = Application(client, 'app', '1')
+        result = RollingUpgrade(client, application, '2', max_in_flight=3,
+                                interval=0).run()
+
+        self.assertEqual(result.upgraded, set(names))
+        self.assertEqual(result.failed, set())
+        self.assertEqual(result.pending, set())
+        self.assertFalse(result.aborted)
+        self.assertEqual(sorted(client.updates), names)
+        self.assertEqual(client.peak, 3)
+
+    def test_instances(self):
+        """
+        Test upgrading selected instances.
+        """
+
+        client = FakeClient([('a', '1'), ('b', '1'), ('c', '1')])
+        result = Application(client, 'app', '1').upgrade('2',
+                                                         instances=['a', 'c'],
+                                                         interval=0)
+        self.assertEqual(result.upgraded, {'a', 'c'})
+        self.assertEqual(client.versions['b'], '1')
+
+    def test_abort(self):
+        """
+        Test that the upgrade stops when there are too many failures.
+        """
+
+        client = FakeClient([('bad1', '1'), ('bad2', '1'), ('ok1', '1'),
+                             ('ok2', '1'), ('ok3', '1')])
+        application = Application(client, 'app', '1')
+        result = RollingUpgrade(client, application, '2', max_in_flight=2,
+                                max_failures=1, interval=0).run()
+
+        self.assertTrue(result.aborted)
+        self.assertEqual(result.failed, {'bad1', 'bad2'})
+        self.assertEqual(result.upgraded, set())
+        self.assertEqual(result.pending, {'ok1', 'ok2', 'ok3'})
+        self.assertEqual(sorted(client.updates), ['bad1', 'bad2'])
+
+    def test_pause(self):
+        """
+        Test that the upgrade pauses on failures until it is resumed.
+        """
+
+        client = FakeClient([('bad1', '1'), ('ok1', '1')])
+        application = Application(client, 'app', '1')
+        upgrade = RollingUpgrade(client, application, '2', max_in_flight=1,
+                                 on_failure='pause', interval=0)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(upgrade.run()))
+        thread.start()
+        while not upgrade.paused and thread.is_alive():
+            thread.join(0.01)
+
+        self.assertEqual(client.updates, ['bad1'])
+        upgrade.resume()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(results[0].upgraded, {'ok1'})
+        self.assertEqual(results[0].failed, {'bad1'})
+        self.assertFalse(results[0].aborted)
+
+    def test_versions(self):
+        """
+        Test that only instances of the version of the application are
+        upgraded, unless all versions are upgraded.
+        """
+
+        client = FakeClient([('old', '1.11'), ('new', '2.0'), ('other', '1.0')])
+        result = Application(client, 'app', '1.11').upgrade('1.13', interval=0)
+        self.assertEqual(result.upgraded, {'old'})
+        self.assertEqual(client.versions['new'], '2.0')
+        self.assertEqual(client.versions['other'], '1.0')
+
+        result = Application(client, 'app', '1.0').upgrade('1.13', interval=0,
+                                                           all_versions=True)
+        self.assertEqual(result.upgraded, {'new', 'other'})
+
+    def test_parameters(self):
+        """
+        Test that parameterized instances keep their parameters.
+        """
+
+        client = FakeClient([('a', '1'), ('b', '1')])
+        client.parameters['a'] = {'SETTING': 'value'}
+        Application(client, 'app', '1').upgrade('2', interval=0)
+        self.assertEqual(client.started['a'], {
+            'parameters': {'SETTING': 'value'},
+            'options': {}
+        })
+        self.assertEqual(client.started['b'], {'parameters': {}, 'options': {}})
+
+    def test_unknown_parameters(self):
+        """
+        Test that instances whose parameters are unknown are not upgraded
+        unless their settings are provided.
+        """
+
+        client = FakeClient([('a', '1'), ('b', '1')], settings=False)
+        application = Application(client, 'app', '1')
+        with self.assertRaises(ValueError):
+            application.upgrade('2', interval=0)
+
+        self.assertEqual(client.updates, [])
+        settings = {
+            'a': {'parameters': {'SETTING': 'value'}, 'options': {}},
+            'b': {'parameters': {}, 'options': {'storage_bucket': 'b'}}
+        }
+        result = application.upgrade('2', interval=0, settings=settings)
+        self.assertEqual(result.upgraded, {'a', 'b'})
+        self.assertEqual(client.started, settings)
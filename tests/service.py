@@ -0,0 +1,111 @@
+"""
+Tests for services and fleet-wide service health.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mock import MagicMock
+from bigboat.client import Client_v2
+from bigboat.instance import LazyInstance
+from bigboat.service import parse_services, FleetHealth
+
+class ParseServicesTest(unittest.TestCase):
+    """
+    Tests for parsing services of instances.
+    """
+
+    def test_parse_services(self):
+        """
+        Test the parse_services function.
+        """
+
+        services = parse_services('nginx', {
+            'www': {'state': 'running', 'container': {'id': 'abc'}},
+            'db': {'state': 'failed'},
+            'odd': None
+        })
+        self.assertEqual(services, [
+            ('nginx', 'db', 'failed'),
+            ('nginx', 'odd', None),
+            ('nginx', 'www', 'running')
+        ])
+        self.assertEqual(parse_services('nginx', None), [])
+
+class FleetHealthTest(unittest.TestCase):
+    """
+    Tests for the aggregation of service health over many instances.
+    """
+
+    def setUp(self):
+        client = MagicMock(spec_set=Client_v2)
+        data = [
+            {
+                'name': 'web1',
+                'state': {'current': 'running'},
+                'app': {'name': 'nginx', 'version': '1.13'},
+                'services': {'www': {'state': 'running'},
+                             'cache': {'state': 'failed'}}
+            },
+            {
+                'name': 'web2',
+                'state': {'current': 'running'},
+                'app': {'name': 'nginx', 'version': '1.13'},
+                'services': {'www': {'state': 'running'}}
+            },
+            {
+                'name': 'web3',
+                'state': {'current': 'starting'},
+                'app': {'name': 'nginx', 'version': '1.11'},
+                'services': {'www': {'state': 'failed'}}
+            },
+            {
+                'name': 'orphan',
+                'state': {'current': 'running'},
+                'services': {'www': {'state': 'unknown'}}
+            },
+            {
+                'name': 'empty',
+                'state': {'current': 'created'}
+            }
+        ]
+        self.health = FleetHealth(LazyInstance(client, item) for item in data)
+
+    def test_counts(self):
+        """
+        Test the counts of services and instances by state.
+        """
+
+        self.assertEqual(self.health.instances, 5)
+        self.assertEqual(self.health.service_states,
+                         {'running': 2, 'failed': 2, 'unknown': 1})
+        self.assertEqual(self.health.instance_states,
+                         {'running': 3, 'starting': 1, 'created': 1})
+
+    def test_failing(self):
+        """
+        Test retrieving failing services per application version.
+        """
+
+        self.assertEqual(self.health.failing(), {
+            ('nginx', '1.13'): [('web1', 'cache', 'failed')],
+            ('nginx', '1.11'): [('web3', 'www', 'failed')],
+            (None, None): [('orphan', 'www', 'unknown')]
+        })
+        self.assertEqual(list(self.health.failing('nginx', '1.11').keys()),
+                         [('nginx', '1.11')])
+        self.assertEqual(len(self.health.failing(name='nginx')), 2)
+        self.assertEqual(self.health.failing_instances(),
+                         {'web1', 'web3', 'orphan'})
@@ -0,0 +1,102 @@
+"""
+Tests for the pool of HTTP sessions.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from builtins import object
+import unittest
+from bigboat.sessions import SessionPool
+
+class FakeSession(object):
+    """
+    Session that tracks whether it is closed.
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        """
+        Close the session.
+        """
+
+        self.closed = True
+
+class SessionPoolTest(unittest.TestCase):
+    """
+    Tests for the session pool.
+    """
+
+    def setUp(self):
+        self.created = []
+        self.pool = SessionPool(self._create, max_idle=2)
+
+    def _create(self):
+        session = FakeSession()
+        self.created.append(session)
+        return session
+
+    def test_reuse(self):
+        """
+        Test that released sessions are reused by later acquisitions.
+        """
+
+        with self.pool.session() as session:
+            self.assertEqual(self.pool.idle, 0)
+
+        self.assertEqual(self.pool.idle, 1)
+        with self.pool.session() as reused:
+            self.assertIs(reused, session)
+
+        self.assertEqual(len(self.created), 1)
+        self.assertFalse(session.closed)
+
+    def test_concurrent(self):
+        """
+        Test that sessions in use are not handed out again.
+        """
+
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.created), 2)
+
+    def test_max_idle(self):
+        """
+        Test that sessions released to a full pool are closed.
+        """
+
+        sessions = [self.pool.acquire() for _ in range(3)]
+        for session in sessions:
+            self.pool.release(session)
+
+        self.assertEqual(self.pool.idle, 2)
+        self.assertEqual([session.closed for session in sessions],
+                         [False, False, True])
+
+    def test_close(self):
+        """
+        Test closing the idle sessions of the pool.
+        """
+
+        used = self.pool.acquire()
+        with self.pool.session():
+            pass
+
+        self.pool.close()
+        self.assertEqual(self.pool.idle, 0)
+        self.assertTrue(self.created[1].closed)
+        self.assertFalse(used.closed)
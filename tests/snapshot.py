@@ -0,0 +1,200 @@
+"""
+Tests for exporting and importing snapshots.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from mock import MagicMock
+from bigboat.application import Application
+from bigboat.bulk import BulkResult
+from bigboat.client import Client_v2
+from bigboat.instance import Instance, LazyInstance
+from bigboat.snapshot import export_snapshot, import_snapshot, read_snapshot
+
+class SnapshotTest(unittest.TestCase):
+    """
+    Tests for exporting and importing snapshots.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.client = MagicMock(spec_set=Client_v2)
+        self.client.base_url = 'http://dashboard.example'
+        self.client.concurrency = None
+
+        self.client.apps.return_value = [
+            Application(self.client, 'nginx', '1.13'),
+            Application(self.client, 'redis', '3.2')
+        ]
+        composes = {
+            ('nginx', '1.13', 'dockerCompose'): 'www:\n  image: nginx\n',
+            ('nginx', '1.13', 'bigboatCompose'): 'name: nginx\n',
+            ('redis', '3.2', 'dockerCompose'): 'db:\n  image: redis\n'
+        }
+        self.client.get_composes.side_effect = lambda keys, max_workers: [
+            BulkResult(key, composes.get(key), None) for key in keys
+        ]
+        # The listing of instances has no parameters or options.
+        self.client.instances.return_value = [
+            LazyInstance(self.client, {
+                'name': 'web',
+                'app': {'name': 'nginx', 'version': '1.13'}
+            }),
+            LazyInstance(self.client, {'name': 'unknown'})
+        ]
+        instances = {
+            'web': Instance(self.client, 'web', parameters={'key': 'value'},
+                            options={})
+        }
+        self.client.get_instances.side_effect = lambda names, max_workers: [
+            BulkResult(name, instances.get(name), None) for name in names
+        ]
+
+    def bulk(self, keys, failing=()):
+        """
+        Create bulk results for keys, which fail if they are in `failing`.
+        """
+
+        return [BulkResult(key, key not in failing, None) for key in keys]
+
+    def export(self, file_name):
+        """
+        Export a snapshot to a temporary file.
+        """
+
+        path = os.path.join(self.directory, file_name)
+        progress = []
+        failures = export_snapshot(self.client, path, progress=progress.append)
+        self.assertEqual(failures, [])
+        return path, progress
+
+    def test_export(self):
+        """
+        Test exporting a compressed snapshot.
+        """
+
+        path, progress = self.export('snapshot.jsonl.gz')
+        records = list(read_snapshot(path))
+        self.assertEqual([record['type'] for record in records],
+                         ['app', 'app', 'compose', 'compose', 'compose',
+                          'instance'])
+        self.assertEqual(records[-1], {
+            'type': 'instance', 'name': 'web', 'app': 'nginx',
+            'version': '1.13', 'parameters': {'key': 'value'},
+            'options': {}
+        })
+        self.assertEqual(progress[-1], ('instance', 1, 0, 1))
+        self.assertEqual([item for item in progress
+                          if item.stage == 'compose'][-1],
+                         ('compose', 3, 0, 1))
+
+    def test_export_settings(self):
+        """
+        Test exporting instances whose parameters and options are unknown
+        unless they are provided as settings.
+        """
+
+        self.client.instances.return_value.append(LazyInstance(self.client, {
+            'name': 'db', 'app': {'name': 'redis', 'version': '3.2'}
+        }))
+        path = os.path.join(self.directory, 'snapshot.jsonl')
+        failures = export_snapshot(self.client, path)
+        self.assertEqual([(failure.stage, failure.key) for failure in failures],
+                         [('instance', 'db')])
+        self.assertIsInstance(failures[0].error, ValueError)
+        self.assertEqual([record['name'] for record in read_snapshot(path)
+                          if record['type'] == 'instance'], ['web'])
+
+        settings = {'db': {'parameters': {'SIZE': '1G'}, 'options': {}}}
+        failures = export_snapshot(self.client, path, settings=settings)
+        self.assertEqual(failures, [])
+        self.assertEqual(list(read_snapshot(path))[-1]['parameters'],
+                         {'SIZE': '1G'})
+        self.assertEqual(self.client.get_instances.call_args[0][0], ['web'])
+
+    def test_read_invalid(self):
+        """
+        Test reading a file that is not a snapshot.
+        """
+
+        path = os.path.join(self.directory, 'other.jsonl')
+        with open(path, 'w') as other:
+            other.write('{"type": "app"}\n')
+
+        with self.assertRaises(ValueError):
+            list(read_snapshot(path))
+
+    def test_import(self):
+        """
+        Test importing a snapshot and resuming after a failure.
+        """
+
+        path = self.export('snapshot.jsonl')[0]
+        target = MagicMock(spec_set=Client_v2)
+        target.concurrency = None
+        target.update_app.return_value = True
+        target.update_composes.side_effect = \
+            lambda mapping, max_workers: self.bulk(
+                mapping.keys(), failing=[('redis', '3.2', 'dockerCompose')]
+            )
+        target.update_instances.side_effect = \
+            lambda mapping, max_workers: self.bulk(mapping.keys())
+
+        journal = os.path.join(self.directory, 'journal')
+        failures = import_snapshot(target, path, journal=journal)
+        self.assertEqual([(failure.stage, failure.key) for failure in failures],
+                         [('compose', 'redis/3.2/dockerCompose')])
+        self.assertEqual(target.update_app.call_count, 2)
+        mapping = target.update_instances.call_args[0][0]
+        self.assertEqual(mapping, {'web': {'app': 'nginx', 'version': '1.13',
+                                           'parameters': {'key': 'value'},
+                                           'options': {}}})
+
+        # Resuming only imports the record that failed.
+        target.reset_mock()
+        target.update_composes.side_effect = \
+            lambda mapping, max_workers: self.bulk(mapping.keys())
+        progress = []
+        failures = import_snapshot(target, path, journal=journal,
+                                   progress=progress.append)
+        self.assertEqual(failures, [])
+        target.update_app.assert_not_called()
+        target.update_instances.assert_not_called()
+        self.assertEqual(list(target.update_composes.call_args[0][0].keys()),
+                         [('redis', '3.2', 'dockerCompose')])
+        self.assertEqual(progress[-1], ('instance', 0, 0, 1))
+
+    def test_import_unknown_settings(self):
+        """
+        Test that instances without parameters or options are not imported.
+        """
+
+        path = os.path.join(self.directory, 'snapshot.jsonl')
+        with open(path, 'w') as snapshot:
+            snapshot.write('{"type": "header", "format": 1}\n')
+            snapshot.write('{"type": "instance", "name": "web", "app": '
+                           '"nginx", "version": "1.13", "parameters": null, '
+                           '"options": null}\n')
+
+        target = MagicMock(spec_set=Client_v2)
+        failures = import_snapshot(target, path)
+        self.assertEqual([(failure.stage, failure.key) for failure in failures],
+                         [('instance', 'web')])
+        target.update_instances.assert_not_called()
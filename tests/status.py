@@ -0,0 +1,210 @@
+"""
+Tests for typed status items and status history.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mock import MagicMock
+from bigboat.client import Client_v2
+from bigboat.status import parse_status, RingBuffer, MetricHistory, \
+    StatusCollector
+
+def status_item(check_time, is_ok=True, used=19):
+    """
+    Create a status item as returned by the v2 API.
+    """
+
+    return {
+        "name": "Available IPs",
+        "lastCheck": {
+            "time": check_time,
+            "ISO": "2017-05-08T12:10:42.228Z"
+        },
+        "description": "IPs in use: {}".format(used),
+        "details": {
+            "totalIps": 190,
+            "usedIps": used,
+            "label": "not numeric"
+        },
+        "isOk": is_ok
+    }
+
+class ParseStatusTest(unittest.TestCase):
+    """
+    Tests for parsing status items.
+    """
+
+    def test_parse_status(self):
+        """
+        Test the parse_status function.
+        """
+
+        record = parse_status(status_item(1494245442228))
+        self.assertEqual(record.name, 'Available IPs')
+        self.assertAlmostEqual(record.time, 1494245442.228)
+        self.assertTrue(record.is_ok)
+        self.assertEqual(record.details, {'totalIps': 190.0, 'usedIps': 19.0})
+
+        record = parse_status({"name": "Empty"})
+        self.assertEqual(record, ('Empty', None, False, {}))
+
+class RingBufferTest(unittest.TestCase):
+    """
+    Tests for the array-backed ring buffer.
+    """
+
+    def test_append(self):
+        """
+        Test that the buffer keeps the most recent values.
+        """
+
+        buffer = RingBuffer(3)
+        self.assertEqual(len(buffer), 0)
+        self.assertIsNone(buffer.oldest_time())
+        for index in range(5):
+            buffer.append(index, index * 10)
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.capacity, 3)
+        self.assertEqual(list(buffer), [(2, 20), (3, 30), (4, 40)])
+        self.assertEqual(buffer[-1], (4, 40))
+        self.assertEqual(buffer.oldest_time(), 2)
+        with self.assertRaises(IndexError):
+            dummy = buffer[3]
+
+    def test_since(self):
+        """
+        Test retrieving the values in a time window.
+        """
+
+        buffer = RingBuffer(4)
+        for index in range(6):
+            buffer.append(index, index)
+
+        self.assertEqual(buffer.since(3.5), [4, 5])
+        self.assertEqual(buffer.since(0), [2, 3, 4, 5])
+        self.assertEqual(buffer.since(6), [])
+
+    def test_between(self):
+        """
+        Test retrieving the values between two times.
+        """
+
+        buffer = RingBuffer(4)
+        for index in range(6):
+            buffer.append(index, index)
+
+        self.assertEqual(buffer.between(3, 4), [3, 4])
+        self.assertEqual(buffer.between(2.5, 3.5), [3])
+        self.assertEqual(buffer.between(0, 1), [])
+        self.assertEqual(buffer.between(0, 10), [2, 3, 4, 5])
+
+class MetricHistoryTest(unittest.TestCase):
+    """
+    Tests for the downsampled history of a metric.
+    """
+
+    def test_stats(self):
+        """
+        Test statistics over raw and downsampled values.
+        """
+
+        history = MetricHistory(capacity=4, downsample=2)
+        self.assertIsNone(history.stats(10))
+        for index in range(10):
+            history.append(index, index)
+
+        self.assertEqual(history.latest(), (9, 9))
+        self.assertEqual(history.stats(2), (7, 9, 8, 3))
+        # Windows longer than the raw values use the downsampled values.
+        self.assertEqual(len(history.coarse), 4)
+        self.assertEqual(history.stats(7), (2.5, 8.5, 5.5, 4))
+        self.assertIsNone(history.stats(1, now=100))
+
+    def test_stats_now(self):
+        """
+        Test that statistics with an explicit end of the window exclude the
+        values after it.
+        """
+
+        history = MetricHistory(100)
+        for index in range(10):
+            history.append(index, index)
+
+        self.assertEqual(history.stats(2, now=3.0), (1, 3, 2, 3))
+
+class StatusCollectorTest(unittest.TestCase):
+    """
+    Tests for the status collector.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client_v2)
+        self.collector = StatusCollector(self.client, capacity=8,
+                                         downsample=2)
+
+    def test_poll(self):
+        """
+        Test polling the status items and detecting changes.
+        """
+
+        self.client.statuses.return_value = [status_item(1000)]
+        self.assertEqual(self.collector.poll(), [])
+        self.assertEqual(self.collector.metrics(), [
+            ('Available IPs', 'isOk'),
+            ('Available IPs', 'totalIps'),
+            ('Available IPs', 'usedIps')
+        ])
+        self.assertEqual(self.collector.latest('Available IPs'), (1.0, 1.0))
+
+        # Repeated reports of the same check are ignored.
+        self.client.statuses.return_value = [status_item(1000, used=20)]
+        self.assertEqual(self.collector.poll(), [])
+        self.assertEqual(len(self.collector.history('Available IPs').raw), 1)
+
+        self.client.statuses.return_value = [
+            status_item(2000, is_ok=False, used=25)
+        ]
+        changes = self.collector.poll()
+        self.assertEqual(changes, [
+            ('Available IPs', 'isOk', 1.0, 0.0),
+            ('Available IPs', 'usedIps', 19.0, 25.0)
+        ])
+        self.assertFalse(self.collector.records()['Available IPs'].is_ok)
+        self.assertEqual(self.collector.stats('Available IPs', 'usedIps',
+                                              window=10),
+                         (19.0, 25.0, 22.0, 2))
+        self.assertIsNone(self.collector.stats('Missing'))
+        self.assertIsNone(self.collector.latest('Missing'))
+
+    def test_run(self):
+        """
+        Test polling until cancelled.
+        """
+
+        collected = []
+
+        def callback(changes):
+            collected.extend(changes)
+            cancel.set()
+
+        cancel = MagicMock()
+        cancel.is_set.side_effect = lambda: bool(collected)
+        self.client.statuses.side_effect = [
+            [status_item(1000)], [status_item(2000, is_ok=False)]
+        ]
+        self.collector.run(interval=0, cancel=cancel, callback=callback)
+        self.assertEqual(collected, [('Available IPs', 'isOk', 1.0, 0.0)])
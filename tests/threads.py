@@ -0,0 +1,174 @@
+"""
+Tests for using a client from many threads.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import json
+import threading
+import time
+import unittest
+from bigboat.client import Client_v2
+
+class InstanceHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of a local server that responds to requests for single
+    instances with the instance name and the API key of the request.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """
+        Respond to a GET request after a short delay.
+        """
+
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.connections.add(self.client_address)
+
+        name = self.path.rsplit('/', 1)[-1]
+        body = json.dumps({
+            'name': name,
+            'state': {'current': 'running', 'desired': 'running'},
+            'parameters': {'key': self.headers.get('api-key')}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # pylint: disable=arguments-differ
+        pass
+
+class InstanceServer(ThreadingMixIn, HTTPServer):
+    """
+    Local multithreaded HTTP server that serves instances.
+
+    The server tracks the client connections that it has served requests on.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), InstanceHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.connections = set()
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        """
+        The base URL of the server.
+        """
+
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
+
+def fetch_all(client, threads, requests):
+    """
+    Request instances with a unique name per request from many threads.
+
+    Returns:
+        list: The names of the requested instances and the names and API keys
+        in the responses.
+    """
+
+    results = []
+    lock = threading.Lock()
+
+    def work(thread):
+        """
+        Request the instances of one thread.
+        """
+
+        for index in range(requests):
+            name = 'thread{}-request{}'.format(thread, index)
+            instance = client.get_instance(name)
+            with lock:
+                results.append((name, instance.name,
+                                instance.parameters['key']))
+
+    workers = [threading.Thread(target=work, args=(thread,))
+               for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    return results
+
+class ThreadSafetyTest(unittest.TestCase):
+    """
+    Stress test for a client that is shared between many threads.
+    """
+
+    THREADS = 16
+    REQUESTS = 25
+
+    def test_concurrent_requests(self):
+        """
+        Test that concurrent requests from many threads receive their own
+        responses and reuse at most one connection per thread.
+        """
+
+        with InstanceServer(delay=0.001) as server:
+            client = Client_v2(server.url, 'my-api-key')
+            results = fetch_all(client, self.THREADS, self.REQUESTS)
+            connections = len(server.connections)
+
+        self.assertEqual(len(results), self.THREADS * self.REQUESTS)
+        for name, response_name, key in results:
+            self.assertEqual(name, response_name)
+            self.assertEqual(key, 'my-api-key')
+
+        self.assertLessEqual(connections, self.THREADS)
+
+    def test_bulk_reuse(self):
+        """
+        Test that consecutive bulk operations reuse the connections of their
+        earlier worker threads, and that closing the client closes them.
+        """
+
+        with InstanceServer(delay=0.001) as server:
+            client = Client_v2(server.url, 'my-api-key')
+            for batch in range(4):
+                names = ['batch{}-instance{}'.format(batch, index)
+                         for index in range(self.REQUESTS)]
+                results = list(client.get_instances(names, max_workers=4))
+                self.assertTrue(all(result.error is None
+                                    for result in results))
+
+            connections = len(server.connections)
+            idle = client._sessions.idle
+            client.close()
+
+        self.assertLessEqual(connections, 4)
+        self.assertLessEqual(idle, 4)
+        self.assertEqual(client._sessions.idle, 0)
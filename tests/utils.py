@@ -16,8 +16,11 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import json
 import unittest
-from bigboat.utils import readonly, Inherited as inherit
+import yaml
+from bigboat.utils import readonly, Inherited as inherit, load_json, \
+    load_yaml, yaml_loader, optional_module
 
 @readonly(['name', 'version'], rest='other')
 class Item(object):
@@ -119,3 +122,50 @@ class Utils_Test(unittest.TestCase):
         self.assertTrue(Item.execute())
         self.assertFalse(Subitem.execute())
         self.assertIsNone(Subitem.new_execute())
+
+    def test_load_yaml(self):
+        """
+        Test the load_yaml function.
+        """
+
+        if yaml.__with_libyaml__:
+            self.assertIs(yaml_loader(), yaml.CSafeLoader)
+        else:
+            self.assertIs(yaml_loader(), yaml.SafeLoader)
+
+        self.assertEqual(load_yaml('name: foo\nversion: 1\n'),
+                         {'name': 'foo', 'version': 1})
+        self.assertEqual(load_yaml(b'name: foo\n'), {'name': 'foo'})
+
+        # Only standard YAML tags are allowed.
+        with self.assertRaises(yaml.error.YAMLError):
+            load_yaml('!!python/object/apply:os.system ["true"]')
+
+    def test_load_json(self):
+        """
+        Test the load_json function.
+        """
+
+        self.assertEqual(load_json(b'{"name": "foo", "items": [1, 2.5]}'),
+                         {'name': 'foo', 'items': [1, 2.5]})
+        self.assertEqual(load_json(u'{"name": "f\u00f6\u00f6"}'),
+                         {'name': u'f\u00f6\u00f6'})
+        self.assertEqual(load_json(u'["f\u00f6\u00f6"]'.encode('utf-8')),
+                         [u'f\u00f6\u00f6'])
+
+        # Documents that only the standard library accepts are still parsed.
+        value = load_json(b'{"value": NaN}')['value']
+        self.assertNotEqual(value, value)
+
+        with self.assertRaises(ValueError):
+            load_json(b'{"unterminated": ')
+
+    def test_optional_module(self):
+        """
+        Test the optional_module function.
+        """
+
+        self.assertIs(optional_module('json'), json)
+        self.assertIs(optional_module('json'), json)
+        self.assertIsNone(optional_module('bigboat_missing_module'))
+        self.assertIsNone(optional_module('bigboat_missing_module'))
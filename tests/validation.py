@@ -0,0 +1,121 @@
+"""
+Tests for local validation of compose files.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from bigboat.client import Client_v2
+from bigboat.validation import validate_compose, validate_composes
+from tests.client import RequestsTestCase
+
+class ValidateComposeTest(unittest.TestCase):
+    """
+    Tests for the validation of single compose files.
+    """
+
+    def test_valid(self):
+        """
+        Test that valid compose files are parsed.
+        """
+
+        document = validate_compose('nginx', '1.0', 'bigboatCompose',
+                                    'name: nginx\nversion: 1.0\n')
+        self.assertEqual(document, {'name': 'nginx', 'version': 1.0})
+        self.assertEqual(validate_compose('nginx', '1.0', 'dockerCompose',
+                                          'www:\n  image: nginx\n'),
+                         {'www': {'image': 'nginx'}})
+        self.assertIsNone(validate_compose('nginx', '1.0', 'dockerCompose',
+                                           ''))
+
+        # Versions that are parsed as numbers are compared numerically.
+        self.assertEqual(validate_compose('nginx', '1.10', 'bigboatCompose',
+                                          'version: 1.10'), {'version': 1.1})
+
+    def test_invalid(self):
+        """
+        Test that invalid compose files are rejected.
+        """
+
+        with self.assertRaises(ValueError):
+            validate_compose('nginx', 'latest', 'dockerCompose', ':')
+        with self.assertRaises(ValueError):
+            validate_compose('nginx', 'latest', 'dockerCompose', '- a\n- b\n')
+        with self.assertRaises(ValueError):
+            validate_compose('nginx', 'latest', 'bigboatCompose',
+                             'name: somethingElse\nversion: latest')
+        with self.assertRaises(ValueError):
+            validate_compose('nginx', 'latest', 'bigboatCompose',
+                             'name: nginx\nversion: 1.0')
+
+class ValidateComposesTest(unittest.TestCase):
+    """
+    Tests for the validation of many compose files.
+    """
+
+    MAPPING = {
+        ('nginx', 'latest', 'dockerCompose'): 'www:\n  image: nginx\n',
+        ('nginx', 'latest', 'bigboatCompose'): 'name: other\n',
+        ('nginx', '1.0', 'dockerCompose'): ':'
+    }
+
+    def _check(self, results):
+        results = dict((result.key, result) for result in results)
+        self.assertEqual(set(results.keys()), set(self.MAPPING.keys()))
+        self.assertTrue(results[('nginx', 'latest', 'dockerCompose')].result)
+        self.assertFalse(results[('nginx', 'latest', 'bigboatCompose')].result)
+        self.assertIsInstance(results[('nginx', '1.0', 'dockerCompose')].error,
+                              ValueError)
+
+    def test_single_process(self):
+        """
+        Test validating compose files in the current process.
+        """
+
+        self._check(validate_composes(self.MAPPING, processes=1))
+
+    def test_process_pool(self):
+        """
+        Test validating compose files in a pool of processes.
+        """
+
+        self._check(validate_composes(self.MAPPING, processes=2, chunksize=1))
+
+class Client_v2_ValidationTest(RequestsTestCase):
+    """
+    Tests for the BigBoat v2 API client with local compose file validation.
+    """
+
+    URL = 'http://dashboard.example/'
+    PATH = 'api/v2/'
+
+    def test_update_compose(self):
+        """
+        Test that invalid compose files are rejected without a request.
+        """
+
+        client = Client_v2(self.URL, 'my-api-key', validate_compose=True)
+        url = self.URL + self.PATH + 'apps/nginx/latest/files/bigboatCompose'
+        adapter = self.requests_mock.put(url, status_code=201)
+
+        with self.assertRaises(ValueError):
+            client.update_compose('nginx', 'latest', 'bigboatCompose',
+                                  'name: somethingElse\nversion: latest')
+        self.assertEqual(adapter.call_count, 0)
+
+        self.assertTrue(client.update_compose('nginx', 'latest',
+                                              'bigboatCompose',
+                                              'name: nginx\nversion: latest'))
+        self.assertEqual(adapter.call_count, 1)
@@ -0,0 +1,147 @@
+"""
+Tests for the ordering and indexing of application versions.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import unittest
+from mock import MagicMock
+from bigboat.application import Application
+from bigboat.client import Client
+from bigboat.versions import sort_versions, VersionIndex
+
+class Clock(object):
+    """
+    Clock whose time is set by the test.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class SortVersionsTest(unittest.TestCase):
+    """
+    Tests for the ordering of versions.
+    """
+
+    def test_numeric(self):
+        """
+        Test that numeric components are compared as numbers.
+        """
+
+        self.assertEqual(sort_versions(['1.10', '1.9', 'v2', '1.9.1']),
+                         ['1.9', '1.9.1', '1.10', 'v2'])
+
+    def test_prerelease(self):
+        """
+        Test that pre-releases are ordered before their release.
+        """
+
+        self.assertEqual(sort_versions(['1.0', '1.0-rc.10', '1.0-beta',
+                                        '1.0-rc.2', '0.9+build.5']),
+                         ['0.9+build.5', '1.0-beta', '1.0-rc.2', '1.0-rc.10',
+                          '1.0'])
+
+    def test_natural(self):
+        """
+        Test that other versions are ordered naturally before semantic
+        versions.
+        """
+
+        self.assertEqual(sort_versions(['1.0', 'nightly-10', 'latest',
+                                        'nightly-9'], reverse=True),
+                         ['1.0', 'nightly-10', 'nightly-9', 'latest'])
+
+class VersionIndexTest(unittest.TestCase):
+    """
+    Tests for the version index of application definitions.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client)
+        self.set_apps([('nginx', '1.9'), ('nginx', '1.13'),
+                       ('nginx', '1.10'), ('redis', '4.0')])
+        self.clock = Clock()
+        self.index = VersionIndex(self.client, max_age=60, clock=self.clock)
+
+    def set_apps(self, apps):
+        """
+        Set the application definitions that the client lists.
+        """
+
+        self.client.apps.return_value = [
+            Application(self.client, name, version) for name, version in apps
+        ]
+
+    def test_versions(self):
+        """
+        Test the sorted versions of an application.
+        """
+
+        self.assertEqual(self.index.versions('nginx'), ['1.9', '1.10', '1.13'])
+        self.assertEqual(self.index.versions('missing'), [])
+        self.assertEqual(self.index.names(), ['nginx', 'redis'])
+        self.client.apps.assert_called_once_with()
+
+    def test_latest(self):
+        """
+        Test retrieving the newest version of an application.
+        """
+
+        latest = self.index.latest('nginx')
+        self.assertIsInstance(latest, Application)
+        self.assertEqual(latest.name, 'nginx')
+        self.assertEqual(latest.version, '1.13')
+        self.assertIsNone(self.index.latest('missing'))
+
+    def test_between(self):
+        """
+        Test retrieving the versions within a range.
+        """
+
+        self.assertEqual(self.index.between('nginx', '1.10'), ['1.10', '1.13'])
+        self.assertEqual(self.index.between('nginx', maximum='1.13'),
+                         ['1.9', '1.10'])
+        self.assertEqual(self.index.between('nginx', '1.9.5', '2'),
+                         ['1.10', '1.13'])
+        self.assertEqual(self.index.between('redis', '5'), [])
+
+    def test_refresh(self):
+        """
+        Test that a refresh only reports the applications that changed.
+        """
+
+        self.index.names()
+        self.set_apps([('nginx', '1.9'), ('nginx', '1.14'),
+                       ('nginx', '1.10'), ('mysql', '5.7')])
+        self.assertEqual(self.index.refresh(), set(['nginx', 'redis', 'mysql']))
+        self.assertEqual(self.index.versions('nginx'), ['1.9', '1.10', '1.14'])
+        self.assertEqual(self.index.names(), ['mysql', 'nginx'])
+        self.assertEqual(self.index.refresh(), set())
+
+    def test_max_age(self):
+        """
+        Test that queries refresh the index once it is too old.
+        """
+
+        self.index.latest('nginx')
+        self.set_apps([('nginx', '2.0')])
+        self.clock.now += 30
+        self.assertEqual(self.index.latest('nginx').version, '1.13')
+        self.clock.now += 30
+        self.assertEqual(self.index.latest('nginx').version, '2.0')
+        self.assertEqual(self.client.apps.call_count, 2)
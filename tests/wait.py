@@ -0,0 +1,98 @@
+"""
+Tests for waiting for instances to reach a state.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import unittest
+from mock import MagicMock
+from bigboat.application import Application
+from bigboat.client import Client
+from bigboat.instance import Instance
+from bigboat.wait import wait_for_state
+
+class WaitForStateTest(unittest.TestCase):
+    """
+    Tests for waiting for instances to reach a state.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client)
+
+    def _listing(self, *states):
+        return [
+            Instance(self.client, name, current_state=state,
+                     application=Application(self.client, 'app', version))
+            for name, state, version in states
+        ]
+
+    def test_reached(self):
+        """
+        Test waiting for instances that reach the state.
+        """
+
+        self.client.instances.side_effect = [
+            self._listing(('a', 'starting', '1'), ('b', 'created', '1'),
+                          ('c', 'running', '1')),
+            self._listing(('a', 'running', '1'), ('b', 'starting', '1')),
+            self._listing(('a', 'running', '1'), ('b', 'running', '1'))
+        ]
+        result = wait_for_state(self.client, ['a', 'b'], interval=0)
+        self.assertEqual(result, ({'a', 'b'}, set(), set()))
+        self.assertEqual(self.client.instances.call_count, 3)
+
+    def test_failed(self):
+        """
+        Test waiting for instances that fail or disappear.
+        """
+
+        self.client.instances.return_value = \
+            self._listing(('a', 'failed', '1'), ('b', 'running', '1'))
+        result = wait_for_state(self.client, ['a', 'b', 'c'], interval=0)
+        self.assertEqual(result, ({'b'}, {'a', 'c'}, set()))
+
+        # Instances that are no longer listed have stopped.
+        result = wait_for_state(self.client, ['c'], state='stopped')
+        self.assertEqual(result, ({'c'}, set(), set()))
+
+    def test_version(self):
+        """
+        Test waiting for instances that run a specific version.
+        """
+
+        self.client.instances.side_effect = [
+            self._listing(('a', 'running', '1')),
+            self._listing(('a', 'running', '2'))
+        ]
+        result = wait_for_state(self.client, ['a'], interval=0, version='2')
+        self.assertEqual(result, ({'a'}, set(), set()))
+        self.assertEqual(self.client.instances.call_count, 2)
+
+    def test_timeout(self):
+        """
+        Test that instances are pending after a timeout or cancellation.
+        """
+
+        self.client.instances.return_value = \
+            self._listing(('a', 'starting', '1'))
+        result = wait_for_state(self.client, ['a'], interval=0.01, timeout=0.05)
+        self.assertEqual(result, (set(), set(), {'a'}))
+
+        cancel = threading.Event()
+        cancel.set()
+        result = wait_for_state(self.client, ['a'], timeout=None,
+                                cancel=cancel)
+        self.assertEqual(result, (set(), set(), {'a'}))
@@ -0,0 +1,145 @@
+"""
+Tests for change events of instances.
+
+Copyright 2017 ICTU
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+"""
+
+import threading
+import unittest
+from mock import MagicMock
+from bigboat.client import Client_v2
+from bigboat.instance import LazyInstance
+from bigboat.watch import InstanceTracker, InstanceWatcher
+
+def instance(client, name, state='running', version='1.13'):
+    """
+    Create an instance entity from v2 API data.
+    """
+
+    return LazyInstance(client, {
+        'name': name,
+        'state': {'current': state, 'desired': 'running'},
+        'app': {'name': 'nginx', 'version': version}
+    })
+
+class InstanceTrackerTest(unittest.TestCase):
+    """
+    Tests for the known state of instances.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client_v2)
+        self.tracker = InstanceTracker()
+
+    def test_update(self):
+        """
+        Test the InstanceTracker.update method.
+        """
+
+        event = self.tracker.update(instance(self.client, 'web'))
+        self.assertEqual(event.kind, 'added')
+        self.assertEqual(event.name, 'web')
+        self.assertIsNone(event.previous)
+
+        self.assertIsNone(self.tracker.update(instance(self.client, 'web')))
+
+        event = self.tracker.update(instance(self.client, 'web', 'stopped'))
+        self.assertEqual(event.kind, 'changed')
+        self.assertEqual(event.instance.current_state, 'stopped')
+        self.assertEqual(event.previous.current_state, 'running')
+
+        event = self.tracker.update(instance(self.client, 'web', 'stopped',
+                                             '1.14'))
+        self.assertEqual(event.kind, 'changed')
+
+    def test_remove(self):
+        """
+        Test the InstanceTracker.remove method.
+        """
+
+        self.assertIsNone(self.tracker.remove('web'))
+        self.tracker.update(instance(self.client, 'web'))
+        event = self.tracker.remove('web')
+        self.assertEqual(event.kind, 'removed')
+        self.assertIsNone(event.instance)
+        self.assertEqual(event.previous.name, 'web')
+        self.assertEqual(self.tracker.instances(), {})
+
+    def test_replace(self):
+        """
+        Test the InstanceTracker.replace method.
+        """
+
+        self.tracker.replace([instance(self.client, 'web'),
+                              instance(self.client, 'db')])
+        events = self.tracker.replace([instance(self.client, 'web', 'failed'),
+                                       instance(self.client, 'cache')])
+        self.assertEqual([(event.kind, event.name) for event in events], [
+            ('changed', 'web'), ('added', 'cache'), ('removed', 'db')
+        ])
+        self.assertEqual(sorted(self.tracker.instances().keys()),
+                         ['cache', 'web'])
+
+class InstanceWatcherTest(unittest.TestCase):
+    """
+    Tests for the polling instance watcher.
+    """
+
+    def setUp(self):
+        self.client = MagicMock(spec_set=Client_v2)
+        self.watcher = InstanceWatcher(self.client)
+
+    def test_poll(self):
+        """
+        Test the InstanceWatcher.poll method.
+        """
+
+        self.client.instances.return_value = [instance(self.client, 'web')]
+        events = self.watcher.poll()
+        self.assertEqual([(event.kind, event.name) for event in events],
+                         [('added', 'web')])
+        self.assertEqual(self.watcher.poll(), [])
+
+        self.client.instances.return_value = []
+        events = self.watcher.poll()
+        self.assertEqual([(event.kind, event.name) for event in events],
+                         [('removed', 'web')])
+
+    def test_run(self):
+        """
+        Test the InstanceWatcher.run method.
+        """
+
+        listings = [
+            [instance(self.client, 'web', 'starting')],
+            [instance(self.client, 'web')]
+        ]
+        cancel = threading.Event()
+
+        def instances():
+            """
+            Return the next listing and cancel after the last one.
+            """
+
+            if len(listings) == 1:
+                cancel.set()
+
+            return listings.pop(0)
+
+        self.client.instances.side_effect = instances
+        events = []
+        self.watcher.run(events.append, interval=0, cancel=cancel)
+        self.assertEqual([(event.kind, event.name) for event in events],
+                         [('added', 'web'), ('changed', 'web')])